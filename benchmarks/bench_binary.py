@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""Сравнение запуска с json снимка (потоковая загрузка) и с двоичного снимка через mmap"""
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+import main
+
+
+def books(count: int):
+    for id_ in range(1, count + 1):
+        yield main.Book(id_, f'Книга {id_}', f'Автор {id_ % 1000}', 1900 + id_ % 120)
+
+
+def timed(message: str, function):
+    started = time.perf_counter()
+    result = function()
+    print(f'{message:<45} {time.perf_counter() - started:>9.4f} с')
+    return result
+
+
+def load_json(path: str) -> tuple[main.Library, ...]:
+    libraries = ()
+    for name, library_books in main.JsonConverter.iter_libraries(path):
+        library = main.Library(name)
+        library.load(library_books)
+        libraries += (library,)
+    return libraries
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, 'libraries.json')
+        binary_path = os.path.join(directory, 'libraries.bin')
+        main.JsonConverter.write_snapshot([('benchmark', books(count))], json_path)
+        main.JsonConverter.write_snapshot([('benchmark', books(count))], binary_path)
+        print(f'Книг: {count}, json: {os.path.getsize(json_path)} байт, двоичный: {os.path.getsize(binary_path)} байт')
+        timed('json: потоковая загрузка', lambda: load_json(json_path))
+        library, = timed('двоичный: открытие', lambda: main.JsonConverter.open_binary(binary_path))
+        timed('двоичный: поиск книги по id', lambda: library._find_book_by_id(count // 2))
+        timed('двоичный: первые 20 книг списка', lambda: [book for book, _ in zip(library.stored_books, range(20))])
+        with open(os.devnull, 'w') as devnull:
+            def find_book():
+                with redirect_stdout(devnull):
+                    library.find_book(author='Автор 7')
+
+            timed('двоичный: первый find_book (строит индексы)', find_book)
+            timed('двоичный: повторный find_book', find_book)
+        del library
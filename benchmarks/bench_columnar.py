@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""Память и время загрузки библиотеки: хранилище dict и колоночное хранилище"""
+import os
+import sys
+import time
+import tracemalloc
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+import main
+
+
+def books(count: int):
+    """Книги как после разбора json: каждая строка и число - отдельный объект"""
+    for id_ in range(1, count + 1):
+        yield main.Book(id_, f'Книга {id_}', f'Автор {id_ % 1000}', int(str(1900 + id_ % 120)))
+
+
+def load_time(columnar: bool, count: int) -> float:
+    """Время загрузки в секундах"""
+    started = time.perf_counter()
+    library = main.Library('benchmark', columnar)
+    library.load(books(count))
+    elapsed = time.perf_counter() - started
+    del library
+    return elapsed
+
+
+def bytes_per_book(columnar: bool, count: int) -> float:
+    """Удерживаемая библиотекой память в байтах на книгу"""
+    tracemalloc.start()
+    library = main.Library('benchmark', columnar)
+    library.load(books(count))
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del library
+    return size / count
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f'Книг: {count}')
+    for title, columnar in (('dict', False), ('колоночное', True)):
+        print(f'{title:<12} загрузка {load_time(columnar, count):>7.2f} с, '
+              f'{bytes_per_book(columnar, count):>7.1f} байт на книгу')
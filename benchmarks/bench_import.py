@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""Время импорта пакета main для разных потребителей (python -X importtime) и какие тяжёлые модули подгружаются.
+С --limit МС завершается с кодом 1, если импорт модели данных дольше предела"""
+import os
+import statistics
+import subprocess
+import sys
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+
+HEAVY = ('re', 'json', 'logging', 'typing', 'mmap', 'multiprocessing', 'main.storage', 'main.cli')
+CASES = (('import main', 'import main'),
+         ('модель данных', 'import main; main.Book; main.Library'),
+         ('библиотека с книгами', "import main; main.Library('l').load([main.Book(1, 't', 'a', 1)])"),
+         ('хранилище', 'import main; main.JsonConverter'),
+         ('интерфейс', 'import main; main.Client'))
+
+
+def run(statement: str) -> str:
+    """Вывод python -X importtime для statement. Байт-код кешируется, как у обычного запуска"""
+    environment = {key: value for key, value in os.environ.items() if key != 'PYTHONDONTWRITEBYTECODE'}
+    return subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], cwd=parent_dir, env=environment,
+                          capture_output=True, text=True, check=True).stderr
+
+
+def import_time(statement: str) -> tuple[int, list[str]]:
+    """Суммарное время импортов statement в микросекундах и загруженные им тяжёлые модули"""
+    result, baseline = run(statement), run('pass')
+    startup = {line.rsplit('|', 1)[1].strip() for line in baseline.splitlines() if line.startswith('import time:')}
+    total, modules = 0, set()
+    for line in result.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        modules.add(name.strip())
+        if not name.startswith('  ') and name.strip() not in startup:  # верхний уровень, кроме запуска python
+            total += int(cumulative)
+    return total, [name for name in HEAVY if name in modules]
+
+
+if __name__ == '__main__':
+    repeat = 7
+    limit = float(sys.argv[sys.argv.index('--limit') + 1]) if '--limit' in sys.argv else None
+    model_time = None
+    for title, statement in CASES:
+        run(statement)  # прогрев кеша байт-кода
+        times, heavy = [], []
+        for _ in range(repeat):
+            time_us, heavy = import_time(statement)
+            times.append(time_us)
+        median = statistics.median(times) / 1000
+        if title == 'модель данных':
+            model_time = median
+        print(f'{title:<22} {median:>6.1f} мс  тяжёлые модули: {", ".join(heavy) or "нет"}')
+    if limit is not None and model_time > limit:
+        print(f'Импорт модели данных {model_time:.1f} мс дольше предела {limit} мс')
+        sys.exit(1)
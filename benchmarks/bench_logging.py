@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Стоимость логирования: форматирование отключённых записей, создание логера, запись в файл напрямую и через очередь"""
+import logging
+import os
+import sys
+import tempfile
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+import main
+
+
+def timed(function, repeat: int) -> float:
+    """Среднее время одного вызова в микросекундах"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def eager_logger(path: str) -> logging.Logger:
+    """Логер как до LazyLogHandler: обработчики и файл создаются сразу"""
+    logger = logging.getLogger('bench_eager')
+    logger.setLevel(logging.ERROR)
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+        handler.close()
+    formatter = logging.Formatter(main.LazyLogHandler.FORMAT)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+    logger.addHandler(stream_handler)
+    file_handler = logging.FileHandler(filename=path, mode='w')
+    file_handler.setLevel(logging.INFO)
+    file_handler.setFormatter(formatter)
+    logger.addHandler(file_handler)
+    return logger
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    value = 'Заголовок, Автор, 1990'
+    some = ['']
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'logs', 'main.log')
+        logger = main.create_logger(logging.ERROR, path)
+        print('Отключённый уровень DEBUG:')
+        print(f'  форматирование %  {timed(lambda: logger.debug("Введено: %s" % value), repeat):>6.3f} мкс')
+        print(f'  отложенное        {timed(lambda: logger.debug("Введено: %s", value), repeat):>6.3f} мкс')
+        eager_split = timed(lambda: logger.debug('split на: %s и отброшено: %s' % (value, str(*some))), repeat)
+        print(f'  % и str(*some)    {eager_split:>6.3f} мкс')
+        print('Создание логера:')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        print(f'  с открытием файла {timed(lambda: eager_logger(path), 1000):>6.1f} мкс')
+        print(f'  LazyLogHandler    {timed(lambda: main.create_logger(logging.ERROR, path), 1000):>6.1f} мкс')
+        print('Запись уровня INFO в файл:')
+        stderr, sys.stderr = sys.stderr, open(os.devnull, 'w')
+        for use_queue in (False, True):
+            logger = main.create_logger(logging.INFO, path, use_queue)
+            logger.info('прогрев')
+            duration = timed(lambda: logger.info('Введено: %s', value), repeat // 10)
+            logger.handlers[0].flush()
+            print(f'  {"через очередь" if use_queue else "напрямую":<17} {duration:>6.2f} мкс в вызывающем потоке',
+                  file=stderr)
+        main.create_logger(logging.ERROR, path)
+        sys.stderr.close()
+        sys.stderr = stderr
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""Память на книгу: прежний Book с __dict__ без интернирования и нынешний Book со __slots__"""
+import os
+import sys
+import tracemalloc
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+import main
+
+
+class DictBook:
+    """Book до перехода на __slots__: атрибуты в __dict__, строки не интернируются"""
+    def __init__(self, id_: int, title: str, author: str, year: int, status: str | None = None) -> None:
+        self.__id = id_
+        self.__title = title
+        self.__author = author
+        self.__year = year
+        self.__status = status or main.Book.STANDARD_STATUSES[0]
+
+
+def records(count: int):
+    """Записи как после разбора json: каждая строка - отдельный объект"""
+    for id_ in range(1, count + 1):
+        yield id_, f'Книга {id_}', f'Автор {id_ % 1000}', 1900 + id_ % 120, ''.join(('вы', 'дана'))
+
+
+def bytes_per_book(book_class, count: int) -> float:
+    """Память, удерживаемая count книгами, в байтах на книгу"""
+    tracemalloc.start()
+    books = [book_class(*record) for record in records(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del books
+    return size / count
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    before = bytes_per_book(DictBook, count)
+    after = bytes_per_book(main.Book, count)
+    print(f'Книг: {count}')
+    print(f'до:    {before:>7.1f} байт на книгу')
+    print(f'после: {after:>7.1f} байт на книгу ({(1 - after / before) * 100:.1f}% меньше)')
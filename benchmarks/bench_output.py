@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""Вывод списка книг: print на каждую строку против записи порциями через OutputSink"""
+import os
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+import main
+
+
+def print_per_line(books: list[main.Book]) -> None:
+    """Вывод как до OutputSink"""
+    for book in books:
+        print(book.__str__())
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    # Вывод идёт в /dev/null через построчно сбрасываемый поток, как у терминала
+    sys.stdout = open(os.devnull, 'w', encoding='utf-8', buffering=1)
+    books = [main.Book(id_, f'Книга {id_}', f'Автор {id_ % 1000}', 1900 + id_ % 120) for id_ in range(count)]
+    results = []
+    for title, function in (('print на строку', lambda: print_per_line(books)),
+                            ('TerminalSink', lambda: main.TerminalSink().write_lines(map(main.Book.__str__, books)))):
+        started = time.perf_counter()
+        function()
+        results.append(f'{title:<16} {time.perf_counter() - started:>6.2f} с')
+    sys.stdout = sys.__stdout__
+    print(f'Строк: {count}')
+    print('\n'.join(results))
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""Задержка поиска по словам, началу слова и с опечатками и выборки по годам на большой библиотеке.
+Кеш поиска очищается перед каждым запросом: замеряется поиск по индексам"""
+import os
+import random
+import statistics
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+import main
+
+SYLLABLES = ('ка', 'ли', 'на', 'ро', 'ва', 'ми', 'то', 'се', 'лу', 'да', 'ре', 'по', 'ны', 'жи', 'ко', 'ба')
+
+
+def word(rng: random.Random) -> str:
+    """Случайное слово из слогов"""
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def books(count: int, seed: int = 1):
+    """Книги с заголовками из 1-4 слов и авторами 'Инициал. Фамилия'"""
+    rng = random.Random(seed)
+    surnames = [word(rng).capitalize() + 'ов' for _ in range(20_000)]
+    for id_ in range(1, count + 1):
+        title = ' '.join(word(rng) for _ in range(rng.randint(1, 4))).capitalize()
+        author = f'{rng.choice("АБВГДЕЖЗИК")}. {rng.choice(surnames)}'
+        yield main.Book(id_, title, author, 1900 + id_ % 120)
+
+
+def found_books(result) -> int:
+    """Число найденных книг в результате search (ступени), query (список) или query_count (число)"""
+    if isinstance(result, int):
+        return result
+    if isinstance(result, dict):
+        return sum(map(len, result.values()))
+    return len(result)
+
+
+def latency(search, queries: list[dict], library: main.Library) -> tuple[float, float, float]:
+    """Медиана и 95-й процентиль времени поиска в миллисекундах и медиана числа найденных книг.
+    Время растёт с числом найденных книг: их нужно упорядочить по оценке и выдать"""
+    times, found = [], []
+    for query in queries:
+        library.clear_search_cache()
+        started = time.perf_counter()
+        result = search(**query)
+        times.append((time.perf_counter() - started) * 1000)
+        found.append(found_books(result))
+    times.sort()
+    return statistics.median(times), times[int(len(times) * 0.95)], statistics.median(found)
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    library = main.Library('benchmark')
+    started = time.perf_counter()
+    library.load(books(count))
+    print(f'Книг: {count}, загрузка с индексами {time.perf_counter() - started:.2f} с')
+    rng = random.Random(2)
+    sample = [library._find_book_by_id(rng.randint(1, count)) for _ in range(200)]
+    surnames = [book.author.split()[-1] for book in sample]
+    search, query = library.search, library.query
+    cases = (('автор целиком', search, [{'author': surname} for surname in surnames]),
+             ('начало фамилии', search, [{'author': surname[:5]} for surname in surnames]),
+             ('опечатка', search, [{'author': surname[:2] + surname[3:]} for surname in surnames]),
+             ('заголовок и автор', search, [{'title': book.title.split()[0], 'author': book.author} for book in sample]),
+             ('автор и годы', query, [{'author': [surname, surnames[0]], 'year_from': 1950, 'year_to': 1960}
+                                      for surname in surnames]),
+             ('годы', query, [{'year_from': book.year, 'year_to': book.year + 1} for book in sample[:20]]),
+             ('годы, число', library.query_count, [{'year_from': book.year, 'year_to': book.year + 10}
+                                                   for book in sample]))
+    for title, function, queries in cases:
+        latency(function, queries[:5], library)  # первый нечёткий поиск строит индексы удалений и n-грамм
+        median, p95, found = latency(function, queries, library)
+        print(f'{title:<18} медиана {median:>7.3f} мс, 95% {p95:>7.3f} мс, найдено книг (медиана) {found:>8.0f}')
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""Нагрузочный клиент сервера библиотек: много одновременных соединений шлют смесь запросов поиска, добавления
+и смены статуса, замеряются запросы в секунду и задержки p50/p95/p99 по типам запросов.
+
+python benchmarks/bench_server.py [--books 10000] [--connections 32] [--requests 200] [--mix 8,1,1]
+                                  [--address хост:порт]
+Без --address запускает python -m main --serve во временном каталоге на синтетическом каталоге книг"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from catalog import Catalog, main, parent_dir
+
+KINDS = ('search', 'add', 'status')
+
+
+class LoadClient:
+    """Соединения с сервером и запросы к нему. Каждое соединение шлёт следующий запрос после ответа на предыдущий"""
+    MAX_RESPONSE = 1 << 26  # ответ на поиск по популярному слову бывает длиннее 64 КиБ по умолчанию
+
+    def __init__(self, catalog: Catalog, books: list, library_name: str, mix: tuple[int, ...]) -> None:
+        self.catalog = catalog
+        self.queries = catalog.queries(books, 500)
+        self.ids = [book.id for book in books]
+        self.library_name = library_name
+        self.mix = mix
+        self.latencies: dict[str, list[float]] = {kind: [] for kind in KINDS}
+        self.errors = 0
+
+    def request(self, rng: random.Random, number: int) -> dict:
+        kind = rng.choices(KINDS, weights=self.mix)[0]
+        if kind == 'search':
+            return {'id': number, 'op': 'search', 'library': self.library_name, **rng.choice(self.queries)}
+        if kind == 'add':
+            return {'id': number, 'op': 'add', 'library': self.library_name,
+                    'books': [[f'Книга нагрузки {number}', 'Н. Нагрузкин', 2024]]}
+        return {'id': number, 'op': 'status', 'library': self.library_name,
+                'statuses': {str(rng.choice(self.ids)): rng.choice(main.Book.STANDARD_STATUSES)}}
+
+    async def connection(self, address: str, seed: int, count: int) -> None:
+        if address.startswith('unix:'):
+            reader, writer = await asyncio.open_unix_connection(address[len('unix:'):], limit=self.MAX_RESPONSE)
+        else:
+            host, _, port = address.rpartition(':')
+            reader, writer = await asyncio.open_connection(host, int(port), limit=self.MAX_RESPONSE)
+        rng = random.Random(seed)
+        try:
+            for number in range(count):
+                request = self.request(rng, number)
+                started = time.perf_counter()
+                writer.write((json.dumps(request, ensure_ascii=False) + '\n').encode(main.JsonConverter.ENCODING))
+                await writer.drain()
+                response = json.loads(await reader.readline())
+                self.latencies[request['op']].append(time.perf_counter() - started)
+                if 'error' in response or response.get('id') != number:
+                    self.errors += 1
+        finally:
+            writer.close()
+
+    async def run(self, address: str, connections: int, count: int) -> float:
+        """Выполнит нагрузку и вернёт её длительность в секундах"""
+        started = time.perf_counter()
+        await asyncio.gather(*(self.connection(address, self.catalog.seed + number, count)
+                               for number in range(connections)))
+        return time.perf_counter() - started
+
+    def report(self, seconds: float) -> None:
+        print(f'{"запрос":<8} {"число":>7} {"в секунду":>10} {"p50, мс":>9} {"p95, мс":>9} {"p99, мс":>9}')
+        everything = [latency for latencies in self.latencies.values() for latency in latencies]
+        for kind, latencies in (*self.latencies.items(), ('все', everything)):
+            if not latencies:
+                continue
+            latencies = sorted(latencies)
+            p50, p95, p99 = (latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1000
+                             for q in (0.5, 0.95, 0.99))
+            print(f'{kind:<8} {len(latencies):>7} {len(latencies) / seconds:>10.0f} {p50:>9.2f} {p95:>9.2f} '
+                  f'{p99:>9.2f}')
+        print(f'Ошибок: {self.errors}, длительность {seconds:.2f} с')
+
+
+async def start_server(data_path: str, log_path: str) -> tuple[asyncio.subprocess.Process, str]:
+    """Запустит сервер на свободном порту и вернёт процесс и адрес из его сообщения о запуске"""
+    environment = {**os.environ, 'PYTHONUNBUFFERED': '1'}
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, '-m', 'main', '--data', data_path, '--serve', '127.0.0.1:0', '--log-file', log_path,
+        cwd=parent_dir, env=environment, stdout=asyncio.subprocess.PIPE)
+    while line := (await process.stdout.readline()).decode():
+        if 'Сервер слушает' in line:
+            return process, line.rsplit(' ', 1)[1].strip()
+    raise RuntimeError('Сервер не запустился')
+
+
+async def benchmark(arguments: argparse.Namespace) -> None:
+    catalog = Catalog(arguments.books, arguments.seed)
+    books = catalog.books()
+    mix = tuple(map(int, arguments.mix.split(',')))
+    if arguments.address:
+        client = LoadClient(catalog, books, arguments.library, mix)
+        client.report(await client.run(arguments.address, arguments.connections, arguments.requests))
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        library = main.Library(arguments.library)
+        library.load(books)
+        data_path = os.path.join(directory, 'libraries.json')
+        main.JsonConverter.write_snapshot(main.JsonConverter.library_entries((library,)), data_path)
+        process, address = await start_server(data_path, os.path.join(directory, 'library.log'))
+        try:
+            client = LoadClient(catalog, books, arguments.library, mix)
+            seconds = await client.run(address, arguments.connections, arguments.requests)
+        finally:
+            process.terminate()  # SIGTERM: сервер закроет соединения и сохранит данные
+            await process.wait()
+        client.report(seconds)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Нагрузочный клиент сервера библиотек')
+    parser.add_argument('--books', type=int, default=10000, help='книг в синтетическом каталоге')
+    parser.add_argument('--connections', type=int, default=32, help='одновременных соединений')
+    parser.add_argument('--requests', type=int, default=200, help='запросов на соединение')
+    parser.add_argument('--mix', default='8,1,1', help='веса поиска, добавления и смены статуса')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--address', help='адрес уже запущенного сервера, каталог должен совпадать с --books')
+    parser.add_argument('--library', default='benchmark', help='имя библиотеки на сервере')
+    asyncio.run(benchmark(parser.parse_args()))
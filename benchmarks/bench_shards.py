@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""Запись и чтение снимка по частям в зависимости от числа рабочих процессов"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+import main
+
+
+def make_libraries(library_count: int, books_per_library: int) -> tuple[main.Library, ...]:
+    """Библиотеки филиалов одинакового размера"""
+    libraries = ()
+    for number in range(library_count):
+        library = main.Library(f'Филиал {number}')
+        library.load(main.Book(id_, f'Книга {id_}', f'Автор {id_ % 1000}', 1900 + id_ % 120)
+                     for id_ in range(1, books_per_library + 1))
+        libraries += (library,)
+    return libraries
+
+
+def timed(function) -> float:
+    """Время выполнения в секундах"""
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        function()
+    return time.perf_counter() - started
+
+
+if __name__ == '__main__':
+    library_count = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    books_per_library = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    libraries = make_libraries(library_count, books_per_library)
+    entries = list(main.JsonConverter.library_entries(libraries))
+    print(f'Библиотек: {library_count}, книг в каждой: {books_per_library}, ядер: {os.cpu_count()}')
+    with tempfile.TemporaryDirectory() as directory:
+        single_path = os.path.join(directory, 'libraries.json')
+        manifest_path = os.path.join(directory, 'libraries.manifest')
+        print(f'{"один файл":<14} запись {timed(lambda: main.JsonConverter.write_snapshot(entries, single_path)):>6.2f} с,'
+              f' чтение {timed(lambda: main.JsonConverter.load_libraries(single_path)):>6.2f} с')
+        workers = 1
+        while workers <= max(os.cpu_count() or 1, 2):
+            save = timed(lambda: main.JsonConverter.write_snapshot(entries, manifest_path, workers=workers))
+            load = timed(lambda: main.JsonConverter.load_libraries(manifest_path, workers=workers))
+            print(f'{f"частей, {workers} пр.":<14} запись {save:>6.2f} с, чтение {load:>6.2f} с')
+            workers *= 2
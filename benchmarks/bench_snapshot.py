@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""Сравнение времени записи снимка: простая перезапись файла и атомарная запись с fsync и резервной копией"""
+import os
+import sys
+import tempfile
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+import main
+
+
+def make_library(count: int) -> main.Library:
+    """Создаст библиотеку из count книг"""
+    library = main.Library('benchmark')
+    library.load(main.Book(id_, f'Книга {id_}', f'Автор {id_ % 1000}', 1900 + id_ % 120) for id_ in range(1, count + 1))
+    return library
+
+
+def plain_write(library: main.Library, path: str) -> None:
+    """Запись без временного файла, fsync и резервной копии, как было раньше"""
+    with open(path, 'w', encoding=main.JsonConverter.ENCODING) as file:
+        main.JsonConverter.write_records(((library.name, library.stored_books),), file)
+
+
+def atomic_write(library: main.Library, path: str) -> None:
+    main.JsonConverter.write_snapshot(((library.name, library.stored_books),), path)
+
+
+def best_of(function, library: main.Library, path: str, repeat: int = 3) -> float:
+    """Лучшее время из repeat запусков"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(library, path)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+if __name__ == '__main__':
+    counts = [int(argument) for argument in sys.argv[1:]] or [1_000, 100_000, 1_000_000]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'libraries.json')
+        print(f'{"книг":>10} {"простая, с":>12} {"атомарная, с":>14} {"накладные":>10}')
+        for count in counts:
+            library = make_library(count)
+            plain = best_of(plain_write, library, path)
+            atomic = best_of(atomic_write, library, path)
+            print(f'{count:>10} {plain:>12.4f} {atomic:>14.4f} {(atomic / plain - 1) * 100:>9.1f}%')
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""Набор замеров Library и JsonConverter на синтетических каталогах: время и пик памяти (tracemalloc) каждой
+операции, результаты в JSON и сравнение с сохранённой базовой линией.
+
+python benchmarks/bench_suite.py [--sizes 1000,10000,100000,1000000] [--output results.json]
+                                 [--baseline benchmarks/baseline.json] [--save-baseline] [--tolerance 0.3]
+С --baseline завершается с кодом 1, если какая-то операция медленнее или прожорливее базовой линии больше допуска"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+
+from catalog import Catalog, main
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+OPERATIONS_PER_CASE = 1000  # сколько поисков по номеру, добавлений и удалений в одном замере
+QUERIES = 100
+MIN_SECONDS = 0.005  # более быстрые замеры слишком шумные для сравнения по времени
+MIN_TOTAL_SECONDS = 0.2  # быстрые операции повторяются, пока суммарно не займут столько
+MAX_RUNS = 50
+MIN_CACHE_HIT_RATIO = 0.99  # доля попаданий повторных запросов, при которой замер кеша имеет смысл
+
+
+class Suite:
+    """Замеры одного каталога. Каждый замер - функция подготовки, которая возвращает (операция, число действий,
+    восстановление): подготовка и восстановление не замеряются, восстановление возвращает библиотеку
+    к исходному состоянию, чтобы замеры можно было повторять на одной загруженной библиотеке"""
+
+    def __init__(self, catalog: Catalog, directory: str) -> None:
+        self.catalog = catalog
+        self.directory = directory
+        self.books = catalog.books()
+        self.library = main.Library('benchmark')
+        self.library.load(self.books)
+        self.devnull = open(os.devnull, 'w', encoding='utf-8')  # для вывода find_book и сообщений пользователю
+        self.library.output = main.FileSink(self.devnull)
+        self.rng = random.Random(catalog.seed + 2)
+
+    def cases(self) -> dict[str, Callable[[], tuple[Callable, int, Callable | None]]]:
+        return {'Library.load': self.load, 'Library._find_book_by_id': self.find_by_id,
+                'Library.add_books': self.add_books, 'Library.delete_books': self.delete_books,
+                'Library.find_book': self.find_book, 'Library.search': self.search,
+                'Library.search повтор': self.search_cached, 'JsonConverter.save_json': self.save_json,
+                'JsonConverter.open_json+add_books_from_dict': self.open_legacy,
+                'JsonConverter.load_libraries': self.load_libraries}
+
+    def load(self):
+        library = main.Library('benchmark')
+        return lambda: library.load(self.books), len(self.books), None
+
+    def find_by_id(self):
+        ids = [book.id for book in self.rng.choices(self.books, k=OPERATIONS_PER_CASE)]
+        find = self.library._find_book_by_id
+        return lambda: [find(id_) for id_ in ids], len(ids), None
+
+    def add_books(self):
+        """Добавление с выдачей номеров: сначала заполняются пропуски, затем номера после последнего"""
+        rows = [(f'Новая книга {number}', 'Б. Новиков', 2000) for number in range(OPERATIONS_PER_CASE)]
+        added = []
+        return (lambda: added.extend(self.library.add_books(rows)), len(rows),
+                lambda: self.library.delete_books([book.id for book in added]))
+
+    def delete_books(self):
+        books = self.rng.sample(self.books, min(OPERATIONS_PER_CASE, len(self.books)))
+        deleted = []
+        return (lambda: deleted.extend(self.library.delete_books([book.id for book in books])), len(books),
+                lambda: self.library.insert_books(deleted))
+
+    def find_book(self):
+        queries = self.catalog.queries(self.books, QUERIES)
+        self.library.clear_search_cache()
+        return lambda: [self.library.find_book(**query) for query in queries], len(queries), None
+
+    def search(self):
+        """Поиск без вывода с пустым кешем"""
+        queries = self.catalog.queries(self.books, QUERIES)
+        self.library.clear_search_cache()
+        return lambda: [self.library.search(**query) for query in queries], len(queries), None
+
+    def search_cached(self):
+        """Те же запросы, уже побывавшие в кеше. Результаты всех запросов должны помещаться в кеш, иначе замер
+        показал бы вытеснение записей друг другом, а не выигрыш от кеша: проверяется доля попаданий"""
+        queries = self.catalog.queries(self.books, QUERIES)
+        self.library.clear_search_cache()
+        for query in queries:
+            self.library.search(**query)
+        hits = self.library.search_cache_info['hits']
+        for query in queries:
+            self.library.search(**query)
+        hit_ratio = (self.library.search_cache_info['hits'] - hits) / len(queries)
+        if hit_ratio < MIN_CACHE_HIT_RATIO:
+            info = self.library.search_cache_info
+            raise RuntimeError(f'Повторные запросы попали в кеш в {hit_ratio:.0%} случаев: запросов в кеше '
+                               f'{info["size"]} из {info["max_size"]}, памяти {info["bytes"]} из {info["max_bytes"]}')
+        return lambda: [self.library.search(**query) for query in queries], len(queries), None
+
+    def save_json(self):
+        path = os.path.join(self.directory, 'libraries.json')
+        return lambda: main.JsonConverter.save_json((self.library,), path), len(self.books), None
+
+    def open_legacy(self):
+        """Чтение формата версии 1: {Library.__repr__(): {Book.__repr__(): номер}} в cp1251"""
+        path = os.path.join(self.directory, 'legacy.json')
+        with open(path, 'w', encoding=main.JsonConverter.LEGACY_ENCODING) as file:
+            json.dump(main.JsonConverter.MyEncoder.default((self.library,)), file, ensure_ascii=False)
+
+        def read() -> list:
+            return [book for books in main.JsonConverter.open_json(path).values()
+                    for book in main.JsonConverter.add_books_from_dict(books)]
+        return read, len(self.books), None
+
+    def load_libraries(self):
+        path = os.path.join(self.directory, 'snapshot.json')
+        main.JsonConverter.write_snapshot(main.JsonConverter.library_entries((self.library,)), path)
+        return lambda: main.JsonConverter.load_libraries(path), len(self.books), None
+
+    @staticmethod
+    def measure(prepare: Callable, repeat: int) -> tuple[float, int]:
+        """Лучшее время из не менее чем repeat запусков (быстрые операции повторяются, пока не наберётся
+        MIN_TOTAL_SECONDS) и пик памяти отдельного запуска под tracemalloc (он замедляет код).
+        Как в timeit, сборщик мусора на время замера отключается. Память считается только выделенная операцией"""
+        seconds, total, runs = float('inf'), 0.0, 0
+        while runs < repeat or (total < MIN_TOTAL_SECONDS and runs < MAX_RUNS):
+            operation, _, restore = prepare()
+            gc.collect()
+            gc.disable()
+            started = time.perf_counter()
+            operation()
+            elapsed = time.perf_counter() - started
+            gc.enable()
+            seconds, total, runs = min(seconds, elapsed), total + elapsed, runs + 1
+            if restore is not None:
+                restore()
+        operation, _, restore = prepare()
+        tracemalloc.start()
+        operation()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        if restore is not None:
+            restore()
+        return seconds, peak
+
+    def run(self, repeat: int) -> list[dict]:
+        results = []
+        for name, prepare in self.cases().items():
+            with contextlib.redirect_stdout(self.devnull):
+                count = prepare()[1]
+                seconds, peak = self.measure(prepare, repeat)
+            results.append({'operation': name, 'books': self.catalog.count, 'ops': count,
+                            'seconds': round(seconds, 6), 'peak_bytes': peak})
+            print(f'{name:<45} {self.catalog.count:>8} {seconds:>9.4f} с {seconds / count * 1e6:>9.2f} мкс/действие '
+                  f'{peak / 2 ** 20:>8.1f} МиБ')
+        self.devnull.close()
+        return results
+
+
+def compare(results: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    """Сравнит результаты с базовой линией. Вернёт описания регрессий"""
+    reference = {(result['operation'], result['books']): result for result in baseline}
+    regressions = []
+    print(f'\n{"Сравнение с базовой линией":<45} {"книг":>8} {"время":>9} {"память":>9}')
+    for result in results:
+        base = reference.get((result['operation'], result['books']))
+        if base is None:
+            continue
+        time_ratio = result['seconds'] / base['seconds'] if base['seconds'] else 1.0
+        memory_ratio = result['peak_bytes'] / base['peak_bytes'] if base['peak_bytes'] else 1.0
+        marks = []
+        if time_ratio > 1 + tolerance and result['seconds'] >= MIN_SECONDS:
+            marks.append('время')
+        if memory_ratio > 1 + tolerance and result['peak_bytes'] - base['peak_bytes'] > 2 ** 16:
+            marks.append('память')
+        print(f'{result["operation"]:<45} {result["books"]:>8} {time_ratio:>8.2f}x {memory_ratio:>8.2f}x'
+              f'{"  РЕГРЕССИЯ: " + ", ".join(marks) if marks else ""}')
+        if marks:
+            regressions.append(f'{result["operation"]} на {result["books"]} книгах: {", ".join(marks)}')
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Замеры Library и JsonConverter на синтетических каталогах')
+    parser.add_argument('--sizes', default='1000,10000,100000', help='размеры каталогов через запятую')
+    parser.add_argument('--repeat', type=int, default=3, help='запусков на замер времени, берётся лучший')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--author-skew', type=float, default=1.1)
+    parser.add_argument('--title-skew', type=float, default=1.0)
+    parser.add_argument('--id-gap-rate', type=float, default=0.05)
+    parser.add_argument('--special-status-rate', type=float, default=0.02)
+    parser.add_argument('--output', help='записать результаты в JSON')
+    parser.add_argument('--baseline', help='сравнить с результатами из JSON')
+    parser.add_argument('--save-baseline', action='store_true', help=f'записать результаты в {BASELINE_PATH}')
+    parser.add_argument('--tolerance', type=float, default=0.3, help='допустимое ухудшение, доля')
+    arguments = parser.parse_args()
+    report = {'python': platform.python_version(), 'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+              'catalog': None, 'results': []}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in map(int, arguments.sizes.split(',')):
+            catalog = Catalog(size, arguments.seed, arguments.author_skew, arguments.title_skew,
+                              arguments.id_gap_rate, arguments.special_status_rate)
+            report['catalog'] = catalog.params
+            report['results'] += Suite(catalog, directory).run(arguments.repeat)
+    for path in filter(None, (arguments.output, BASELINE_PATH if arguments.save_baseline else None)):
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        print(f'Результаты записаны в {path}')
+    if arguments.baseline:
+        with open(arguments.baseline, encoding='utf-8') as file:
+            regressions = compare(report['results'], json.load(file)['results'], arguments.tolerance)
+        if regressions:
+            print('Регрессии:\n' + '\n'.join(regressions))
+            sys.exit(1)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""Детерминированный генератор синтетического каталога книг для замеров.
+Одинаковые параметры и seed дают одинаковый каталог на любой машине"""
+import os
+import random
+import sys
+from itertools import accumulate
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+import main
+
+SYLLABLES = ('ка', 'ли', 'на', 'ро', 'ва', 'ми', 'то', 'се', 'лу', 'да', 'ре', 'по', 'ны', 'жи', 'ко', 'ба')
+INITIALS = 'АБВГДЕЖЗИКЛМНОПРСТ'
+SPECIAL_STATUSES = ('на реставрации', 'утеряна', 'в переплёте', 'в читальном зале')
+
+
+class Catalog:
+    """Параметры каталога и генерация книг.
+    author_skew и title_skew - показатели закона Ципфа: 0 - равномерно, больше - популярные авторы и слова
+    встречаются чаще. id_gap_rate - доля книг, перед номером которой пропуск, special_status_rate - доля книг
+    с нестандартным статусом, issued_rate - доля выданных среди остальных"""
+    VOCABULARY_SIZE = 5000
+    MAX_TITLE_WORDS = 5
+    MAX_ID_GAP = 20
+    YEARS = (1800, 2024)
+
+    def __init__(self, count: int, seed: int = 1, author_skew: float = 1.1, title_skew: float = 1.0,
+                 id_gap_rate: float = 0.05, special_status_rate: float = 0.02, issued_rate: float = 0.25) -> None:
+        self.count = count
+        self.seed = seed
+        self.author_skew = author_skew
+        self.title_skew = title_skew
+        self.id_gap_rate = id_gap_rate
+        self.special_status_rate = special_status_rate
+        self.issued_rate = issued_rate
+
+    @property
+    def params(self) -> dict:
+        """Параметры для записи в результаты замера"""
+        return {'seed': self.seed, 'author_skew': self.author_skew, 'title_skew': self.title_skew,
+                'id_gap_rate': self.id_gap_rate, 'special_status_rate': self.special_status_rate,
+                'issued_rate': self.issued_rate}
+
+    @staticmethod
+    def word(rng: random.Random) -> str:
+        """Случайное слово из слогов"""
+        return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+    @staticmethod
+    def zipf_weights(size: int, skew: float) -> list[float]:
+        """Накопленные веса рангов 1..size по закону Ципфа для random.choices"""
+        return list(accumulate(1 / rank ** skew for rank in range(1, size + 1)))
+
+    def authors(self, rng: random.Random) -> list[str]:
+        """Авторы 'Инициал. Фамилия', примерно 20 книг на автора"""
+        return [f'{rng.choice(INITIALS)}. {self.word(rng).capitalize()}ов' for _ in range(max(10, self.count // 20))]
+
+    def books(self) -> list[main.Book]:
+        """Книги каталога по возрастанию номеров"""
+        rng = random.Random(self.seed)
+        authors = self.authors(rng)
+        vocabulary = list({self.word(rng) for _ in range(self.VOCABULARY_SIZE)})
+        vocabulary.sort()
+        rng.shuffle(vocabulary)  # порядок множества зависит от PYTHONHASHSEED
+        author_picks = rng.choices(authors, cum_weights=self.zipf_weights(len(authors), self.author_skew),
+                                   k=self.count)
+        word_weights = self.zipf_weights(len(vocabulary), self.title_skew)
+        books = []
+        id_ = 0
+        for author in author_picks:
+            id_ += 1
+            if rng.random() < self.id_gap_rate:
+                id_ += rng.randint(1, self.MAX_ID_GAP)
+            words = rng.choices(vocabulary, cum_weights=word_weights, k=rng.randint(1, self.MAX_TITLE_WORDS))
+            chance = rng.random()
+            if chance < self.special_status_rate:
+                status = rng.choice(SPECIAL_STATUSES)
+            elif chance < self.special_status_rate + self.issued_rate:
+                status = main.Book.STANDARD_STATUSES[1]
+            else:
+                status = main.Book.STANDARD_STATUSES[0]
+            books.append(main.Book(id_, ' '.join(words).capitalize(), author, rng.randint(*self.YEARS), status))
+        return books
+
+    def queries(self, books: list[main.Book], count: int = 100) -> list[dict]:
+        """Запросы find_book по книгам каталога: автор, слово заголовка, начало фамилии, опечатка, все поля"""
+        rng = random.Random(self.seed + 1)
+        queries = []
+        for number in range(count):
+            book = rng.choice(books)
+            surname = book.author.split()[-1]
+            kind = number % 5
+            if kind == 0:
+                queries.append({'author': book.author})
+            elif kind == 1:
+                queries.append({'title': rng.choice(book.title.split())})
+            elif kind == 2:
+                queries.append({'author': surname[:4]})
+            elif kind == 3:
+                queries.append({'author': surname[:2] + surname[3:]})
+            else:
+                queries.append({'title': book.title, 'author': book.author, 'year': book.year})
+        return queries
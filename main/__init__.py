@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""Система управления библиотекой.
+Подмодули загружаются при первом обращении к их именам (PEP 562): import main ничего не загружает,
+main.Book загружает только модель данных, без json, хранилищ, логера и интерфейса"""
+
+# имя -> подмодуль, в котором оно определено
+_SUBMODULES = {
+    'Book': 'model', 'IdAllocator': 'model', 'Library': 'model',
+    'TextIndex': 'search',
+    'OutputSink': 'output', 'TerminalSink': 'output', 'FileSink': 'output', 'BufferSink': 'output',
+    'MappedBookTable': 'columnar', 'StringTable': 'columnar', 'ColumnarBookStore': 'columnar',
+    'JsonConverter': 'storage', 'BookTransfer': 'storage', 'Journal': 'storage',
+    'Client': 'cli',
+    'LibraryServer': 'server',
+    'Metrics': 'metrics',
+    'ReadWriteLock': 'locks',
+    'LazyLogHandler': 'log', 'LOG_PATH': 'log', 'create_logger': 'log', 'logger': 'log',
+}
+__all__ = tuple(_SUBMODULES)
+
+
+def __getattr__(name: str):
+    """Импортирует подмодуль при первом обращении к имени из него и запоминает имя в пакете"""
+    module_name = _SUBMODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    # как from .module import name: импорт идёт обычным путём и виден в python -X importtime
+    value = getattr(__import__(module_name, globals(), None, (name,), 1), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""Запуск: python -m main [--data ФАЙЛ] [--save ФАЙЛ] [--batch КОМАНДЫ] [--serve АДРЕС]"""
+import os
+import json
+import logging
+import argparse
+
+from .cli import Client
+from .log import LOG_PATH, create_logger
+from .metrics import Metrics
+from .server import LibraryServer
+
+parser = argparse.ArgumentParser(prog='python -m main', description='Система управления библиотекой')
+parser.add_argument('--data', default='libraries.json', help='файл данных для загрузки')
+parser.add_argument('--save', help='файл сохранения, по умолчанию совпадает с файлом данных')
+parser.add_argument('--batch', metavar='COMMANDS', help='выполнить файл команд (JSON lines) без меню')
+parser.add_argument('--serve', metavar='ADDRESS',
+                    help="обслуживать клиентов по сети: 'хост:порт' или 'unix:путь' (JSON-запрос в строке)")
+parser.add_argument('--log-level', default='ERROR', choices=('DEBUG', 'INFO', 'WARNING', 'ERROR'),
+                    help='уровень логирования')
+parser.add_argument('--log-file', default=LOG_PATH, help='файл лога')
+parser.add_argument('--log-queue', action='store_true', help='писать лог из отдельного потока через очередь')
+parser.add_argument('--metrics', metavar='FILE', default=os.environ.get('LIBRARY_METRICS'),
+                    help='собирать метрики операций и записать их в FILE (JSON) при завершении')
+arguments = parser.parse_args()
+if arguments.metrics:
+    Metrics.enable(arguments.metrics)
+create_logger(getattr(logging, arguments.log_level), arguments.log_file, arguments.log_queue)
+save_path = arguments.save or arguments.data
+if arguments.serve:
+    LibraryServer.run(arguments.serve, arguments.data, save_path)
+elif arguments.batch:
+    for command_result in Client.run_batch(arguments.batch, arguments.data, save_path):
+        print(json.dumps(command_result, ensure_ascii=False))
+else:
+    Client.start(arguments.data, save_path)
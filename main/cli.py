@@ -0,0 +1,528 @@
+# -*- coding: utf-8 -*-
+"""Интерактивный и пакетный интерфейс"""
+import json
+import heapq
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Iterable, Iterator
+
+from .model import Book, Library
+from .output import OutputSink
+from .storage import JsonConverter, BookTransfer, Journal
+from .log import logger
+from .metrics import Metrics
+
+
+class Client:
+    """Класс для взаимодействия с пользователем"""
+    __libraries: tuple[Library, ...] = ()
+    __journal: Journal | None = None
+    __search_pool: ThreadPoolExecutor | None = None  # общий пул search_all с workers > 1, создаётся один раз
+    __search_pool_workers = 0
+    output: OutputSink = Library.output
+    SHOWN_REJECTS = 20  # сколько отклонённых строк импорта показать пользователю
+
+    @property
+    def libraries(self):
+        return __libraries
+
+    @classmethod
+    def start(cls, data_json_path: str, save_json_path: str, use_journal: bool = True):
+        """Mainloop, Функция запуска программы, управления меню"""
+        menu_options = ('ДОБАВЛЕНИЕ книги', 'УДАЛЕНИЕ книги', 'ПОИСК книги', 'Отображение ВСЕХ книг',
+                        'Стандартное изменение СТАТУСа книги', 'ВВЕСТИ нестандартный СТАТУС книги',
+                        'СМЕНИТЬ библиотеку', 'СОЗДАТЬ библиотеку', 'УДАЛИТЬ библиотеку', 'ЗАВЕРШИТЬ работу',
+                        'ИМПОРТ книг из CSV/JSONL', 'ЭКСПОРТ книг в CSV/JSONL',
+                        'ВЫБОРКА книг: диапазон годов, несколько значений, статус',
+                        'ПОИСК книги во ВСЕХ библиотеках',
+                        'Убери это, я - Программист (Остановить mainloop, посмотреть инкапсуляцию)')
+        print('[INFO] Система управления библиотекой запущена')
+        cls._load(data_json_path, save_json_path, use_journal)
+        if cls.__libraries:
+            cls.print_libraries()
+        else:
+            print('[INFO] В системе не содержится ни одной библиотеки')
+            cls._add_library(cls.create_library())
+        current_library: Library = cls.__libraries[0]
+        previous_choice = None
+        work = True
+        while work:
+            print(f'{'МЕНЮ':=^84}\n'
+                  f'[INFO] Работа с библиотекой \'{current_library.name}\'')
+            print('Введите цифру - номер требуемого действия:')
+            for option_number in range(len(menu_options)):
+                print(f'{option_number+1} - {menu_options[option_number]}')
+            print(f'{'':=^84}')
+            not_done = True
+            while not_done:
+                choice = input('>>> ')
+                logger.debug('Выбор действия, введено: %s', choice)
+                try:
+                    if isinstance(choice, float):
+                        raise ValueError
+                    choice = int(choice)
+                    if (choice < 1) or (choice > len(menu_options)):
+                        raise ValueError
+                    not_done = False
+                except ValueError:
+                    print(f'[WARNING] Нужно одно целое число от 1 до {len(menu_options)}. Повторите попытку.')
+                    continue
+            # noinspection PyUnboundLocalVariable
+            # время выбранного пункта меню вместе с ожиданием ввода пользователя, если метрики включены
+            with Metrics.measure(f'Client.start: {menu_options[choice - 1]}'):
+                match choice:
+                    case 1:  # Добавление книги
+                        current_library.add_book()
+                    case 2:  # Удаление книги
+                        if previous_choice != 4:  # Выведем первую страницу книг для удобства
+                            current_library.view_books_page()
+                        current_library.delete_book()
+                    case 3:  # Поиск книги
+                        title, author, year = cls.what_to_find()
+                        current_library.find_book(title, author, year)
+                    case 4:  # Отображение всех книг
+                        current_library.view_all_books(page_size=Library.PAGE_SIZE)
+                    case 5:  # Изменение статуса книги
+                        if previous_choice != 4:  # Выведем первую страницу книг для удобства
+                            current_library.view_books_page()
+                        current_library.change_book_status(want_to_print_it_yourself=False)
+                    case 6:  # Ввести нестандартный статус книги
+                        if previous_choice != 4:  # Выведем первую страницу книг для удобства
+                            current_library.view_books_page()
+                        current_library.change_book_status(want_to_print_it_yourself=True)
+                    case 7:  # Сменить библиотеку
+                        current_library = cls.change_library()
+                    case 8:  # Создать библиотеку
+                        current_library = cls._add_library(cls.create_library())
+                    case 9:  # Удалить библиотеку
+                        deleted_library = cls.delete_library()
+                        if deleted_library is current_library:
+                            if len(cls.__libraries) != 0:
+                                current_library = cls.__libraries[0]
+                            else:
+                                print('[WARNING] В системе не осталось библиотек')
+                                current_library = cls._add_library(cls.create_library())
+                    case 10:  # Завершить работу
+                        print('[INFO] Завершение работы')
+                        cls._save(save_json_path)
+                        work = False
+                        print('[INFO] Программа остановлена')
+                    case 11:  # Импорт книг
+                        cls.import_books(current_library)
+                    case 12:  # Экспорт книг
+                        cls.export_books(current_library)
+                    case 13:  # Выборка книг
+                        current_library.select_books(**cls.what_to_select())
+                    case 14:  # Поиск во всех библиотеках
+                        cls.find_book_everywhere(*cls.what_to_find())
+                    case 15:  # Отстань, я - Программист
+                        print('Обращение к тому, кто это читает:\n'
+                              'А можно мне пожалуйста в любом случае какой-то фитбек по коду?\n'
+                              'Не хватает вот этого самого код-ревью от более умных\n'
+                              'Хоть какой-то, можно матом.\n'
+                              'https://t.me/spirinis')
+                        if cls.__journal is not None:  # изменения сеанса останутся в журнале
+                            cls.__journal.close()
+                        work = False
+            previous_choice = choice
+
+    @classmethod
+    def _load(cls, data_json_path: str, save_json_path: str, use_journal: bool) -> None:
+        """Загрузит библиотеки, обновит данные старого формата и восстановит журнал"""
+        # Журнал относится к файлу сохранения. Если он остался от прерванного сеанса, данные берутся оттуда
+        if use_journal and Journal.exists(save_json_path):
+            data_json_path = save_json_path
+        data_format = JsonConverter.detect_format(data_json_path)
+        cls.__libraries = JsonConverter.load_libraries(data_json_path)
+        if cls.__libraries:
+            print(f'[INFO] Загружены данные из файла {data_json_path}')
+            if data_format == 1:
+                JsonConverter.migrate(cls.__libraries, data_json_path)
+        cls.__journal = cls._open_journal(data_json_path, save_json_path) if use_journal else None
+
+    @classmethod
+    def _save(cls, save_json_path: str) -> None:
+        """Сохранит все библиотеки. С журналом - контрольной точкой, после которой журнал пуст"""
+        if cls.__journal is not None:
+            cls.__journal.close(checkpoint=True)
+            cls.__journal = None
+            print(f'[INFO] Данные сохранены в файл \'{save_json_path}\'')
+        else:
+            JsonConverter.save_json(cls.__libraries, save_json_path)
+
+    @classmethod
+    def _open_journal(cls, data_json_path: str, save_json_path: str) -> Journal:
+        """Восстановит изменения из журнала прошлого сеанса и начнёт новый журнал"""
+        journal = Journal(save_json_path, lambda: cls.__libraries)
+        left_from_last_session = Journal.exists(save_json_path)
+        cls.__libraries = journal.replay(cls.__libraries)
+        journal.open()
+        # После сжатия журнал гарантированно продолжает снимок в файле сохранения
+        if left_from_last_session or data_json_path != save_json_path:
+            journal.compact()
+        for library in cls.__libraries:
+            journal.attach(library)
+        return journal
+
+    @classmethod
+    def _add_library(cls, library: Library) -> Library:
+        """Добавит библиотеку в систему и вернёт её"""
+        cls.__libraries += (library,)
+        if cls.__journal is not None:
+            cls.__journal.log_create_library(library)
+            cls.__journal.attach(library)
+        return library
+
+    @classmethod
+    def _remove_library(cls, index: int) -> Library:
+        """Удалит библиотеку по номеру в системе и вернёт её"""
+        libraries_list = list(cls.__libraries)
+        deleted_library = libraries_list.pop(index)
+        cls.__libraries = tuple(libraries_list)
+        if cls.__journal is not None:
+            cls.__journal.log_delete_library(index)
+        return deleted_library
+
+    @classmethod
+    def get_libraries(cls) -> tuple[Library, ...]:
+        """Вернёт библиотеки системы"""
+        return cls.__libraries
+
+    @classmethod
+    def find_library(cls, name: str) -> Library | None:
+        """Вернёт первую библиотеку с таким именем"""
+        for library in cls.__libraries:
+            if library.name == name:
+                return library
+        return None
+
+    @classmethod
+    def add_library(cls, name: str, columnar: bool = False) -> Library:
+        """Создаст библиотеку без вопросов пользователю и вернёт её"""
+        return cls._add_library(Library(name, columnar))
+
+    @classmethod
+    def remove_library(cls, name: str) -> Library | None:
+        """Удалит первую библиотеку с таким именем без подтверждения и вернёт её"""
+        for index, library in enumerate(cls.__libraries):
+            if library.name == name:
+                return cls._remove_library(index)
+        return None
+
+    @classmethod
+    def apply_command(cls, command: dict):
+        """Выполнит одну команду пакета и вернёт её результат. Ошибка в команде - исключение ValueError или KeyError"""
+        operation = command['op']
+        if operation == 'libraries':
+            return [{'name': library.name, 'books': len(library.stored_ids), 'columnar': library.columnar}
+                    for library in cls.__libraries]
+        if operation == 'create_library':
+            return cls.add_library(command['name'], command.get('columnar', False)).name
+        if operation == 'search_all':
+            found = cls.search_all(command.get('title'), command.get('author'), command.get('year'))
+            return {key: [{'library': library.name, **JsonConverter.book_to_record(book)} for library, book in hits]
+                    for key, hits in found.items()}
+        library_name = command['library']
+        if operation == 'delete_library':
+            if cls.remove_library(library_name) is None:
+                raise ValueError(f'Нет библиотеки \'{library_name}\'')
+            return library_name
+        library = cls.find_library(library_name)
+        if library is None:
+            raise ValueError(f'Нет библиотеки \'{library_name}\'')
+        match operation:
+            case 'add':
+                return [book.id for book in library.add_books(command['books'])]
+            case 'delete':
+                return [book.id for book in library.delete_books(command['ids'])]
+            case 'status':  # в JSON ключи словаря - строки
+                statuses = {int(id_): status for id_, status in command['statuses'].items()}
+                return [book.id for book in library.set_statuses(statuses)]
+            case 'import':
+                added, rejected = BookTransfer.import_books(library, command['path'])
+                return {'added': added, 'rejected': rejected}
+            case 'export':
+                return BookTransfer.export_books(library, command['path'])
+            case 'query':
+                conditions = {key: command[key] for key in ('title', 'author', 'year', 'year_from', 'year_to',
+                                                            'status') if command.get(key) is not None}
+                if command.get('count'):
+                    return library.query_count(**conditions)
+                return [JsonConverter.book_to_record(book) for book in library.query(**conditions)]
+            case 'search':
+                found = library.search(command.get('title'), command.get('author'), command.get('year'))
+                return {key: [JsonConverter.book_to_record(book) for book in books] for key, books in found.items()}
+        raise ValueError(f'Неизвестная команда \'{operation}\'')
+
+    @classmethod
+    def apply_commands(cls, commands: Iterable[dict | str]) -> Iterator[dict]:
+        """Выполнит команды по порядку. Команда - словарь или строка с JSON-объектом. Для каждой вернёт
+        {'line', 'op', 'result'} или {'line', 'op', 'error'}, ошибка одной команды, в том числе строка не JSON
+        или не объект, не останавливает пакет"""
+        for line_number, command in enumerate(commands, 1):
+            try:
+                command = cls.parse_command(command)
+                yield {'line': line_number, 'op': command['op'], 'result': cls.apply_command(command)}
+            except (KeyError, ValueError, TypeError, OSError) as error:
+                logger.debug('Команда %s не выполнена: %r', line_number, error)
+                yield {'line': line_number, 'op': command.get('op') if isinstance(command, dict) else None,
+                       'error': cls.command_error(error)}
+
+    @staticmethod
+    def parse_command(command: dict | str) -> dict:
+        """Вернёт команду-словарь. Строку разберёт как JSON, не объект - ValueError"""
+        if isinstance(command, str):
+            try:
+                command = json.loads(command)
+            except json.JSONDecodeError as error:
+                raise ValueError(f'Команда не JSON: {error}') from error
+        if not isinstance(command, dict):
+            raise ValueError('Команда должна быть JSON-объектом')
+        return command
+
+    @staticmethod
+    def command_error(error: Exception) -> str:
+        """Сообщение об ошибке команды для ответа"""
+        return f'Нет поля {error}' if isinstance(error, KeyError) else str(error)
+
+    @staticmethod
+    def read_commands(path: str) -> Iterator[str]:
+        """Прочитает файл команд: по одному JSON-объекту в строке, пустые строки пропускаются.
+        Строки разбирает apply_commands, поэтому испорченная строка становится ошибкой своей команды"""
+        with open(path, 'r', encoding=JsonConverter.ENCODING) as file:
+            for line in file:
+                if line.strip():
+                    yield line
+
+    @classmethod
+    def run_batch(cls, commands_path: str, data_json_path: str, save_json_path: str,
+                  use_journal: bool = True) -> list[dict]:
+        """Выполнит файл команд за один проход без меню, сохранит данные и вернёт результаты команд"""
+        cls._load(data_json_path, save_json_path, use_journal)
+        results = list(cls.apply_commands(cls.read_commands(commands_path)))
+        errors = sum('error' in result for result in results)
+        print(f'[INFO] Выполнено команд: {len(results) - errors}, с ошибкой: {errors}')
+        cls._save(save_json_path)
+        return results
+
+    @staticmethod
+    def _ask_transfer_path(action: str) -> str:
+        """Спросит путь к файлу CSV или JSON lines"""
+        while True:
+            path = input(f'Введите путь к файлу .csv или .jsonl для {action}\n>>> ')
+            logger.debug('Введено: %s', path)
+            try:
+                BookTransfer.file_format(path)
+                return path
+            except ValueError as error:
+                print(f'[WARNING] {error}. Повторите попытку.')
+
+    @classmethod
+    def import_books(cls, library: Library) -> None:
+        """Пользовательская функция. Добавит книги из файла CSV или JSON lines"""
+        print('[INFO] Импорт книг:')
+        path = cls._ask_transfer_path('импорта')
+        try:
+            added, rejected = BookTransfer.import_books(library, path)
+        except OSError as error:
+            print(f'[ERROR] Не удалось прочитать файл \'{path}\': {error.strerror}')
+            return
+        print(f'[INFO] Добавлено книг: {added}, отклонено строк: {len(rejected)}')
+        for line_number, reason in rejected[:cls.SHOWN_REJECTS]:
+            print(f'[WARNING] Строка {line_number}: {reason}')
+        if len(rejected) > cls.SHOWN_REJECTS:
+            print(f'[WARNING] ... и ещё {len(rejected) - cls.SHOWN_REJECTS}')
+
+    @classmethod
+    def export_books(cls, library: Library) -> None:
+        """Пользовательская функция. Запишет книги в файл CSV или JSON lines"""
+        print('[INFO] Экспорт книг:')
+        path = cls._ask_transfer_path('экспорта')
+        try:
+            exported = BookTransfer.export_books(library, path)
+        except OSError as error:
+            print(f'[ERROR] Не удалось записать файл \'{path}\': {error.strerror}')
+            return
+        print(f'[INFO] Книг записано в файл \'{path}\': {exported}')
+
+    @staticmethod
+    def what_to_find() -> tuple[str, str, int]:
+        """Функция интерфейса. Сформирует запрос для поиска книги"""
+        not_done = True
+        while not_done:
+            print('[INFO] Поиск книги:')
+            user_input_title = input("Введите заголовок книги или пустой ввод, если по заголовку не искать\n>>> ")
+            user_input_author = input("Введите имя автора книги или пустой ввод, если по автору не искать\n>>> ")
+            user_input_year = input("Введите год выпуска книги или пустой ввод, если по году выпуска не искать\n>>> ")
+            logger.debug('Введено: заголовок %s, автор %s, год %s',
+                         user_input_title, user_input_author, user_input_year)
+            if bool(user_input_year):
+                try:
+                    if type(user_input_year) is float:
+                        raise ValueError
+                    year = int(user_input_year)
+                    not_done = False
+                except ValueError:
+                    print('[WARNING] Год должен быть целым числом. Повторите попытку.')
+                    continue
+            else:
+                not_done = False
+                year = None
+        # noinspection PyUnboundLocalVariable
+        return user_input_title, user_input_author, year
+
+    @classmethod
+    def search_all(cls, title: str | None = None, author: str | None = None, year: int | None = None,
+                   workers: int = 1) -> dict[str, list[tuple[Library, Book]]]:
+        """Поиск во всех библиотеках без вывода. Поиск в каждой библиотеке идёт по её индексам,
+        результаты сливаются по ступеням совпадения: выше лучшая оценка, затем порядок библиотек и номер книги.
+        По умолчанию библиотеки обходятся по очереди: поиск занят процессором, и под GIL потоки его
+        только замедляют. С workers > 1 поиск идёт в общем пуле потоков, который не создаётся заново на каждый вызов"""
+        libraries = cls.__libraries
+        workers = min(workers, len(libraries))
+
+        def search(library: Library) -> dict[str, list[tuple[float, int, Book]]]:
+            return library.ranked_search(title, author, year)
+        if workers > 1:
+            per_library = list(cls._search_pool(workers).map(search, libraries))
+        else:
+            per_library = [search(library) for library in libraries]
+        results = {}
+        for key, _, _ in Library.SEARCH_TIERS:
+            if not any(key in found for found in per_library):
+                continue
+            merged = heapq.merge(*([(score, number, id_, library, book) for score, id_, book in found[key]]
+                                   for number, (library, found) in enumerate(zip(libraries, per_library))),
+                                 key=lambda hit: hit[:3])
+            results[key] = [(library, book) for _, _, _, library, book in merged]
+        return results
+
+    @classmethod
+    def _search_pool(cls, workers: int) -> ThreadPoolExecutor:
+        """Общий пул потоков поиска не меньше чем на workers потоков"""
+        if cls.__search_pool_workers < workers:
+            if cls.__search_pool is not None:
+                cls.__search_pool.shutdown(wait=False)
+            cls.__search_pool = ThreadPoolExecutor(workers, thread_name_prefix='search_all')
+            cls.__search_pool_workers = workers
+        return cls.__search_pool
+
+    @classmethod
+    def find_book_everywhere(cls, title: str = None, author: str = None, year: int = None) -> None:
+        """Пользовательская функция. Поиск введённой книги во всех библиотеках"""
+        print(f'[INFO] Поиск книги во всех библиотеках ({len(cls.__libraries)}):')
+        results = cls.search_all(title or None, author or None, year)
+        cls.output.write_lines(Library.tier_lines(
+            results, lambda hit: f'{hit[1].__str__()} - библиотека \'{hit[0].name}\''))
+        if not results:
+            print('[WARNING] Не задано ни одного условия поиска')
+
+    @staticmethod
+    def what_to_select() -> dict:
+        """Функция интерфейса. Сформирует условия выборки книг"""
+        print('[INFO] Выборка книг. Пустой ввод - условие не задано, несколько значений - через точку с запятой')
+        conditions = {}
+        for key, prompt in (('title', 'заголовки'), ('author', 'авторов')):
+            user_input = input(f'Введите {prompt}\n>>> ')
+            logger.debug('Введено: %s', user_input)
+            values = [value.strip() for value in user_input.split(';') if value.strip()]
+            if values:
+                conditions[key] = values
+        while True:
+            user_input = input('Введите годы через точку с запятой или диапазон вида 1990..2010, ..1950, 2000..\n>>> ')
+            logger.debug('Введено: %s', user_input)
+            try:
+                if '..' in user_input:
+                    year_from, year_to = (value.strip() for value in user_input.split('..'))
+                    if year_from:
+                        conditions['year_from'] = int(year_from)
+                    if year_to:
+                        conditions['year_to'] = int(year_to)
+                else:
+                    years = [int(value) for value in user_input.split(';') if value.strip()]
+                    if years:
+                        conditions['year'] = years
+                break
+            except ValueError:
+                conditions.pop('year_from', None)
+                print('[WARNING] Годы должны быть целыми числами. Повторите попытку.')
+        user_input = input(f'Введите статусы, например: {"; ".join(Book.STANDARD_STATUSES)}\n>>> ')
+        logger.debug('Введено: %s', user_input)
+        statuses = [value.strip() for value in user_input.split(';') if value.strip()]
+        if statuses:
+            conditions['status'] = statuses
+        return conditions
+
+    @classmethod
+    def print_libraries(cls) -> None:
+        """Пользовательская функция. Выведет список библиотек"""
+        print('[INFO] В системе содержатся следующие библиотеки:')
+        cls.output.write_lines(f'{library_number:>5} ' + library.__str__()
+                               for library_number, library in enumerate(cls.__libraries, 1))
+
+    @classmethod
+    def change_library(cls) -> Library:
+        """Пользовательская функция. Установит выбранную библиотеку текущей"""
+        print('[INFO] Выбор библиотеки:')
+        cls.print_libraries()
+        not_done = True
+        while not_done:
+            user_input_number = input("Введите номер требуемой библиотеки\n>>> ")
+            logger.debug('Введено: %s', user_input_number)
+            try:
+                if type(user_input_number) is float:
+                    raise ValueError
+                number = int(user_input_number)
+                if (number < 1) or (number > len(cls.__libraries)):
+                    raise ValueError
+                not_done = False
+            except ValueError:
+                print(f'[WARNING] Номер должен быть целым числом в диапазоне от 1 до {len(cls.__libraries)}.'
+                      f' Повторите попытку.')
+                continue
+        # noinspection PyUnboundLocalVariable
+        return cls.__libraries[number - 1]
+
+    @staticmethod
+    def create_library() -> Library:
+        """Пользовательская функция. Создаст библиотеку"""
+        print('[INFO] Создание библиотеки:')
+        library_name = input('Введите имя новой библиотеки\n>>> ')
+        logger.debug('Введено: %s', library_name)
+        library: Library = Library(library_name)
+        print(f'[INFO] Библиотека \'{library.name}\' создана:')
+        return library
+
+    @classmethod
+    def delete_library(cls) -> Library | None:
+        """Пользовательская функция. Удалит библиотеку"""
+        print('[INFO] Выбор библиотеки:')
+        cls.print_libraries()
+        not_done = True
+        while not_done:
+            user_input_number = input("Введите номер удаляемой библиотеки\n>>> ")
+            logger.debug('Введено: %s', user_input_number)
+            try:
+                if type(user_input_number) is float:
+                    raise ValueError
+                number = int(user_input_number)
+                if (number < 1) or (number > len(cls.__libraries)):
+                    raise ValueError
+                not_done = False
+            except ValueError:
+                print(f'[WARNING] Номер должен быть целым числом в диапазоне от 1 до {len(cls.__libraries)}.'
+                      f' Повторите попытку.')
+                continue
+        # noinspection PyUnboundLocalVariable
+        number -= 1
+        print(f'[WARNING] Вы удаляете библиотеку: \'{cls.__libraries[number].name}\'\n'
+              f'Подтвердить - пустой ввод/Y/y\n'
+              f'Отменить - всё остальное')
+        answer = input('>>> ')
+        logger.debug('Введено: %s', answer)
+        if answer in ('', 'Y', 'y'):
+            deleted_library = cls._remove_library(number)
+            print(f'[INFO] {deleted_library.__str__()} удалена')
+            return deleted_library
+        else:
+            print(f'[INFO] Библиотека не удалена')
+            return None
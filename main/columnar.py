@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""Колоночное хранилище и таблица книг двоичного снимка для очень больших библиотек"""
+import mmap
+import struct
+from array import array
+from collections.abc import ValuesView, ItemsView, Iterable, Iterator, Mapping, MutableMapping
+
+from .model import Book
+
+INT32_MIN, INT32_MAX = -2 ** 31, 2 ** 31 - 1  # номер и год хранятся 32-битными целыми: array('i') и RECORD
+
+
+class MappedBookTable(Mapping):
+    """Класс таблицы книг двоичного снимка, отображённого в память. Mapping id -> Book только для чтения.
+    Запись: id, год, код статуса, смещение и длина заголовка, смещение и длина автора в пуле строк"""
+    RECORD = struct.Struct('<iiIIIII')
+    ROW = struct.Struct('<I')  # элемент перестановки строк по возрастанию id
+
+    class Values(ValuesView):
+        def __iter__(self) -> Iterator[Book]:
+            table = self._mapping
+            for row in range(len(table)):
+                yield table.book_at(row)
+
+    class Items(ItemsView):
+        def __iter__(self) -> Iterator[tuple[int, Book]]:
+            table = self._mapping
+            for row in range(len(table)):
+                book = table.book_at(row)
+                yield book.id, book
+
+    def __init__(self, buffer: mmap.mmap, count: int, records_offset: int, order_offset: int,
+                 pool_offset: int, statuses: tuple[str, ...]) -> None:
+        self.__buffer = buffer
+        self.__count = count
+        self.__records_offset = records_offset
+        self.__order_offset = order_offset
+        self.__pool_offset = pool_offset
+        self.__statuses = statuses
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def __iter__(self) -> Iterator[int]:
+        for row in range(self.__count):
+            yield self._id_at(row)
+
+    def __contains__(self, id_) -> bool:
+        return self._find_row(id_) >= 0
+
+    def __getitem__(self, id_: int) -> Book:
+        row = self._find_row(id_)
+        if row < 0:
+            raise KeyError(id_)
+        return self.book_at(row)
+
+    def values(self) -> ValuesView:
+        return self.Values(self)
+
+    def items(self) -> ItemsView:
+        return self.Items(self)
+
+    def _id_at(self, row: int) -> int:
+        return struct.unpack_from('<i', self.__buffer, self.__records_offset + row * self.RECORD.size)[0]
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self.__pool_offset + offset
+        return str(self.__buffer[start:start + length], 'utf-8')
+
+    def _find_row(self, id_: int) -> int:
+        """Двоичный поиск строки по id в перестановке, отсортированной по id. -1, если книги нет"""
+        low, high = 0, self.__count
+        while low < high:
+            middle = (low + high) // 2
+            row = self.ROW.unpack_from(self.__buffer, self.__order_offset + middle * self.ROW.size)[0]
+            row_id = self._id_at(row)
+            if row_id == id_:
+                return row
+            if row_id < id_:
+                low = middle + 1
+            else:
+                high = middle
+        return -1
+
+    def book_at(self, row: int) -> Book:
+        """Создаст книгу из строки таблицы"""
+        id_, year, status, title_offset, title_length, author_offset, author_length = self.RECORD.unpack_from(
+            self.__buffer, self.__records_offset + row * self.RECORD.size)
+        return Book(id_, self._string(title_offset, title_length), self._string(author_offset, author_length),
+                    year, self.__statuses[status])
+
+    def iter_index_fields(self) -> Iterator[tuple[int, str, str, int, str]]:
+        """Пройдёт по (id, заголовок, автор, год, статус) всех строк, не создавая книги"""
+        strings: dict[int, str] = {}  # авторы повторяются, декодируем каждую строку пула один раз
+        for id_, year, status, title_offset, title_length, author_offset, author_length in self.RECORD.iter_unpack(
+                self.__buffer[self.__records_offset:self.__records_offset + self.__count * self.RECORD.size]):
+            author = strings.get(author_offset)
+            if author is None:
+                author = strings[author_offset] = self._string(author_offset, author_length)
+            yield id_, self._string(title_offset, title_length), author, year, self.__statuses[status]
+
+
+class StringTable:
+    """Класс таблицы уникальных строк: каждая строка хранится один раз, на неё ссылаются по номеру"""
+    __slots__ = ('__strings', '__numbers')
+
+    def __init__(self) -> None:
+        self.__strings: list[str] = []
+        self.__numbers: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.__strings)
+
+    def __getitem__(self, number: int) -> str:
+        return self.__strings[number]
+
+    def add(self, string: str) -> int:
+        """Вернёт номер строки, добавив её, если её ещё нет"""
+        number = self.__numbers.get(string)
+        if number is None:
+            number = self.__numbers[string] = len(self.__strings)
+            self.__strings.append(string)
+        return number
+
+
+class ColumnarBookStore(MutableMapping):
+    """Класс поколоночного хранилища книг: MutableMapping id -> Book без объекта на каждую книгу.
+    id и годы лежат в array, статусы, заголовки и авторы - номерами в таблицах уникальных строк.
+    Book создаётся при каждом обращении, изменения книги нужно записывать обратно через store[id] = book"""
+    DELETED = 0xFFFF  # код статуса удалённой строки, строки уплотняются, когда удалённых больше половины
+    SPARSE_LIMIT = 1024  # номера сильно больше числа книг хранятся в dict, а не в массиве строк по номеру
+
+    class Values(ValuesView):
+        def __iter__(self) -> Iterator[Book]:
+            store = self._mapping
+            for row in store.iter_rows():
+                yield store.book_at(row)
+
+    class Items(ItemsView):
+        def __iter__(self) -> Iterator[tuple[int, Book]]:
+            store = self._mapping
+            for row in store.iter_rows():
+                book = store.book_at(row)
+                yield book.id, book
+
+    def __init__(self, items: Iterable[tuple[int, Book]] = ()) -> None:
+        self.__ids = array('i')
+        self.__years = array('i')
+        self.__statuses = array('H')
+        self.__titles = array('I')
+        self.__authors = array('I')
+        self.__status_table = StringTable()
+        self.__title_table = StringTable()
+        self.__author_table = StringTable()
+        self.__row_by_id = array('i')  # номер книги -> строка, -1 - книги нет
+        self.__sparse_rows: dict[int, int] = {}
+        self.__deleted = 0
+        for id_, book in items:
+            self[id_] = book
+
+    def __len__(self) -> int:
+        return len(self.__ids) - self.__deleted
+
+    def __iter__(self) -> Iterator[int]:
+        for row in self.iter_rows():
+            yield self.__ids[row]
+
+    def __contains__(self, id_) -> bool:
+        return self._row(id_) >= 0
+
+    def __getitem__(self, id_: int) -> Book:
+        row = self._row(id_)
+        if row < 0:
+            raise KeyError(id_)
+        return self.book_at(row)
+
+    def __setitem__(self, id_: int, book: Book) -> None:
+        if not (0 < id_ <= INT32_MAX and INT32_MIN <= book.year <= INT32_MAX):  # до изменения любой колонки
+            raise ValueError(f'Номер {id_} или год {book.year} не помещается в колоночное хранилище')
+        status = self.__status_table.add(book.status)
+        assert status < self.DELETED, 'Слишком много разных статусов для колоночного хранилища'
+        row = self._row(id_)
+        if row >= 0:
+            self.__years[row] = book.year
+            self.__statuses[row] = status
+            self.__titles[row] = self.__title_table.add(book.title)
+            self.__authors[row] = self.__author_table.add(book.author)
+            return
+        self._set_row(id_, len(self.__ids))
+        self.__ids.append(id_)
+        self.__years.append(book.year)
+        self.__statuses.append(status)
+        self.__titles.append(self.__title_table.add(book.title))
+        self.__authors.append(self.__author_table.add(book.author))
+
+    def __delitem__(self, id_: int) -> None:
+        row = self._row(id_)
+        if row < 0:
+            raise KeyError(id_)
+        self.__statuses[row] = self.DELETED
+        self._set_row(id_, -1)
+        self.__deleted += 1
+        if self.__deleted > self.SPARSE_LIMIT and self.__deleted * 2 > len(self.__ids):
+            self._compact()
+
+    def values(self) -> ValuesView:
+        return self.Values(self)
+
+    def items(self) -> ItemsView:
+        return self.Items(self)
+
+    def _row(self, id_: int) -> int:
+        if 0 <= id_ < len(self.__row_by_id):
+            return self.__row_by_id[id_]
+        return self.__sparse_rows.get(id_, -1)
+
+    def _set_row(self, id_: int, row: int) -> None:
+        """Запишет строку книги с номером id_ (номера положительны, это проверяет __setitem__), -1 - удалит запись"""
+        row_by_id = self.__row_by_id
+        if id_ < len(row_by_id):
+            row_by_id[id_] = row
+        elif row >= 0 and id_ <= 2 * len(self.__ids) + self.SPARSE_LIMIT:
+            new_length = max(id_ + 1, 2 * len(row_by_id))
+            row_by_id.extend(array('i', [-1]) * (new_length - len(row_by_id)))
+            for sparse_id in [sparse_id for sparse_id in self.__sparse_rows if sparse_id < new_length]:
+                row_by_id[sparse_id] = self.__sparse_rows.pop(sparse_id)
+            row_by_id[id_] = row
+        else:
+            self._set_sparse_row(id_, row)
+
+    def _set_sparse_row(self, id_: int, row: int) -> None:
+        if row >= 0:
+            self.__sparse_rows[id_] = row
+        else:
+            self.__sparse_rows.pop(id_, None)
+
+    def _compact(self) -> None:
+        """Уберёт удалённые строки и неиспользуемые строки таблиц"""
+        items = list(self.items())
+        self.__init__(items)
+
+    def iter_rows(self) -> Iterator[int]:
+        """Пройдёт по номерам строк неудалённых книг в порядке добавления"""
+        statuses = self.__statuses
+        deleted = self.DELETED
+        for row in range(len(statuses)):
+            if statuses[row] != deleted:
+                yield row
+
+    def book_at(self, row: int) -> Book:
+        """Создаст книгу из строки хранилища"""
+        return Book(self.__ids[row], self.__title_table[self.__titles[row]], self.__author_table[self.__authors[row]],
+                    self.__years[row], self.__status_table[self.__statuses[row]])
+
+    def iter_index_fields(self) -> Iterator[tuple[int, str, str, int, str]]:
+        """Пройдёт по (id, заголовок, автор, год, статус) всех книг, не создавая их"""
+        for row in self.iter_rows():
+            yield (self.__ids[row], self.__title_table[self.__titles[row]], self.__author_table[self.__authors[row]],
+                   self.__years[row], self.__status_table[self.__statuses[row]])
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""Блокировка читателей и писателей для многопоточной работы с библиотекой"""
+import threading
+from collections.abc import Callable
+
+
+class LockContext:
+    """Контекст захвата и освобождения блокировки. Состояние хранит блокировка, поэтому один объект
+    служит всем потокам и вложенным захватам"""
+    __slots__ = ('__acquire', '__release')
+
+    def __init__(self, acquire: Callable[[], None], release: Callable[[], None]) -> None:
+        self.__acquire = acquire
+        self.__release = release
+
+    def __enter__(self) -> None:
+        self.__acquire()
+
+    def __exit__(self, *exc_info) -> None:
+        self.__release()
+
+
+class ReadWriteLock:
+    """Класс блокировки читателей и писателей: читать могут несколько потоков одновременно, писать - один поток,
+    когда никто не читает. Ожидающий писатель не пропускает новых читателей, поэтому поток чтений
+    не откладывает запись бесконечно. Повторный вход разрешён: писатель может снова писать и читать,
+    читатель - снова читать. Переход от чтения к записи - RuntimeError: два таких потока ждали бы друг друга"""
+
+    def __init__(self) -> None:
+        self.__condition = threading.Condition(threading.Lock())
+        self.__readers: dict[int, int] = {}  # поток -> глубина вложенных чтений
+        self.__writer: int | None = None
+        self.__write_depth = 0
+        self.__waiting_writers = 0
+        self.__read = LockContext(self.acquire_read, self.release_read)
+        self.__write = LockContext(self.acquire_write, self.release_write)
+
+    def acquire_read(self) -> None:
+        me = threading.get_ident()
+        with self.__condition:
+            depth = self.__readers.get(me)
+            if depth is None and self.__writer != me:
+                while self.__writer is not None or self.__waiting_writers:
+                    self.__condition.wait()
+            self.__readers[me] = (depth or 0) + 1
+
+    def release_read(self) -> None:
+        me = threading.get_ident()
+        with self.__condition:
+            depth = self.__readers[me] - 1
+            if depth:
+                self.__readers[me] = depth
+                return
+            del self.__readers[me]
+            if not self.__readers:
+                self.__condition.notify_all()
+
+    def acquire_write(self) -> None:
+        me = threading.get_ident()
+        with self.__condition:
+            if self.__writer == me:
+                self.__write_depth += 1
+                return
+            if me in self.__readers:
+                raise RuntimeError('Запись внутри чтения того же потока невозможна')
+            self.__waiting_writers += 1
+            try:
+                while self.__writer is not None or self.__readers:
+                    self.__condition.wait()
+            finally:
+                self.__waiting_writers -= 1
+            self.__writer = me
+            self.__write_depth = 1
+
+    def release_write(self) -> None:
+        with self.__condition:
+            if self.__writer != threading.get_ident():
+                raise RuntimeError('Поток не держит блокировку записи')
+            self.__write_depth -= 1
+            if not self.__write_depth:
+                self.__writer = None
+                self.__condition.notify_all()
+
+    def read(self) -> LockContext:
+        """Контекст чтения: with lock.read(): ..."""
+        return self.__read
+
+    def write(self) -> LockContext:
+        """Контекст записи: with lock.write(): ..."""
+        return self.__write
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Логер модуля: обработчики создаются при первой записи"""
+import os
+import logging
+
+
+class LazyLogHandler(logging.Handler):
+    """Обработчик-заглушка логера. Вывод в консоль и файл создаётся при первой пропущенной уровнем записи,
+    поэтому импорт модуля не открывает и не обрезает файл лога. С use_queue записи уходят через очередь
+    в отдельный поток QueueListener, и запись в файл не задерживает вызывающий код"""
+    FORMAT = '%(asctime)s | %(levelname)s | %(funcName)s() | %(message)s'
+
+    def __init__(self, path: str | None, use_queue: bool = False):
+        super().__init__(logging.DEBUG)
+        self.__path = path
+        self.__use_queue = use_queue
+        self.__handlers: list[logging.Handler] | None = None
+        self.__listener = None
+
+    @property
+    def path(self) -> str | None:
+        """Путь к файлу лога, None - только консоль"""
+        return self.__path
+
+    def _build_handlers(self) -> list[logging.Handler]:
+        """Создание обработчиков консоли и файла (каталог лога создаётся при необходимости)"""
+        formatter = logging.Formatter(self.FORMAT)
+        stream_handler = logging.StreamHandler()
+        stream_handler.setLevel(logging.DEBUG)
+        stream_handler.setFormatter(formatter)
+        handlers = [stream_handler]
+        if self.__path is not None:
+            directory = os.path.dirname(self.__path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            file_handler = logging.FileHandler(filename=self.__path, mode='w', encoding='utf-8')
+            file_handler.setLevel(logging.INFO)
+            file_handler.setFormatter(formatter)
+            handlers.append(file_handler)
+        if not self.__use_queue:
+            return handlers
+        import atexit
+        import queue
+        from logging.handlers import QueueHandler, QueueListener
+        records = queue.SimpleQueue()
+        self.__listener = QueueListener(records, *handlers, respect_handler_level=True)
+        self.__listener.start()
+        atexit.register(self.close)
+        return [QueueHandler(records)]
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # handle() вызывает emit под блокировкой обработчика, обработчики создаются один раз
+        if self.__handlers is None:
+            self.__handlers = self._build_handlers()
+        for handler in self.__handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def flush(self) -> None:
+        """Дождаться записи очереди и сбросить файлы"""
+        if self.__listener is not None:
+            self.__listener.stop()
+            self.__listener.start()
+        for handler in self.__handlers or ():
+            handler.flush()
+
+    def close(self) -> None:
+        """Остановка потока очереди и закрытие файла"""
+        if self.__listener is not None:
+            self.__listener.stop()
+            for handler in self.__listener.handlers:
+                handler.close()
+            self.__listener = None
+        for handler in self.__handlers or ():
+            handler.close()
+        self.__handlers = None
+        super().close()
+
+
+LOG_PATH = os.environ.get('LIBRARY_LOG_PATH', os.path.join('logs', 'main.log'))
+
+
+def create_logger(level: int, path: str | None = LOG_PATH, use_queue: bool = False) -> logging.Logger:
+    """Создание и настройка логера. Повторный вызов заменяет прежнюю настройку.
+    Файл path открывается только при первой записи уровня level и выше"""
+    logger_ = logging.getLogger(__package__)
+    logger_.setLevel(level)
+    for handler in logger_.handlers[:]:
+        logger_.removeHandler(handler)
+        handler.close()
+    logger_.addHandler(LazyLogHandler(path, use_queue))
+    return logger_
+
+
+logger = create_logger(logging.ERROR, use_queue=os.environ.get('LIBRARY_LOG_QUEUE') == '1')
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""Необязательные метрики операций: счётчики, гистограммы задержек, байты чтения и записи, книги в секунду"""
+import os
+import threading
+import contextlib
+from time import perf_counter
+from functools import wraps
+from collections.abc import Callable
+
+
+class Histogram:
+    """Гистограмма задержек. Корзина k хранит замеры от 2^(k-1) до 2^k микросекунд, квантили оцениваются
+    по верхней границе корзины, поэтому память и время записи не зависят от числа замеров"""
+    BUCKETS = 40
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self) -> None:
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.counts[min(int(seconds * 1e6).bit_length(), self.BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля в секундах, не больше наибольшего замера"""
+        rank = q * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min((1 << bucket) / 1e6, self.max)
+        return self.max
+
+
+class OperationStats:
+    """Накопленные метрики одной операции"""
+    __slots__ = ('histogram', 'errors', 'bytes_read', 'bytes_written', 'books', 'books_seconds')
+
+    def __init__(self) -> None:
+        self.histogram = Histogram()
+        self.errors = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.books = 0
+        self.books_seconds = 0.0  # время операций, которые сообщили число книг
+
+    def snapshot(self) -> dict:
+        histogram = self.histogram
+        snapshot = {'count': histogram.count, 'errors': self.errors, 'total_s': round(histogram.total, 6),
+                    'mean_ms': round(histogram.total / histogram.count * 1000, 4) if histogram.count else 0.0,
+                    'p50_ms': round(histogram.quantile(0.5) * 1000, 4),
+                    'p95_ms': round(histogram.quantile(0.95) * 1000, 4),
+                    'p99_ms': round(histogram.quantile(0.99) * 1000, 4),
+                    'max_ms': round(histogram.max * 1000, 4),
+                    'histogram_us': {f'<{1 << bucket}': count
+                                     for bucket, count in enumerate(histogram.counts) if count}}
+        if self.bytes_read:
+            snapshot['bytes_read'] = self.bytes_read
+        if self.bytes_written:
+            snapshot['bytes_written'] = self.bytes_written
+        if self.books:
+            snapshot['books'] = self.books
+            snapshot['books_per_s'] = round(self.books / self.books_seconds) if self.books_seconds else None
+        return snapshot
+
+
+class Metrics:
+    """Класс необязательных метрик. По умолчанию выключены, и методы работают без обёрток, то есть без затрат.
+    enable() подменяет методы из TARGETS обёртками с замером, disable() возвращает исходные.
+    Операции называются 'Класс.метод', выбор пункта меню - 'Client.start: пункт'"""
+    # подмодуль пакета, класс, методы
+    TARGETS = (('model', 'Library', ('load', 'load_mapped', '_find_book_by_id', '_ensure_indexes', 'add_books',
+                                     'insert_books', 'delete_books', 'set_statuses', 'search', 'query',
+                                     'query_count', 'page', 'find_book', 'select_books', 'view_all_books',
+                                     'view_books_page')),
+               ('storage', 'JsonConverter', ('load_libraries', 'open_json', 'open_binary', 'save_json',
+                                             'write_snapshot')),
+               ('storage', 'BookTransfer', ('import_books', 'export_books')))
+    # метод, читающий или пишущий файл: имя -> (параметр с путём, 'read' или 'write')
+    FILE_ARGUMENTS = {'load_libraries': ('path', 'read'), 'open_json': ('path', 'read'),
+                      'open_binary': ('path', 'read'), 'save_json': ('path', 'write'),
+                      'write_snapshot': ('path', 'write'), 'import_books': ('path', 'read'),
+                      'export_books': ('path', 'write')}
+    # метод загрузки: имя -> число загруженных книг по аргументам и результату
+    BOOK_COUNTS: dict[str, Callable[[tuple, object], int]] = {
+        'load': lambda arguments, _: len(arguments[0].stored_ids),
+        'load_mapped': lambda arguments, _: len(arguments[0].stored_ids),
+        'load_libraries': lambda _, libraries: sum(len(library.stored_ids) for library in libraries),
+        'open_binary': lambda _, libraries: sum(len(library.stored_ids) for library in libraries),
+        'import_books': lambda _, result: result[0]}
+    __enabled = False
+    __stats: dict[str, OperationStats] = {}
+    __lock = threading.Lock()
+    __originals: list[tuple[type, str, object]] = []  # класс, имя, исходный атрибут из __dict__ класса
+    __dump_path: str | None = None
+    __null = contextlib.nullcontext()
+
+    @classmethod
+    def enabled(cls) -> bool:
+        return cls.__enabled
+
+    @classmethod
+    def enable(cls, dump_path: str | None = None) -> None:
+        """Включит метрики. С dump_path снимок метрик запишется в этот файл JSON при завершении программы"""
+        if dump_path is not None:
+            if cls.__dump_path is None:
+                import atexit
+                atexit.register(cls._dump_at_exit)
+            cls.__dump_path = dump_path
+        if cls.__enabled:
+            return
+        from importlib import import_module
+        for module_name, class_name, method_names in cls.TARGETS:
+            owner = getattr(import_module(f'.{module_name}', __package__), class_name)
+            for name in method_names:
+                original = owner.__dict__[name]
+                cls.__originals.append((owner, name, original))
+                setattr(owner, name, cls._instrument(f'{class_name}.{name}', name, original))
+        cls.__enabled = True
+
+    @classmethod
+    def disable(cls) -> None:
+        """Выключит метрики и вернёт исходные методы. Накопленные метрики сохраняются до reset()"""
+        while cls.__originals:
+            owner, name, original = cls.__originals.pop()
+            setattr(owner, name, original)
+        cls.__enabled = False
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls.__lock:
+            cls.__stats = {}
+
+    @staticmethod
+    def file_size(path: str) -> int:
+        """Размер файла данных вместе с частями снимка, 0 - файла нет"""
+        from .storage import JsonConverter
+        try:
+            size = os.path.getsize(path)
+            if path.endswith(JsonConverter.MANIFEST_EXTENSION):
+                size += sum(map(os.path.getsize, JsonConverter.shard_paths(path)))
+            return size
+        except (OSError, ValueError):
+            return 0
+
+    @classmethod
+    def _instrument(cls, operation: str, name: str, original):
+        """Обёртка метода (в том числе classmethod и staticmethod) с замером"""
+        kind = type(original) if isinstance(original, (classmethod, staticmethod)) else None
+        function = original.__func__ if kind is not None else original
+        file_argument = cls.FILE_ARGUMENTS.get(name)
+        count_books = cls.BOOK_COUNTS.get(name)
+        path_index = None
+        if file_argument is not None:
+            code = function.__code__
+            path_index = code.co_varnames[:code.co_argcount].index(file_argument[0])
+        record = cls.record
+        file_size = cls.file_size
+
+        @wraps(function)
+        def wrapper(*arguments, **keywords):
+            path = None
+            if path_index is not None:
+                path = keywords.get(file_argument[0], arguments[path_index] if path_index < len(arguments) else None)
+            bytes_read = file_size(path) if path is not None and file_argument[1] == 'read' else 0
+            started = perf_counter()
+            try:
+                result = function(*arguments, **keywords)
+            except BaseException:
+                record(operation, perf_counter() - started, error=True)
+                raise
+            elapsed = perf_counter() - started
+            record(operation, elapsed, bytes_read=bytes_read,
+                   bytes_written=file_size(path) if path is not None and file_argument[1] == 'write' else 0,
+                   books=count_books(arguments, result) if count_books is not None else 0)
+            return result
+        return kind(wrapper) if kind is not None else wrapper
+
+    @classmethod
+    def record(cls, operation: str, seconds: float, error: bool = False, bytes_read: int = 0,
+               bytes_written: int = 0, books: int = 0) -> None:
+        """Запишет замер операции"""
+        with cls.__lock:
+            stats = cls.__stats.get(operation)
+            if stats is None:
+                stats = cls.__stats[operation] = OperationStats()
+            stats.histogram.add(seconds)
+            stats.errors += error
+            stats.bytes_read += bytes_read
+            stats.bytes_written += bytes_written
+            if books:
+                stats.books += books
+                stats.books_seconds += seconds
+
+    @classmethod
+    def measure(cls, operation: str) -> contextlib.AbstractContextManager:
+        """Контекст замера участка кода. При выключенных метриках - общий пустой контекст"""
+        if not cls.__enabled:
+            return cls.__null
+        return cls._measure(operation)
+
+    @classmethod
+    @contextlib.contextmanager
+    def _measure(cls, operation: str):
+        started = perf_counter()
+        try:
+            yield
+        except BaseException:
+            cls.record(operation, perf_counter() - started, error=True)
+            raise
+        cls.record(operation, perf_counter() - started)
+
+    @classmethod
+    def snapshot(cls) -> dict[str, dict]:
+        """Снимок метрик: операция -> счётчики, задержки в миллисекундах, байты, книги в секунду"""
+        with cls.__lock:
+            return {operation: stats.snapshot() for operation, stats in sorted(cls.__stats.items())}
+
+    @classmethod
+    def dump(cls, path: str) -> None:
+        """Запишет снимок метрик в файл JSON"""
+        import json
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(cls.snapshot(), file, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def _dump_at_exit(cls) -> None:
+        if cls.__dump_path is not None and cls.__stats:
+            cls.dump(cls.__dump_path)
@@ -0,0 +1,854 @@
+# -*- coding: utf-8 -*-
+"""Модель данных: книга, выдача номеров, библиотека"""
+import sys
+import heapq
+import bisect
+from collections import OrderedDict
+from collections.abc import KeysView, ValuesView, Iterable, Iterator, Callable, Mapping, MutableMapping
+
+from .search import TextIndex
+from .output import OutputSink, TerminalSink
+
+TYPE_CHECKING = False  # как typing.TYPE_CHECKING, но без импорта typing при загрузке модели
+if TYPE_CHECKING:
+    from .columnar import MappedBookTable
+    from .locks import ReadWriteLock
+
+
+class Book:
+    """Класс работы с типом данных книга"""
+    # Статусы и авторы интернируются: одинаковые строки всех книг хранятся одним объектом
+    STANDARD_STATUSES = tuple(map(sys.intern, ('в наличии', 'выдана')))
+    __slots__ = ('__id', '__title', '__author', '__year', '__status')
+
+    def __init__(self, id_: int, title: str, author: str, year: int, status: str | None = None) -> None:
+        self.__id: int = id_
+        self.__title: str = title
+        self.__author: str = sys.intern(author)
+        self.__year: int = year
+        if status:
+            self.__status: str = sys.intern(status)
+        else:
+            self.__status: str = self.STANDARD_STATUSES[0]
+
+    def __repr__(self) -> str:
+        return f'Book({self.__title}, {self.__author}, {self.__year}, {self.__status})'
+
+    def __str__(self) -> str:
+        return (f'{self.__id:>5}: Книга \'{self.__title}\' автора \'{self.__author}\''
+                f' {self.__year} года: {self.__status}')
+
+    def __eq__(self, other):
+        if not isinstance(other, Book):
+            return False
+        return (self.__id == other.__id and self.__title == other.__title and
+                self.__author == other.__author and self.__year == other.__year)
+
+    def __hash__(self):
+        return hash(self.__str__())
+
+    @property
+    def id(self) -> int:
+        return self.__id
+
+    @property
+    def title(self) -> str:
+        return self.__title
+
+    @property
+    def author(self) -> str:
+        return self.__author
+
+    @property
+    def year(self) -> int:
+        return self.__year
+
+    @property
+    def status(self) -> str:
+        return self.__status
+
+    def _set_status(self, status: str) -> None:
+        """Установит статус без вопросов пользователю. Для восстановления из журнала"""
+        self.__status = sys.intern(status)
+
+    def change_standard_status(self) -> None:
+        """Меняет статус книги с 'в наличии' на 'выдана' и обратно"""
+        if self.__status in self.STANDARD_STATUSES:
+            if self.__status == self.STANDARD_STATUSES[0]:
+                self.__status = self.STANDARD_STATUSES[1]
+            elif self.__status == self.STANDARD_STATUSES[1]:
+                self.__status = self.STANDARD_STATUSES[0]
+            print('[INFO] Статус изменён:')
+        else:
+            print('[WARNING] У книги не стандартный статус. Операция не произведена')
+        print(f'[INFO] {self.__str__()}')
+
+    def set_special_status(self) -> None:
+        """Меняет статус книги на введённый, переспрашивает, если ввели не статус 'в наличии' или 'выдана'"""
+        from .log import logger  # logging импортируется только для диалогов с пользователем
+        status = input('Введите новый статус\n>>> ')
+        logger.debug('Введено: %s', status)
+        if status not in self.STANDARD_STATUSES:
+            print(f'[WARNING] Вы устанавливаете не стандартный статус: {status}\n'
+                  f'Подтвердить - пустой ввод/Y/y\n'
+                  f'Отменить - всё остальное')
+            answer = input('>>> ')
+            logger.debug('Введено: %s', answer)
+            if answer in ('', 'Y', 'y'):
+                self.__status = sys.intern(status)
+                print(f'[INFO] Статус \'{status}\' установлен')
+            else:
+                print(f'[INFO] Статус не изменён')
+                return
+        else:
+            self.__status = sys.intern(status)
+            print(f'[INFO] Статус {status} установлен')
+
+
+class IdAllocator:
+    """Класс выдачи номеров книг: сначала заполняет пропуски по возрастанию, затем продолжает нумерацию.
+    Наименьший свободный номер не больше числа книг плюс один, поэтому пропуски хранятся только
+    до этой границы, и память и время не зависят от величины номеров"""
+    def __init__(self) -> None:
+        self.__low: int = 0  # каждый номер до __low включительно занят или лежит в куче свободных
+        self.__free: list[int] = []  # min-куча освободившихся номеров не больше __low
+        self.__free_set: set[int] = set()  # актуальные элементы кучи, остальные считаются удалёнными
+        self.__above: set[int] = set()  # занятые номера больше __low
+
+    def rebuild(self, used_ids: Iterable[int]) -> None:
+        """Пересоберёт состояние по занятым номерам за линейное время от числа книг"""
+        used = set(used_ids)
+        self.__low = min(len(used) + 1, max(used, default=0))
+        self.__free = [id_ for id_ in range(1, self.__low + 1) if id_ not in used]
+        # список уже отсортирован, а значит является кучей, heapify не нужен
+        self.__free_set = set(self.__free)
+        self.__above = {id_ for id_ in used if id_ > self.__low}
+
+    def allocate(self) -> int:
+        """Выдаст наименьший свободный номер за O(log n), граница пропусков сдвигается за амортизированное O(1)"""
+        while self.__free:
+            id_ = heapq.heappop(self.__free)
+            if id_ in self.__free_set:
+                self.__free_set.remove(id_)
+                return id_
+        self.__low += 1
+        while self.__low in self.__above:
+            self.__above.remove(self.__low)
+            self.__low += 1
+        return self.__low
+
+    def reserve(self, id_: int) -> None:
+        """Отметит занятым номер, назначенный не через allocate"""
+        if id_ > self.__low:
+            self.__above.add(id_)
+        else:
+            self.__free_set.discard(id_)  # элемент кучи станет устаревшим и будет пропущен
+
+    def release(self, id_: int) -> None:
+        """Вернёт номер в пул свободных за O(log n)"""
+        if id_ > self.__low:
+            self.__above.discard(id_)
+        elif 0 < id_ and id_ not in self.__free_set:
+            heapq.heappush(self.__free, id_)
+            self.__free_set.add(id_)
+
+
+class Library:
+    """Класс для работы с типом данных библиотека"""
+    # Ступени выдачи поиска: ключ результата search(), заголовок найденного, сообщение об отсутствии
+    SEARCH_TIERS = (('full', 'Полное совпадение:', 'Нет полных совпадений'),
+                    ('title_author', 'Совпадения заголовка и автора:', 'Нет совпадений заголовка и автора'),
+                    ('title_year', 'Совпадения заголовка и года:', 'Нет совпадений заголовка и года'),
+                    ('author_year', 'Совпадения автора и года:', 'Нет совпадений автора и года'),
+                    ('title', 'Совпадения заголовка:', 'Нет совпадений заголовка'),
+                    ('author', 'Совпадения автора:', 'Нет совпадений автора'),
+                    ('year', 'Совпадения года:', 'Нет совпадений года'))
+    SORT_KEYS = ('id', 'title', 'author', 'year', 'status')
+    PAGE_SIZE = 20
+    SEARCH_CACHE_SIZE = 256  # сколько последних запросов поиска помнить, 0 - без кеша
+    SEARCH_CACHE_BYTES = 64 * 2 ** 20  # память под результаты в кеше поиска, больший результат не кешируется
+    # Примерная память одной найденной книги в кеше: кортеж (-оценка, номер, книга), оценка и место в списке.
+    # Сами книги общие с библиотекой и не считаются
+    CACHED_HIT_BYTES = 100
+    output: OutputSink = TerminalSink()  # куда выводят списки и результаты поиска, можно заменить у экземпляра
+    # Блокировки методов в потокобезопасном режиме: 'read' - общая для читателей, 'write' - исключительная,
+    # 'mutex' - для состояния, которое читатели строят лениво (индексы, кеш поиска)
+    THREAD_SAFE_METHODS = {'_find_book_by_id': 'read', 'ranked_search': 'read', 'search': 'read', 'query': 'read',
+                           'query_count': 'read', 'page': 'read', 'snapshot_books': 'read',
+                           'load': 'write', 'load_mapped': 'write', 'add_books': 'write', 'insert_books': 'write',
+                           'delete_books': 'write', 'set_statuses': 'write', 'subscribe': 'write',
+                           '_insert_book': 'write', '_remove_book': 'write', '_set_book_status': 'write',
+                           '_ensure_indexes': 'mutex', '_cached_search': 'mutex', '_cache_search': 'mutex',
+                           'clear_search_cache': 'mutex'}
+
+    def __init__(self, name: str, columnar: bool = False, thread_safe: bool = False) -> None:
+        self.__name = name
+        self.__columnar = columnar
+        # id -> книга, порядок вставки сохраняется для вывода списка книг. Хранилище - dict
+        # или ColumnarBookStore для очень больших библиотек. После load_mapped здесь таблица
+        # только для чтения, заменяемая основным хранилищем при первом изменении
+        self.__books: Mapping[int, Book] = self._new_store()
+        self.__id_allocator = IdAllocator()
+        self.__indexed = True  # построены ли вторичные индексы
+        # вторичные индексы: слова заголовка и автора -> номера книг, год -> номера книг, статус -> номера книг
+        self.__title_index = TextIndex()
+        self.__author_index = TextIndex()
+        self.__year_index: dict[int, set[int]] = {}
+        self.__years: list[int] = []  # различные годы по возрастанию, для выборки диапазона двоичным поиском
+        self.__status_index: dict[str, set[int]] = {}
+        # подписчики на изменения: вызываются как callback(библиотека, операция, данные)
+        self.__observers: list[Callable[[Library, str, dict], None]] = []
+        # Номер версии книг: растёт при каждом изменении. Кеш поиска (нормализованные заголовок, автор, год ->
+        # результат ranked_search) действителен, пока версия не изменилась
+        self.__generation = 0
+        self.__search_cache: OrderedDict[tuple, dict] = OrderedDict()
+        self.__search_cache_generation = 0
+        self.__search_cache_bytes = 0  # примерная память результатов в кеше
+        self.__search_cache_hits = 0
+        self.__search_cache_misses = 0
+        self.__snapshot: tuple[int, tuple[Book, ...]] | None = None  # версия и книги последнего снимка
+        self.__lock: 'ReadWriteLock | None' = None
+        self.__mutex = None
+        if thread_safe:
+            self.make_thread_safe()
+
+    def __str__(self) -> str:
+        count = len(self.__books)
+        output_str = f'Библиотека {self.__name}, содержащая {count}'
+        if count == 1:
+            return f'{output_str} книгу'
+        elif count in (2, 3, 4):
+            return f'{output_str} книги'
+        else:
+            return f'{output_str} книг'
+
+    def __repr__(self) -> str:
+        return f'Library({self.__name})'
+
+    def __getstate__(self) -> dict:
+        """Состояние для pickle при передаче между процессами: без индексов, они строятся при первом поиске,
+        и без подписчиков. Копия в другом процессе не потокобезопасна: блокировки не передаются"""
+        state = self.__dict__.copy()
+        for name in self.THREAD_SAFE_METHODS:
+            state.pop(name, None)
+        state['_Library__lock'] = state['_Library__mutex'] = state['_Library__snapshot'] = None
+        state['_Library__title_index'] = TextIndex()
+        state['_Library__author_index'] = TextIndex()
+        state['_Library__year_index'] = {}
+        state['_Library__years'] = []
+        state['_Library__status_index'] = {}
+        state['_Library__indexed'] = False
+        state['_Library__observers'] = []
+        state['_Library__search_cache'] = OrderedDict()
+        state['_Library__search_cache_bytes'] = 0
+        return state
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @property
+    def columnar(self) -> bool:
+        return self.__columnar
+
+    @property
+    def thread_safe(self) -> bool:
+        return self.__lock is not None
+
+    @property
+    def stored_ids(self) -> KeysView[int]:
+        return self.__books.keys()
+
+    @property
+    def stored_books(self) -> ValuesView[Book]:
+        return self.__books.values()
+
+    @property
+    def generation(self) -> int:
+        """Номер версии книг библиотеки, растёт при каждом изменении"""
+        return self.__generation
+
+    @property
+    def search_cache_info(self) -> dict[str, int]:
+        """Попадания и промахи кеша поиска, число запомненных запросов, примерная память результатов и пределы"""
+        return {'hits': self.__search_cache_hits, 'misses': self.__search_cache_misses,
+                'size': len(self.__search_cache), 'max_size': self.SEARCH_CACHE_SIZE,
+                'bytes': self.__search_cache_bytes, 'max_bytes': self.SEARCH_CACHE_BYTES}
+
+    def clear_search_cache(self) -> None:
+        """Очистит кеш поиска и его счётчики"""
+        self.__search_cache.clear()
+        self.__search_cache_bytes = 0
+        self.__search_cache_hits = self.__search_cache_misses = 0
+
+    def make_thread_safe(self) -> None:
+        """Включит потокобезопасный режим: поиск и чтение идут из нескольких потоков одновременно, изменения -
+        по одному и не во время чтения. Статус меняется у копии книги, поэтому книги из snapshot_books()
+        и результатов поиска не меняются, и их вывод не держит блокировку.
+        Методы из THREAD_SAFE_METHODS у экземпляра заменяются обёртками с блокировкой, у остальных библиотек
+        методы остаются без обёрток"""
+        if self.__lock is not None:
+            return
+        import threading
+        from .locks import ReadWriteLock
+        self.__lock = ReadWriteLock()
+        self.__mutex = threading.Lock()
+        contexts = {'read': self.__lock.read, 'write': self.__lock.write, 'mutex': lambda: self.__mutex}
+        for name, kind in self.THREAD_SAFE_METHODS.items():
+            setattr(self, name, self._locked(name, contexts[kind]))
+
+    def _locked(self, name: str, context: Callable) -> Callable:
+        """Метод экземпляра под блокировкой. Метод берётся из класса при вызове, поэтому обёртки Metrics
+        включаются и выключаются как обычно"""
+        owner = type(self)
+
+        def locked(*arguments, **keywords):
+            with context():
+                return getattr(owner, name)(self, *arguments, **keywords)
+        locked.__name__ = name
+        return locked
+
+    def subscribe(self, callback: Callable[['Library', str, dict], None]) -> None:
+        """Подпишет callback на изменения библиотеки: 'add', 'delete', 'status'"""
+        self.__observers.append(callback)
+
+    def _notify(self, operation: str, data: dict) -> None:
+        """Сообщит подписчикам об изменении. Любое изменение делает недействительным кеш поиска"""
+        self.__generation += 1
+        for callback in self.__observers:
+            callback(self, operation, data)
+
+    def _new_store(self, items: Iterable[tuple[int, Book]] = ()) -> MutableMapping[int, Book]:
+        """Основное хранилище книг. Модуль колоночного хранилища импортируется только для колоночных библиотек"""
+        if not self.__columnar:
+            return dict(items)
+        from .columnar import ColumnarBookStore
+        return ColumnarBookStore(items)
+
+    def _make_writable(self) -> None:
+        """Перенесёт книги из таблицы только для чтения в основное хранилище перед первым изменением"""
+        if isinstance(self.__books, MutableMapping):
+            return
+        items = self.__books.items()
+        self.__books = self._new_store(items)
+        self.__id_allocator.rebuild(self.__books)
+
+    def _ensure_indexes(self) -> None:
+        """Построит вторичные индексы, если их ещё нет. Книги для этого не создаются.
+        В потокобезопасном режиме также доделает отложенную работу текстовых индексов, чтобы одновременные
+        поиски только читали их"""
+        if self.__lock is not None:
+            self.__title_index.prepare()
+            self.__author_index.prepare()
+        if self.__indexed:
+            return
+        for id_, title, author, year, status in self._iter_fields():
+            self.__title_index.add(id_, title)
+            self.__author_index.add(id_, author)
+            self.__year_index.setdefault(year, set()).add(id_)
+            self.__status_index.setdefault(status, set()).add(id_)
+        self.__years = sorted(self.__year_index)
+        self.__indexed = True
+
+    @staticmethod
+    def _check_book(book: Book) -> None:
+        """Проверит типы полей книги до изменения хранилища и индексов. Ошибка - ValueError"""
+        if not (type(book.id) is int and isinstance(book.title, str) and isinstance(book.author, str)
+                and type(book.year) is int and isinstance(book.status, str)):
+            raise ValueError(f'Некорректная книга: {book!r}')
+
+    def _insert_book(self, book: Book) -> None:
+        """Запишет книгу с уже назначенным номером. Книга с некорректными полями не записывается никуда"""
+        self._check_book(book)
+        self._make_writable()
+        self.__books[book.id] = book
+        self.__id_allocator.reserve(book.id)
+        if self.__indexed:
+            self._index_book(book)
+        self._notify('add', {'book': book})
+
+    def _remove_book(self, id_: int) -> Book:
+        """Удалит книгу по номеру и вернёт её"""
+        self._make_writable()
+        book = self.__books.pop(id_)
+        self.__id_allocator.release(id_)
+        if self.__indexed:
+            self._unindex_book(book)
+        self._notify('delete', {'id': id_})
+        return book
+
+    def _set_book_status(self, id_: int, status: str) -> Book:
+        """Установит статус книги без вопросов пользователю и вернёт книгу"""
+        self._make_writable()
+        book = self.__books[id_]
+        if self.__lock is not None:  # книга могла попасть в снимок или результат поиска другого потока
+            book = Book(book.id, book.title, book.author, book.year, book.status)
+        old_status = book.status
+        book._set_status(status)
+        self._store_status(book, old_status)
+        return book
+
+    def _store_status(self, book: Book, old_status: str) -> None:
+        """Запишет изменённый статус книги в хранилище и индекс статусов и сообщит подписчикам"""
+        self.__books[book.id] = book  # ColumnarBookStore выдаёт книги-копии, статус записывается обратно
+        if self.__indexed and book.status != old_status:
+            self._discard_from_index(self.__status_index, old_status, book.id)
+            self.__status_index.setdefault(book.status, set()).add(book.id)
+        self._notify('status', {'id': book.id, 'status': book.status})
+
+    def _index_book(self, book: Book) -> None:
+        """Добавит книгу во вторичные индексы"""
+        self.__title_index.add(book.id, book.title)
+        self.__author_index.add(book.id, book.author)
+        if book.year not in self.__year_index:
+            bisect.insort(self.__years, book.year)
+        self.__year_index.setdefault(book.year, set()).add(book.id)
+        self.__status_index.setdefault(book.status, set()).add(book.id)
+
+    def _unindex_book(self, book: Book) -> None:
+        """Уберёт книгу из вторичных индексов, удаляя опустевшие ключи"""
+        self.__title_index.remove(book.id, book.title)
+        self.__author_index.remove(book.id, book.author)
+        if self._discard_from_index(self.__year_index, book.year, book.id):
+            del self.__years[bisect.bisect_left(self.__years, book.year)]
+        self._discard_from_index(self.__status_index, book.status, book.id)
+
+    @staticmethod
+    def _discard_from_index(index: dict, key, id_: int) -> bool:
+        """Уберёт номер из множества индекса. Вернёт True, если ключ опустел и удалён"""
+        ids = index.get(key)
+        if ids is None:
+            return False
+        ids.discard(id_)
+        if ids:
+            return False
+        del index[key]
+        return True
+
+    @staticmethod
+    def _ask_id_input() -> int:
+        """Спросит у пользователя и вернёт id"""
+        from .log import logger  # logging импортируется только для диалогов с пользователем
+        not_done = True
+        while not_done:
+            id_ = input('Введите номер книги\n>>> ')
+            logger.debug('Введено: %s', id_)
+            try:
+                if isinstance(id_, float):
+                    raise ValueError
+                id_ = int(id_)
+                not_done = False
+            except ValueError:
+                print('[WARNING] Нужно одно целое число. Повторите попытку.')
+                continue
+        # noinspection PyUnboundLocalVariable
+        return id_
+
+    def _find_book_by_id(self, id_: int) -> Book | None:
+        """Вернёт книгу с введённым id"""
+        book = self.__books.get(id_)
+        if book is not None:
+            return book
+        else:
+            print(f'[WARNING] Книги с номером {id_} нет в этой библиотеке')
+            return None
+
+    def load(self, books_to_load: Iterable[Book]) -> None:
+        """Запишет в библиотеку книги из списка"""
+        assert len(self.__books) == 0, f'{self.__str__()} не пуста в момент загрузки'
+        books = self._new_store()
+        for book in books_to_load:
+            assert book.id not in books, f"Дублирование номеров книг в момент загрузки библиотеки {self.__name}"
+            books[book.id] = book
+        self.__books = books
+        self.__generation += 1
+        self.__id_allocator.rebuild(books)
+        if self.__columnar:  # индексы колоночной библиотеки строятся при первом поиске
+            self.__indexed = False
+        else:
+            for book in books.values():
+                self._index_book(book)
+
+    def load_mapped(self, table: 'MappedBookTable') -> None:
+        """Подключит таблицу книг двоичного снимка. Книги создаются только при обращении к ним,
+        индексы строятся при первом поиске, полная загрузка происходит при первом изменении"""
+        assert len(self.__books) == 0, f'{self.__str__()} не пуста в момент загрузки'
+        self.__books = table
+        self.__generation += 1
+        self.__indexed = False
+
+    def _match_ids(self, title: str | None, author: str | None, year: int | None) -> dict[str, dict[int, float]]:
+        """Разложит номера найденных книг с оценками по ступеням совпадения. Номер попадает только в первую
+        подходящую ступень, в словаре есть только ступени, применимые к запросу"""
+        # Номера берутся из индексов, а не из полного обхода библиотеки
+        self._ensure_indexes()
+        by_title, by_author, by_year = bool(title), bool(author), year is not None  # ибо bool(0) = False
+        tms = self.__title_index.match(title) if by_title else {}
+        ams = self.__author_index.match(author) if by_author else {}
+        yms = dict.fromkeys(self.__year_index.get(year, ()), 1.0) if by_year else {}
+        matches = {}
+        found = set()
+        for key, fields in (('full', (tms, ams, yms) if by_title and by_author and by_year else None),
+                            ('title_author', (tms, ams) if by_title and by_author else None),
+                            ('title_year', (tms, yms) if by_title and by_year else None),
+                            ('author_year', (ams, yms) if by_author and by_year else None),
+                            ('title', (tms,) if by_title else None),
+                            ('author', (ams,) if by_author else None),
+                            ('year', (yms,) if by_year else None)):
+            if fields is None:
+                continue
+            if len(fields) == 1:  # одно поле - без сумм и проверок по другим полям
+                matches[key] = {id_: score for id_, score in fields[0].items() if id_ not in found}
+            else:
+                smallest = min(fields, key=len)
+                matches[key] = {id_: sum(field[id_] for field in fields) for id_ in smallest.keys() - found
+                                if all(id_ in field for field in fields)}
+            found.update(matches[key])
+        return matches
+
+    def ranked_search(self, title: str | None = None, author: str | None = None,
+                      year: int | None = None) -> dict[str, list[tuple[float, int, Book]]]:
+        """Поиск без вывода с оценками. Вернёт по ступеням совпадения списки (-оценка, номер, книга)
+        по возрастанию: поле, совпавшее с запросом целиком, поднимает книгу выше.
+        Повторный запрос, в том числе в другом регистре, отдаётся из кеша, пока библиотека не изменилась.
+        Результат общий с кешем, изменять его нельзя"""
+        title_query = TextIndex.normalize(title) if title else None
+        author_query = TextIndex.normalize(author) if author else None
+        key = (title_query, author_query, year)
+        results = self._cached_search(key)
+        if results is not None:
+            return results
+        results = {}
+        for tier, scores in self._match_ids(title, author, year).items():
+            ranked = []
+            for id_, score in scores.items():
+                book = self.__books[id_]
+                if title_query is not None:
+                    score += TextIndex.normalize(book.title) == title_query
+                if author_query is not None:
+                    score += TextIndex.normalize(book.author) == author_query
+                ranked.append((-score, id_, book))
+            ranked.sort(key=lambda item: item[:2])
+            results[tier] = ranked
+        self._cache_search(key, results)
+        return results
+
+    def _cached_search(self, key: tuple) -> dict | None:
+        """Результат поиска из кеша или None. Кеш прошлой версии библиотеки сбрасывается"""
+        cache = self.__search_cache
+        if self.__search_cache_generation != self.__generation:
+            cache.clear()
+            self.__search_cache_bytes = 0
+            self.__search_cache_generation = self.__generation
+        results = cache.get(key)
+        if results is None:
+            self.__search_cache_misses += 1
+            return None
+        cache.move_to_end(key)
+        self.__search_cache_hits += 1
+        return results
+
+    def _cache_search(self, key: tuple, results: dict) -> None:
+        """Запомнит результат поиска, вытесняя давно не запрошенные. Два читателя, одновременно не нашедшие
+        запрос в кеше, вычислят его оба: второй результат не запоминается, иначе память записи учлась бы дважды"""
+        cache = self.__search_cache
+        if key in cache:
+            cache.move_to_end(key)
+            return
+        size = self._cached_size(results)
+        if self.SEARCH_CACHE_SIZE > 0 and size <= self.SEARCH_CACHE_BYTES:
+            cache[key] = results
+            self.__search_cache_bytes += size
+            while len(cache) > self.SEARCH_CACHE_SIZE or self.__search_cache_bytes > self.SEARCH_CACHE_BYTES:
+                _, evicted = cache.popitem(last=False)
+                self.__search_cache_bytes -= self._cached_size(evicted)
+
+    @classmethod
+    def _cached_size(cls, results: dict) -> int:
+        """Примерная память результата поиска в кеше"""
+        return cls.CACHED_HIT_BYTES * sum(map(len, results.values()))
+
+    def search(self, title: str | None = None, author: str | None = None,
+               year: int | None = None) -> dict[str, list[Book]]:
+        """Поиск без вывода. Вернёт книги по ступеням совпадения (ключи как в SEARCH_TIERS).
+        В ступени выше стоят книги с лучшей оценкой совпадения, при равенстве книги упорядочены по номеру"""
+        return {key: [book for _, _, book in ranked]
+                for key, ranked in self.ranked_search(title, author, year).items()}
+
+    @staticmethod
+    def _values(value) -> tuple:
+        """Одно значение условия выборки или список значений - кортежем"""
+        return (value,) if isinstance(value, (str, int)) else tuple(value)
+
+    def _range_years(self, year_from: int | None, year_to: int | None) -> list[int]:
+        """Различные годы книг в диапазоне с границами включительно, двоичным поиском границ"""
+        low = 0 if year_from is None else bisect.bisect_left(self.__years, year_from)
+        high = len(self.__years) if year_to is None else bisect.bisect_right(self.__years, year_to)
+        return self.__years[low:high]
+
+    def _year_range_ids(self, year_from: int | None, year_to: int | None,
+                        candidates: set[int] | None = None) -> set[int]:
+        """Номера книг с годом в диапазоне с границами включительно: двоичный поиск границ
+        в списке различных годов, затем объединение множеств только подходящих годов.
+        Если кандидатов меньше, чем книг в диапазоне, дешевле проверить год у кандидатов"""
+        years = self._range_years(year_from, year_to)
+        if candidates is not None and len(candidates) < sum(len(self.__year_index[year]) for year in years):
+            low_year = years[0] if years else 0
+            high_year = years[-1] if years else -1
+            return {id_ for id_ in candidates if low_year <= self.__books[id_].year <= high_year}
+        return set().union(*(self.__year_index[year] for year in years))
+
+    def _query_ids(self, title: str | Iterable[str] | None, author: str | Iterable[str] | None,
+                   year: int | Iterable[int] | None, year_from: int | None, year_to: int | None,
+                   status: str | Iterable[str] | None) -> set[int] | None:
+        """Номера книг, удовлетворяющих всем заданным условиям, или None, если условий нет"""
+        self._ensure_indexes()
+        conditions = []
+        if title is not None:
+            conditions.append(set().union(*(self.__title_index.match(value) for value in self._values(title))))
+        if author is not None:
+            conditions.append(set().union(*(self.__author_index.match(value) for value in self._values(author))))
+        if year is not None:
+            conditions.append(set().union(*(self.__year_index.get(value, ()) for value in self._values(year))))
+        if status is not None:
+            conditions.append(set().union(*(self.__status_index.get(value, ()) for value in self._values(status))))
+        if year_from is not None or year_to is not None:
+            conditions.append(self._year_range_ids(year_from, year_to, min(conditions, key=len, default=None)))
+        if not conditions:
+            return None
+        conditions.sort(key=len)
+        return conditions[0].intersection(*conditions[1:])
+
+    def query(self, title: str | Iterable[str] | None = None, author: str | Iterable[str] | None = None,
+              year: int | Iterable[int] | None = None, year_from: int | None = None, year_to: int | None = None,
+              status: str | Iterable[str] | None = None) -> list[Book]:
+        """Выборка без вывода: книги, удовлетворяющие всем заданным условиям, по возрастанию номера.
+        title, author, year и status принимают значение или список значений (подходит любое из них),
+        year_from и year_to - границы диапазона годов включительно.
+        Заголовок и автор сравниваются как в search: по словам, началу слов и с опечатками.
+        Стоимость растёт с числом найденных книг k (O(k log k) на сортировку и создание книг), поэтому
+        для широкого диапазона годов, если нужно только число книг, дешевле query_count"""
+        ids = self._query_ids(title, author, year, year_from, year_to, status)
+        if ids is None:
+            return sorted(self.__books.values(), key=lambda book: book.id)
+        return [self.__books[id_] for id_ in sorted(ids)]
+
+    def query_count(self, title: str | Iterable[str] | None = None, author: str | Iterable[str] | None = None,
+                    year: int | Iterable[int] | None = None, year_from: int | None = None,
+                    year_to: int | None = None, status: str | Iterable[str] | None = None) -> int:
+        """Число книг, которые вернула бы query с теми же условиями. Книги не создаются и не сортируются.
+        Диапазон годов без других условий считается по размерам множеств годов за O(log n + число годов)"""
+        if title is None and author is None and year is None and status is None:
+            self._ensure_indexes()
+            return sum(len(self.__year_index[year]) for year in self._range_years(year_from, year_to))
+        return len(self._query_ids(title, author, year, year_from, year_to, status))
+
+    def snapshot_books(self) -> tuple[Book, ...]:
+        """Книги на момент вызова в порядке хранения. Снимок словаря книг запоминается до следующего изменения,
+        и повторный вызов его не копирует"""
+        snapshot = self.__snapshot
+        if snapshot is not None and snapshot[0] == self.__generation:
+            return snapshot[1]
+        books = tuple(self.__books.values())
+        if isinstance(self.__books, dict):  # колоночное хранилище и снимок на диске выдают новые книги каждый раз
+            self.__snapshot = (self.__generation, books)
+        return books
+
+    def _iter_fields(self) -> Iterator[tuple[int, str, str, int, str]]:
+        """Пройдёт по (id, заголовок, автор, год, статус) всех книг. Колоночное хранилище и двоичный снимок
+        не создают для этого книги"""
+        if isinstance(self.__books, dict):
+            return ((book.id, book.title, book.author, book.year, book.status) for book in self.__books.values())
+        return self.__books.iter_index_fields()
+
+    def _page_keys_by_year(self, count: int, cursor: tuple | None) -> list[tuple]:
+        """Ключи (год, номер) первых count книг после курсора: годы идут по индексу, внутри года - по номеру"""
+        start = 0 if cursor is None else bisect.bisect_left(self.__years, cursor[0])
+        keys = []
+        for year in self.__years[start:]:
+            after = cursor[1] if cursor is not None and year == cursor[0] else None
+            keys += heapq.nsmallest(count - len(keys), ((year, id_) for id_ in self.__year_index[year]
+                                                        if after is None or id_ > after))
+            if len(keys) == count:
+                break
+        return keys
+
+    def page(self, page_size: int = PAGE_SIZE, sort_key: str = 'id',
+             cursor: tuple | None = None) -> tuple[list[Book], tuple | None]:
+        """Страница книг без вывода, по возрастанию sort_key, затем номера. cursor - курсор, который вернула
+        предыдущая страница, None - первая страница. Вернёт книги страницы и курсор следующей или None,
+        если страница последняя. Вся библиотека не сортируется: выбираются page_size наименьших после курсора"""
+        if sort_key not in self.SORT_KEYS:
+            raise ValueError(f'Сортировка возможна по {", ".join(self.SORT_KEYS)}')
+        if page_size < 1:
+            raise ValueError('Размер страницы должен быть положительным')
+        count = page_size + 1  # лишняя книга показывает, что есть следующая страница
+        if sort_key == 'id':
+            keys = heapq.nsmallest(count, ((id_,) for id_ in self.__books if cursor is None or (id_,) > cursor))
+        elif sort_key == 'year' and self.__indexed:  # ради одной страницы индексы не строятся
+            keys = self._page_keys_by_year(count, cursor)
+        else:
+            field = self.SORT_KEYS.index(sort_key)
+            normalize = TextIndex.normalize if sort_key != 'year' else int
+            keys = heapq.nsmallest(count, (key for key in ((normalize(fields[field]), fields[0])
+                                                           for fields in self._iter_fields())
+                                           if cursor is None or key > cursor))
+        next_cursor = keys[page_size - 1] if len(keys) > page_size else None
+        return [self.__books[key[-1]] for key in keys[:page_size]], next_cursor
+
+    def add_books(self, books: Iterable[tuple]) -> list[Book]:
+        """Добавит книги из кортежей (заголовок, автор, год) или (заголовок, автор, год, статус)
+        и вернёт созданные книги. Книги до ошибочного кортежа остаются добавленными"""
+        self._make_writable()
+        created = []
+        for title, author, year, *status in books:
+            # поля проверяются до выдачи номера, чтобы ошибочный кортеж не занял его
+            if (isinstance(year, float) or len(status) > 1
+                    or not all(isinstance(value, str) for value in (title, author, *filter(None, status)))):
+                raise ValueError(f'Некорректная книга: {(title, author, year, *status)}')
+            year = int(year)
+            # Заполняем пропуски в нумерации от 1, затем продолжаем её
+            book = Book(self.__id_allocator.allocate(), title, author, year, *status)
+            self._insert_book(book)
+            created.append(book)
+        return created
+
+    def insert_books(self, books: Iterable[Book]) -> list[Book]:
+        """Добавит книги с уже назначенными номерами и вернёт их. Занятый номер - ValueError"""
+        inserted = []
+        for book in books:
+            if book.id in self.__books:
+                raise ValueError(f'Номер {book.id} уже занят')
+            self._insert_book(book)
+            inserted.append(book)
+        return inserted
+
+    def delete_books(self, ids: Iterable[int]) -> list[Book]:
+        """Удалит книги по номерам и вернёт удалённые. Отсутствующие номера пропускаются"""
+        return [self._remove_book(id_) for id_ in ids if id_ in self.__books]
+
+    def set_statuses(self, statuses: Mapping[int, str]) -> list[Book]:
+        """Установит статусы книгам {номер: статус} и вернёт изменённые книги. Отсутствующие номера пропускаются"""
+        return [self._set_book_status(id_, status) for id_, status in statuses.items() if id_ in self.__books]
+
+    def add_book(self) -> None:
+        """Пользовательская функция. Добавляет введённую книгу в библиотеку"""
+        from .log import logger  # logging импортируется только для диалогов с пользователем
+        not_done = True
+        while not_done:
+            print('[INFO] Добавление книги:')
+            user_input = input("Введите через запятую и пробел или через запятую:"
+                               " заголовок, автор, год выпуска книги\n>>> ")
+            logger.debug('Введено: %s', user_input)
+            # попытка считывания входных данных через запятую и пробел, запятую
+            try:
+                split_user_input = user_input.split(', ')
+                if len(split_user_input) not in (3, 4):
+                    split_user_input = user_input.split(',')
+                title, author, year, *some = split_user_input
+                logger.debug('split на: %s %s %s и отброшено: %s', title, author, year, some)
+                # обработка ввода с разделителем в конце
+                if some not in ([], ['']):
+                    raise ValueError
+            except ValueError:
+                print('[WARNING] Нужны 3 значения, написанные раздельно через допустимый разделитель.'
+                      ' Повторите попытку.')
+                continue
+            try:
+                if type(year) is float:
+                    raise ValueError
+                year = int(year)
+                not_done = False
+            except ValueError:
+                print('[WARNING] Год должен быть целым числом и стоять третьим по счёту. Повторите попытку.')
+        created_book, = self.add_books(((title, author, year),))
+        print(f'[INFO] {created_book.__str__()} добавлена.')
+
+    def delete_book(self) -> None:
+        """Пользовательская функция. Удаляет введённую книгу из библиотеки"""
+        print('[INFO] Удаление книги:')
+        id_ = self._ask_id_input()
+        deleted_book = self._find_book_by_id(id_)
+        if deleted_book is not None and self.delete_books((id_,)):  # книгу мог удалить другой поток
+            print(f'[INFO] {deleted_book.__str__()} удалена')
+
+    def find_book(self, title: str = None, author: str = None, year: int = None) -> None:
+        """Пользовательская функция. Поиск введённой книги в библиотеке"""
+        output = '[INFO] Поиск книги по:'
+        if title:
+            output += f' заголовку \'{title}\','
+        if author:
+            output += f' автору \'{author}\','
+        if year or (year == 0):
+            output += f' {year} года,'
+        output = output[:-1] + ':'
+        print(output)
+        self.output.write_lines(self.tier_lines(self.search(title, author, year), Book.__str__))
+
+    @classmethod
+    def tier_lines(cls, results: dict[str, list], format_hit: Callable) -> Iterator[str]:
+        """Строки вывода результатов поиска по ступеням совпадения. Сообщения об отсутствии совпадений
+        выводятся, только если не нашлось ничего"""
+        is_something_found = any(results.values())
+        for key, find_message, not_find_message in cls.SEARCH_TIERS:
+            hits = results.get(key)
+            if hits:
+                yield find_message
+                yield from map(format_hit, hits)
+            elif hits is not None and not is_something_found:
+                yield not_find_message
+
+    def select_books(self, **conditions) -> None:
+        """Пользовательская функция. Выведет выборку книг по условиям query"""
+        books = self.query(**conditions)
+        if books:
+            print(f'[INFO] Найдено книг: {len(books)}')
+            self.output.write_lines(map(Book.__str__, books))
+        else:
+            print('[INFO] Книг с такими условиями нет')
+
+    def view_all_books(self, page_size: int | None = None, sort_key: str = 'id') -> None:
+        """Пользовательская функция. Выведет оформленный список книг в библиотеке.
+        С page_size выводит постранично, следующая страница - по пустому вводу"""
+        from .log import logger  # logging импортируется только для диалогов с пользователем
+        if len(self.__books) == 0:
+            print(f'[INFO] В библиотеке \'{self.__name}\' нет книг:')
+        elif page_size is None:
+            print(f'[INFO] В библиотеке \'{self.__name}\' содержаться следующие книги:')
+            self.output.write_lines(map(Book.__str__, self.snapshot_books()))
+        else:
+            cursor, shown = self.view_books_page(page_size, sort_key)
+            while cursor is not None:
+                answer = input('Пустой ввод - следующая страница, иначе - вернуться в меню\n>>> ')
+                logger.debug('Введено: %s', answer)
+                if answer:
+                    break
+                cursor, shown = self.view_books_page(page_size, sort_key, cursor, shown)
+
+    def view_books_page(self, page_size: int = PAGE_SIZE, sort_key: str = 'id', cursor: tuple | None = None,
+                        shown: int = 0) -> tuple[tuple | None, int]:
+        """Пользовательская функция. Выведет одну страницу книг, форматируя только её строки.
+        shown - сколько книг показано на предыдущих страницах. Вернёт курсор следующей страницы и новое shown"""
+        books, next_cursor = self.page(page_size, sort_key, cursor)
+        lines = [] if shown else [f'[INFO] В библиотеке \'{self.__name}\' содержаться следующие книги:']
+        lines += map(Book.__str__, books)
+        if next_cursor is not None or shown:
+            lines.append(f'[INFO] Показаны книги {shown + 1}-{shown + len(books)} из {len(self.__books)}')
+        self.output.write_lines(lines)
+        return next_cursor, shown + len(books)
+
+    def change_book_status(self, want_to_print_it_yourself: bool = False) -> None:
+        """Пользовательская функция. Изменит статус книги двумя способами"""
+        print('[INFO] Изменение статуса книги:')
+        id_ = self._ask_id_input()
+        book = self._find_book_by_id(id_)
+        if book is not None:
+            # Диалог идёт с копией книги без блокировки, в библиотеку записывается только итоговый статус
+            book = Book(book.id, book.title, book.author, book.year, book.status)
+            old_status = book.status
+            if want_to_print_it_yourself:
+                book.set_special_status()
+            else:
+                book.change_standard_status()
+            if book.status != old_status:
+                self.set_statuses({id_: book.status})
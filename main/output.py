@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""Вывод списков порциями"""
+import sys
+from io import TextIOBase
+from itertools import islice
+from collections.abc import Iterable
+
+
+class OutputSink:
+    """Класс приёмника вывода. Строки собираются порциями и записываются одной операцией на порцию,
+    а не вызовом print на каждую строку"""
+    CHUNK_LINES = 4096
+
+    def write_lines(self, lines: Iterable[str]) -> None:
+        """Запишет строки, каждая завершится переводом строки"""
+        lines = iter(lines)
+        while chunk := list(islice(lines, self.CHUNK_LINES)):
+            chunk.append('')
+            self._write('\n'.join(chunk))
+        self._flush()
+
+    def write(self, line: str) -> None:
+        """Запишет одну строку"""
+        self.write_lines((line,))
+
+    def _write(self, text: str) -> None:
+        raise NotImplementedError
+
+    def _flush(self) -> None:
+        pass
+
+
+class TerminalSink(OutputSink):
+    """Класс вывода в терминал. Поток берётся в момент записи, поэтому вывод остаётся по порядку с print
+    и перехватывается подменой sys.stdout"""
+    def _write(self, text: str) -> None:
+        sys.stdout.write(text)
+
+    def _flush(self) -> None:
+        sys.stdout.flush()
+
+
+class FileSink(OutputSink):
+    """Класс вывода в открытый текстовый файл"""
+    def __init__(self, file: TextIOBase) -> None:
+        self.__file = file
+
+    def _write(self, text: str) -> None:
+        self.__file.write(text)
+
+    def _flush(self) -> None:
+        self.__file.flush()
+
+
+class BufferSink(OutputSink):
+    """Класс вывода в память: для тестов и пакетного режима"""
+    def __init__(self) -> None:
+        self.__parts: list[str] = []
+
+    def _write(self, text: str) -> None:
+        self.__parts.append(text)
+
+    def getvalue(self) -> str:
+        """Вернёт весь накопленный вывод"""
+        return ''.join(self.__parts)
+
+    @property
+    def lines(self) -> list[str]:
+        return self.getvalue().splitlines()
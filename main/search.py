@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""Поисковый индекс строковых полей книг"""
+import bisect
+import unicodedata
+from itertools import chain
+from collections import Counter
+from collections.abc import Iterator
+
+
+class TextIndex:
+    """Класс поискового индекса строкового поля книг: слово -> номера книг.
+    Слова приводятся к NFKC и casefold, поэтому 'толстой' найдёт 'Л. Н. Толстой'.
+    Для поиска по началу слова хранится отсортированный словарь. Для поиска с одной опечаткой хранится
+    индекс удалений: вариант слова без одного символа -> слова. Для двух опечаток в длинных словах -
+    индекс n-грамм слов. Индексы строятся при первом поиске, которому нужны.
+    Стоимость поиска слова (V - слов в словаре, L - длина слова, k - найденных книг):
+    целиком - O(k); по началу - O(log V + подходящих слов + k); с одной опечаткой - O(L) обращений
+    к индексу удалений, проверка кандидатов и O(k). Поиск с двумя опечатками выполняется, только если
+    слов с одной опечаткой нет. Он перебирает слова с общими n-граммами, то есть линеен по длине их списков"""
+    WORD = None  # шаблон слова, компилируется при первом разборе: re дорог при импорте модуля
+    NGRAM = 3
+    MIN_PREFIX = 2  # более короткое начало слова совпадает со слишком многими словами
+    RESORT_LIMIT = 1024  # сколько новых слов вставлять в отсортированный словарь по одному
+
+    def __init__(self) -> None:
+        # слово -> номер книги или множество номеров: у большинства слов одна книга, множество для неё дорого
+        self.__postings: dict[str, int | set[int]] = {}
+        self.__sorted_words: list[str] = []
+        self.__new_words: set[str] = set()  # ещё не вставлены в __sorted_words
+        self.__stale_words = 0  # удалены из __postings, но остались в __sorted_words
+        self.__ngrams: dict[str, set[str]] | None = None  # строится при первом поиске с двумя опечатками
+        # вариант слова без одного символа -> слово или множество слов, строится при первом нечётком поиске
+        self.__deletions: dict[str, str | set[str]] | None = None
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Приведёт строку к виду для сравнения без учёта регистра и способа записи символов"""
+        return unicodedata.normalize('NFKC', text).casefold()
+
+    @classmethod
+    def tokenize(cls, text: str) -> list[str]:
+        """Разобьёт строку на нормализованные слова"""
+        word = cls.WORD
+        if word is None:
+            import re
+            word = cls.WORD = re.compile(r'\w+')
+        return word.findall(cls.normalize(text))
+
+    @classmethod
+    def ngrams(cls, word: str) -> set[str]:
+        """n-граммы слова с метками начала и конца"""
+        padded = f'${word}$'
+        return {padded[i:i + cls.NGRAM] for i in range(max(len(padded) - cls.NGRAM + 1, 1))}
+
+    @staticmethod
+    def deletions(word: str) -> set[str]:
+        """Варианты слова без одного символа"""
+        return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+    @staticmethod
+    def max_distance(word: str) -> int:
+        """Допустимое число опечаток в слове"""
+        return 0 if len(word) < 4 else 1 if len(word) <= 8 else 2
+
+    @staticmethod
+    def edit_distance(first: str, second: str, limit: int) -> int:
+        """Расстояние Левенштейна. Если оно больше limit, вернёт limit + 1.
+        Считаются только клетки не дальше limit от диагонали, остальные заведомо больше limit"""
+        if abs(len(first) - len(second)) > limit:
+            return limit + 1
+        over = limit + 1
+        previous = [j if j <= limit else over for j in range(len(second) + 1)]
+        for i, first_char in enumerate(first, 1):
+            low, high = max(1, i - limit), min(len(second), i + limit)
+            current = [over] * (len(second) + 1)
+            if i <= limit:
+                current[0] = i
+            best = current[low - 1]
+            for j in range(low, high + 1):
+                cost = previous[j - 1] + (first_char != second[j - 1])
+                if previous[j] + 1 < cost:
+                    cost = previous[j] + 1
+                if current[j - 1] + 1 < cost:
+                    cost = current[j - 1] + 1
+                current[j] = cost
+                if cost < best:
+                    best = cost
+            if best > limit:
+                return over
+            previous = current
+        return min(previous[-1], over)
+
+    def add(self, id_: int, text: str) -> None:
+        """Добавит строку книги в индекс"""
+        for word in set(self.tokenize(text)):
+            ids = self.__postings.get(word)
+            if ids is None:
+                self.__postings[word] = id_
+                self.__new_words.add(word)
+                if self.__ngrams is not None:
+                    for ngram in self.ngrams(word):
+                        self.__ngrams.setdefault(ngram, set()).add(word)
+                if self.__deletions is not None:
+                    self._add_deletions(self.__deletions, word)
+            elif type(ids) is int:
+                self.__postings[word] = {ids, id_}
+            else:
+                ids.add(id_)
+
+    def remove(self, id_: int, text: str) -> None:
+        """Уберёт строку книги из индекса. Опустевшие слова удаляются из словаря,
+        из отсортированного словаря - при следующей пересборке, индексы удалений и n-грамм их не теряют,
+        но найденные там слова проверяются по словарю"""
+        for word in set(self.tokenize(text)):
+            ids = self.__postings.get(word)
+            if ids is None:
+                continue
+            if type(ids) is int:
+                if ids == id_:
+                    del self.__postings[word]
+                    if word in self.__new_words:
+                        self.__new_words.discard(word)
+                    else:
+                        self.__stale_words += 1
+            else:
+                ids.discard(id_)
+                if len(ids) == 1:
+                    self.__postings[word] = next(iter(ids))
+
+    def _ids(self, word: str) -> set[int]:
+        """Номера книг со словом"""
+        ids = self.__postings.get(word)
+        if ids is None:
+            return set()
+        return {ids} if type(ids) is int else ids
+
+    def prepare(self) -> None:
+        """Доделает отложенную работу: вставит новые слова в отсортированный словарь и построит индексы
+        удалений и n-грамм. После этого match только читает индекс, пока его не изменят"""
+        self._sort_words()
+        self._build_deletions()
+        self._build_ngrams()
+
+    def _sort_words(self) -> None:
+        """Вставит новые слова в отсортированный словарь или пересоберёт его"""
+        if len(self.__new_words) > self.RESORT_LIMIT or self.__stale_words > len(self.__sorted_words) // 2:
+            self.__sorted_words = sorted(self.__postings)
+            self.__new_words.clear()
+            self.__stale_words = 0
+        elif self.__new_words:
+            for word in self.__new_words:
+                bisect.insort(self.__sorted_words, word)
+            self.__new_words.clear()
+
+    def _build_ngrams(self) -> None:
+        """Построит индекс n-грамм слов, если его ещё нет"""
+        if self.__ngrams is None:
+            ngrams = {}
+            for known_word in self.__postings:
+                for ngram in self.ngrams(known_word):
+                    ngrams.setdefault(ngram, set()).add(known_word)
+            self.__ngrams = ngrams
+
+    def _build_deletions(self) -> None:
+        """Построит индекс удалений, если его ещё нет"""
+        if self.__deletions is None:
+            deletions = {}
+            for known_word in self.__postings:
+                self._add_deletions(deletions, known_word)
+            self.__deletions = deletions
+
+    @classmethod
+    def _add_deletions(cls, deletions: dict[str, str | set[str]], word: str) -> None:
+        """Добавит варианты слова без одного символа. Слова короче 4 символов не нужны: запрос с опечаткой
+        не короче 4 символов, а слово на символ короче запроса находится в словаре как вариант запроса"""
+        if not cls.max_distance(word):
+            return
+        for variant in cls.deletions(word):
+            words = deletions.get(variant)
+            if words is None:
+                deletions[variant] = word
+            elif type(words) is str:
+                if words != word:
+                    deletions[variant] = {words, word}
+            else:
+                words.add(word)
+
+    def _words_with_prefix(self, prefix: str) -> Iterator[str]:
+        """Слова словаря, начинающиеся с prefix, через двоичный поиск в отсортированном словаре"""
+        self._sort_words()
+        for position in range(bisect.bisect_left(self.__sorted_words, prefix), len(self.__sorted_words)):
+            word = self.__sorted_words[position]
+            if not word.startswith(prefix):
+                break
+            if word in self.__postings:
+                yield word
+
+    def _close_words(self, word: str) -> list[tuple[str, int]]:
+        """Слова словаря на расстоянии редактирования не больше 1. У таких слов есть общий вариант без одного
+        символа или одно из них - вариант другого, поэтому кандидаты - слова индекса удалений и словаря
+        для самого слова и его вариантов. Общий вариант бывает и у слов на расстоянии 2, кандидаты проверяются"""
+        self._build_deletions()
+        candidates = set()
+        for variant in self.deletions(word) | {word}:
+            if variant in self.__postings:
+                candidates.add(variant)
+            words = self.__deletions.get(variant)
+            if type(words) is str:
+                candidates.add(words)
+            elif words is not None:
+                candidates.update(words)
+        close = []
+        for candidate in candidates:
+            if candidate in self.__postings:
+                distance = self.edit_distance(word, candidate, 1)
+                if distance <= 1:
+                    close.append((candidate, distance))
+        return close
+
+    def _similar_words(self, word: str) -> Iterator[tuple[str, int]]:
+        """Слова словаря на расстоянии редактирования до max_distance. Сначала ищутся слова с одной опечаткой
+        по индексу удалений. Две опечатки допускаются только в длинных словах и только если слов с одной
+        опечаткой нет. Тогда кандидаты отбираются по общим n-граммам: каждая правка меняет
+        не больше NGRAM n-грамм слова"""
+        limit = self.max_distance(word)
+        if not limit:
+            return
+        close = self._close_words(word)
+        if close or limit == 1:
+            yield from close
+            return
+        self._build_ngrams()
+        word_ngrams = self.ngrams(word)
+        shared = Counter(chain.from_iterable(self.__ngrams.get(ngram, ()) for ngram in word_ngrams))
+        needed = max(len(word_ngrams) - self.NGRAM * limit, 1)
+        for candidate, count in shared.items():
+            if count >= needed and abs(len(candidate) - len(word)) <= limit and candidate in self.__postings:
+                distance = self.edit_distance(word, candidate, limit)
+                if distance <= limit:
+                    yield candidate, distance
+
+    def match(self, text: str) -> dict[int, float]:
+        """Найдёт книги, в строке которых есть все слова запроса, и вернёт номер -> оценка от 0 до 1.
+        Сначала ищутся слова целиком; если таких книг нет - слова, начинающиеся со слов запроса,
+        затем слова с опечатками. Точные совпадения оцениваются выше"""
+        words = self.tokenize(text)
+        if not words:
+            return {}
+        ids = set.intersection(*sorted((self._ids(word) for word in words), key=len))
+        if ids:
+            return dict.fromkeys(ids, 1.0)
+        word_scores = [dict.fromkeys(self._ids(word), 1.0) for word in words]
+        for relaxed in (False, True):
+            for word, scores in zip(words, word_scores):
+                if relaxed:
+                    matches = ((known_word, 0.5 - 0.4 * distance / max(len(word), len(known_word)))
+                               for known_word, distance in self._similar_words(word))
+                elif len(word) >= self.MIN_PREFIX:
+                    matches = ((known_word, 0.5 + 0.4 * len(word) / len(known_word))
+                               for known_word in self._words_with_prefix(word))
+                else:
+                    continue
+                for known_word, score in matches:
+                    for id_ in self._ids(known_word):
+                        if scores.get(id_, 0.0) < score:
+                            scores[id_] = score
+            total = word_scores[0]
+            for scores in word_scores[1:]:
+                total = {id_: score + scores[id_] for id_, score in total.items() if id_ in scores}
+            if total:
+                return {id_: score / len(words) for id_, score in total.items()}
+        return {}
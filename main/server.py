@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""Сетевой доступ к библиотекам: asyncio-сервер с построчным JSON-протоколом поверх TCP или Unix-сокета"""
+import os
+import json
+import signal
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from .cli import Client
+from .storage import JsonConverter
+from .log import logger
+
+
+class LibraryServer:
+    """Класс asyncio-сервера библиотек. Запрос - JSON-объект в строке с командой пакетного режима
+    (Client.apply_command) и необязательным 'id', ответ - строка {'id', 'op', 'result'} или {'id', 'op', 'error'}.
+    Запросы одного соединения выполняются по порядку, соединения обслуживаются одновременно.
+    Сервер выполняет команды по одной: их выполняет единственный рабочий поток в порядке поступления,
+    поэтому изменения и журнал не перемешиваются, а чтение не застаёт изменение наполовину.
+    Цикл событий в это время принимает соединения, читает запросы и отправляет ответы, поэтому долгий поиск
+    задерживает следующие команды, но не сетевой обмен"""
+    MUTATIONS = frozenset(('create_library', 'delete_library', 'add', 'delete', 'status'))
+    # Остальные команды по сети недоступны: import и export читают и пишут файлы по пути из запроса,
+    # то есть дали бы любому клиенту доступ к файлам сервера
+    READS = frozenset(('libraries', 'search', 'search_all', 'query'))
+    MAX_LINE = 1 << 20  # наибольшая длина строки запроса в байтах
+    ENCODING = JsonConverter.ENCODING
+
+    def __init__(self, address: str = '127.0.0.1:8765') -> None:
+        """address - 'хост:порт' для TCP (порт 0 - любой свободный) или 'unix:путь' для Unix-сокета"""
+        self.__address = address
+        self.__server: asyncio.AbstractServer | None = None
+        self.__executor: ThreadPoolExecutor | None = None
+        self.__connections: dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    @property
+    def address(self) -> str:
+        """Адрес, который слушает сервер. Для TCP с портом 0 - с назначенным портом"""
+        if self.__server is not None and not self.__address.startswith('unix:'):
+            host, port = self.__server.sockets[0].getsockname()[:2]
+            return f'{host}:{port}'
+        return self.__address
+
+    async def start(self) -> None:
+        """Начнёт принимать соединения"""
+        self.__executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='library-server')
+        if self.__address.startswith('unix:'):
+            path = self.__address[len('unix:'):]
+            if os.path.exists(path):
+                os.remove(path)  # сокет, оставшийся от прошлого запуска
+            self.__server = await asyncio.start_unix_server(self._serve_connection, path, limit=self.MAX_LINE)
+        else:
+            host, _, port = self.__address.rpartition(':')
+            self.__server = await asyncio.start_server(self._serve_connection, host or '127.0.0.1', int(port),
+                                                       limit=self.MAX_LINE)
+        print(f'[INFO] Сервер слушает {self.address}')
+
+    async def close(self) -> None:
+        """Перестанет принимать соединения, закроет открытые и дождётся выполнения принятых команд"""
+        self.__server.close()
+        for writer in self.__connections.values():
+            writer.close()  # читатель соединения получит конец потока и задача завершится сама
+        await asyncio.gather(*self.__connections, return_exceptions=True)
+        await self.__server.wait_closed()
+        await asyncio.get_running_loop().run_in_executor(None, self.__executor.shutdown)
+        if self.__address.startswith('unix:') and os.path.exists(self.__address[len('unix:'):]):
+            os.remove(self.__address[len('unix:'):])
+
+    @staticmethod
+    def respond(command: dict) -> dict:
+        """Выполнит команду и вернёт ответ без 'id'"""
+        try:
+            return {'op': command['op'], 'result': Client.apply_command(command)}
+        except (KeyError, ValueError, TypeError, OSError) as error:
+            logger.debug('Запрос не выполнен: %r', error)
+            return {'op': command.get('op'), 'error': Client.command_error(error)}
+        except Exception as error:  # ошибка в одной команде не должна останавливать рабочий поток и соединение
+            logger.error('Ошибка выполнения запроса %r: %r', command, error)
+            return {'op': command.get('op'), 'error': f'Внутренняя ошибка: {error!r}'}
+
+    def _run(self, command: dict) -> bytes:
+        """Выполнит команду в рабочем потоке и вернёт строку ответа. Ответ кодируется здесь же:
+        большой результат поиска не должен сериализоваться в потоке цикла событий"""
+        return self._encode(self._with_id(command, self.respond(command)))
+
+    async def execute(self, command: dict) -> bytes:
+        """Выполнит команду в рабочем потоке и вернёт строку ответа"""
+        operation = command.get('op')
+        if operation not in self.READS and operation not in self.MUTATIONS:
+            refusal = {'op': operation, 'error': f'Команда \'{operation}\' недоступна по сети'}
+            return self._encode(self._with_id(command, refusal))
+        return await asyncio.get_running_loop().run_in_executor(self.__executor, self._run, command)
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self.__connections[task] = writer
+        try:
+            while line := await reader.readline():
+                writer.write(await self._handle_line(line))
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError) as error:
+            logger.debug('Соединение закрыто: %r', error)
+        finally:
+            self.__connections.pop(task, None)
+            writer.close()
+
+    async def _handle_line(self, line: bytes) -> bytes:
+        """Разберёт строку запроса и вернёт строку ответа"""
+        if not line.strip():
+            return self._encode({'error': 'Пустой запрос'})
+        try:
+            command = json.loads(line.decode(self.ENCODING))
+        except (UnicodeDecodeError, json.JSONDecodeError) as error:
+            return self._encode({'error': f'Запрос не JSON: {error}'})
+        if not isinstance(command, dict):
+            return self._encode({'error': 'Запрос должен быть JSON-объектом'})
+        return await self.execute(command)
+
+    @staticmethod
+    def _with_id(command: dict, response: dict) -> dict:
+        return {'id': command['id'], **response} if 'id' in command else response
+
+    def _encode(self, response: dict) -> bytes:
+        return (json.dumps(response, ensure_ascii=False) + '\n').encode(self.ENCODING)
+
+    async def serve_until_stopped(self) -> None:
+        """Обслуживает клиентов до SIGINT или SIGTERM"""
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signal_number, stop.set)
+            except (NotImplementedError, RuntimeError):  # Windows или не главный поток
+                pass
+        await self.start()
+        try:
+            await stop.wait()
+        finally:
+            await self.close()
+
+    @classmethod
+    def run(cls, address: str, data_json_path: str, save_json_path: str, use_journal: bool = True) -> None:
+        """Загрузит библиотеки, будет обслуживать клиентов до сигнала остановки и сохранит данные.
+        С журналом каждое изменение сразу дописывается в журнал и переживает аварийное завершение"""
+        Client._load(data_json_path, save_json_path, use_journal)
+        try:
+            asyncio.run(cls(address).serve_until_stopped())
+        finally:
+            print('[INFO] Сервер остановлен')
+            Client._save(save_json_path)
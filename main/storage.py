@@ -0,0 +1,925 @@
+# -*- coding: utf-8 -*-
+"""Файлы данных: снимок json и двоичный, снимок по частям, импорт и экспорт, журнал изменений"""
+import os
+import re
+import sys
+import csv
+import shutil
+import json
+import threading
+import mmap
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from array import array
+from itertools import islice
+from collections.abc import Iterable, Iterator, Callable
+from typing import TextIO
+
+from .model import Book, Library
+from .columnar import MappedBookTable, INT32_MIN, INT32_MAX
+from .log import logger
+
+
+class JsonConverter:
+    """Класс для работы с Json"""
+    JSON_IDENT = 2
+    # Версия 1 - ключи из Book.__repr__() в cp1251, версия 2 - явные записи книг в utf-8
+    FORMAT_VERSION = 2
+    ENCODING = 'utf-8'
+    LEGACY_ENCODING = 'cp1251'
+    BACKUP_COUNT = 1  # сколько предыдущих версий файла хранить: libraries_backup.json, libraries_backup_2.json...
+    # Двоичный снимок: заголовок, таблица статусов, каталог библиотек, таблицы записей, пул строк utf-8
+    BINARY_FORMAT = -1
+    BINARY_EXTENSION = '.bin'
+    BINARY_MAGIC = b'LIBB'
+    BINARY_VERSION = 2
+    BINARY_HEADER = struct.Struct('<4sHHQIIQ')  # метка, версия, резерв, journal_seq, библиотек, статусов, пул
+    BINARY_STRING = struct.Struct('<II')  # смещение и длина строки в пуле
+    # имя, число книг, флаги, смещения таблицы записей и перестановки по id. В версии 1 не было флагов
+    BINARY_LIBRARY = struct.Struct('<IIIIQQ')
+    BINARY_LIBRARY_V1 = struct.Struct('<IIIQQ')
+    BINARY_COLUMNAR = 1  # флаг библиотеки с колоночным хранилищем
+    # Снимок по частям: манифест со списком библиотек и по файлу-части формата 2 на библиотеку в папке <манифест>.shards
+    MANIFEST_FORMAT = -2
+    MANIFEST_EXTENSION = '.manifest'
+    MANIFEST_VERSION = 1
+    __inherited = None  # данные, которые процессы пула получают при fork без сериализации
+    
+    class Encoder(json.JSONEncoder):
+        """Класс для модификации создания Json"""
+        # По сути так нужно делать, но я не понял как переопределить обработку кортежей для себя
+        def default(self, obj):
+            """Функция, добавляющая пользовательские типы к JSONEncoder"""
+            if isinstance(obj, Library):
+                logger.debug('Books')
+                books = {}
+                for (book, id_) in zip(obj.stored_books, obj.stored_ids):
+                    books.update({book.__repr__(): id_})
+                return {obj.__repr__(): books}
+            elif isinstance(obj, tuple):  # Обработка кортежей
+                logger.debug('Tuples')
+                return list(obj)
+            elif isinstance(obj, list):
+                logger.debug('Lists')
+                libraries_ = {}
+                for library in obj:
+                    libraries_.update(default(library))
+                return libraries_  # Обработка списков
+            return json.JSONEncoder.default(self, obj)
+
+    class MyEncoder:
+        """Класс для создания Json из пользовательского типа вручную"""
+        @classmethod
+        def default(cls, obj: tuple[Library, ...] | Library) -> dict:
+            """Создаст json из tuple[Library, ...]"""
+            if isinstance(obj, Library):
+                logger.debug('Libraries')
+                books = {}
+                for (book, id_) in zip(obj.stored_books, obj.stored_ids):
+                    books.update({book.__repr__(): id_})
+                return {obj.__repr__(): books}
+            elif isinstance(obj, tuple):  # Обработка кортежей
+                logger.debug('Tuples')
+                libraries_ = {}
+                for library in obj:
+                    libraries_.update(cls.default(library))
+                return libraries_
+            # return cls.default(obj)
+
+    class StreamReader:
+        """Класс для инкрементального разбора json из файла кусками ограниченного размера"""
+        CHUNK_SIZE = 1 << 16
+        _decoder = json.JSONDecoder()
+
+        def __init__(self, file: TextIO) -> None:
+            self.__file = file
+            self.__buffer = ''
+            self.__pos = 0
+            self.__eof = False
+
+        def _fill(self) -> bool:
+            """Дочитает следующий кусок файла, отбросив уже разобранную часть буфера"""
+            if self.__eof:
+                return False
+            chunk = self.__file.read(self.CHUNK_SIZE)
+            if not chunk:
+                self.__eof = True
+                return False
+            self.__buffer = self.__buffer[self.__pos:] + chunk
+            self.__pos = 0
+            return True
+
+        def peek(self) -> str:
+            """Вернёт следующий значащий символ, не сдвигая позицию. Пустая строка - конец файла"""
+            while True:
+                self.__pos = json.decoder.WHITESPACE.match(self.__buffer, self.__pos).end()
+                if self.__pos < len(self.__buffer):
+                    return self.__buffer[self.__pos]
+                if not self._fill():
+                    return ''
+
+        def expect(self, char: str) -> None:
+            """Пропустит ожидаемый символ разметки"""
+            found = self.peek()
+            if found != char:
+                raise ValueError(f'Ошибка расшифровки json: ожидалось \'{char}\', найдено \'{found}\'')
+            self.__pos += 1
+
+        def value(self):
+            """Разберёт одно json значение целиком: строку, число или небольшой объект"""
+            self.peek()
+            while True:
+                try:
+                    value, end = self._decoder.raw_decode(self.__buffer, self.__pos)
+                except json.JSONDecodeError:
+                    if self._fill():
+                        continue
+                    raise
+                # число могло оборваться на границе куска, поэтому дочитываем и разбираем заново
+                if end == len(self.__buffer) and self._fill():
+                    continue
+                self.__pos = end
+                return value
+
+        def iter_items(self) -> Iterator[None]:
+            """Пройдёт по элементам массива. Каждый элемент читает вызывающий"""
+            self.expect('[')
+            if self.peek() == ']':
+                self.__pos += 1
+                return
+            while True:
+                yield
+                if self.peek() == ',':
+                    self.__pos += 1
+                else:
+                    self.expect(']')
+                    return
+
+        def iter_keys(self) -> Iterator[str]:
+            """Пройдёт по ключам объекта. Значение после каждого ключа читает вызывающий"""
+            self.expect('{')
+            if self.peek() == '}':
+                self.__pos += 1
+                return
+            while True:
+                key = self.value()
+                self.expect(':')
+                yield key
+                if self.peek() == ',':
+                    self.__pos += 1
+                else:
+                    self.expect('}')
+                    return
+
+    @staticmethod
+    def book_to_record(book: Book) -> dict:
+        """Создаст запись книги для формата версии 2"""
+        return {'id': book.id, 'title': book.title, 'author': book.author, 'year': book.year, 'status': book.status}
+
+    @staticmethod
+    def record_to_book(record: dict) -> Book:
+        """Создаст книгу из записи формата версии 2"""
+        return Book(record['id'], record['title'], record['author'], record['year'], record['status'])
+
+    @staticmethod
+    def _iter_legacy_books(reader: StreamReader) -> Iterator[Book]:
+        """Создаст объекты Book по одному из потока {Book.__repr__(): int, ...}"""
+        for current_book in reader.iter_keys():
+            book_id = reader.value()
+            title, author, str_year, status = JsonConverter.split_str(current_book)
+            yield Book(int(book_id), title, author, int(str_year), status)
+
+    @staticmethod
+    def _iter_records(reader: StreamReader) -> Iterator[Book]:
+        """Создаст объекты Book по одному из потока записей [{"id": int, "title": str, ...}, ...]"""
+        for _ in reader.iter_items():
+            yield JsonConverter.record_to_book(reader.value())
+
+    @classmethod
+    def _iter_structured_libraries(cls, reader: StreamReader) -> Iterator[tuple[str, bool, Iterator[Book]]]:
+        """Разберёт поток формата версии 2. Имя и columnar библиотеки должны идти перед её книгами"""
+        for key in reader.iter_keys():
+            if key == 'format_version':
+                version = reader.value()
+                if version > cls.FORMAT_VERSION:
+                    raise ValueError(f'Формат данных версии {version} не поддерживается')
+            elif key == 'journal_seq':
+                reader.value()
+            elif key == 'libraries':
+                for _ in reader.iter_items():
+                    name = None
+                    columnar = False
+                    books_read = False
+                    for library_key in reader.iter_keys():
+                        if library_key == 'name':
+                            name = reader.value()
+                        elif library_key == 'columnar':
+                            columnar = reader.value()
+                        elif library_key == 'books':
+                            if name is None:
+                                raise ValueError('Ошибка расшифровки json: имя библиотеки должно идти перед книгами')
+                            books = cls._iter_records(reader)
+                            yield name, columnar, books
+                            for _ in books:  # дочитаем то, что не прочитал потребитель
+                                pass
+                            books_read = True
+                        else:
+                            reader.value()  # неизвестные поля пропускаем
+                    if name is not None and not books_read:
+                        yield name, columnar, iter(())
+            else:
+                reader.value()
+
+    @classmethod
+    def read_journal_seq(cls, path: str) -> int:
+        """Прочитает из заголовка снимка номер последней учтённой в нём записи журнала"""
+        data_format = cls.detect_format(path)
+        if data_format == cls.BINARY_FORMAT:
+            with open(path, 'rb') as file:
+                return cls.BINARY_HEADER.unpack(file.read(cls.BINARY_HEADER.size))[3]
+        if data_format == cls.MANIFEST_FORMAT:
+            return cls.read_manifest(path)['journal_seq']
+        if data_format < 2:
+            return 0
+        with open(path, 'r', encoding=cls.ENCODING) as file:
+            reader = cls.StreamReader(file)
+            for key in reader.iter_keys():
+                if key == 'journal_seq':
+                    return reader.value()
+                if key == 'libraries':
+                    return 0
+                reader.value()
+        return 0
+
+    @classmethod
+    def detect_format(cls, path: str) -> int:
+        """Определит версию формата файла данных по его началу. 0 - файла нет или он пуст"""
+        try:
+            with open(path, 'rb') as file:
+                head = file.read(64)
+        except FileNotFoundError:
+            return 0
+        if head.startswith(cls.BINARY_MAGIC):
+            return cls.BINARY_FORMAT
+        head = head.lstrip()
+        if not head:
+            return 0
+        if head.startswith(b'{') and head[1:].lstrip().startswith(b'"format_version"'):
+            return cls.FORMAT_VERSION
+        if head.startswith(b'{') and head[1:].lstrip().startswith(b'"manifest_version"'):
+            return cls.MANIFEST_FORMAT
+        return 1
+
+    @classmethod
+    def _iter_library_entries(cls, path: str) -> Iterator[tuple[str, bool, Iterator[Book]]]:
+        """Потоково прочитает файл любой версии, выдавая имя библиотеки, columnar и ленивый итератор её книг.
+        Книги библиотеки нужно прочитать до перехода к следующей, иначе они будут пропущены"""
+        version = cls.detect_format(path)
+        if version == 0:
+            if not os.path.exists(path):
+                output_error = f'Не найден файл {path}'
+                logger.error(output_error)
+                print(f'[ERROR] {output_error}')
+            return
+        if version == cls.BINARY_FORMAT:
+            for library in cls.open_binary(path):
+                yield library.name, library.columnar, iter(library.stored_books)
+            return
+        if version == cls.MANIFEST_FORMAT:
+            for shard_path in cls.shard_paths(path):
+                yield from cls._iter_library_entries(shard_path)
+            return
+        encoding = cls.LEGACY_ENCODING if version == 1 else cls.ENCODING
+        with open(path, 'r', encoding=encoding) as file:
+            reader = cls.StreamReader(file)
+            if version > 1:
+                yield from cls._iter_structured_libraries(reader)
+                return
+            for library_obj_name in reader.iter_keys():
+                books = cls._iter_legacy_books(reader)
+                yield cls.split_str(library_obj_name)[0], False, books
+                for _ in books:  # дочитаем то, что не прочитал потребитель
+                    pass
+
+    @classmethod
+    def iter_libraries(cls, path: str) -> Iterator[tuple[str, Iterator[Book]]]:
+        """Потоково прочитает файл любой версии, выдавая имя библиотеки и ленивый итератор её книг.
+        Книги библиотеки нужно прочитать до перехода к следующей, иначе они будут пропущены"""
+        for name, _, books in cls._iter_library_entries(path):
+            yield name, books
+
+    @classmethod
+    def load_libraries(cls, path: str, workers: int | None = None) -> tuple[Library, ...]:
+        """Создаст библиотеки из файла любой версии. Книги попадают в библиотеку прямо из потока,
+        без промежуточных dict и list, двоичный снимок открывается лениво, части снимка читаются параллельно"""
+        data_format = cls.detect_format(path)
+        if data_format == cls.BINARY_FORMAT:
+            return cls.open_binary(path)
+        if data_format == cls.MANIFEST_FORMAT:
+            return tuple(cls.parallel_map(cls._load_shard, cls.shard_paths(path), workers))
+        libraries = ()
+        for name, columnar, books in cls._iter_library_entries(path):
+            library = Library(name, columnar)
+            library.load(books)
+            libraries += (library,)
+        return libraries
+
+    @staticmethod
+    def library_entries(libraries: Iterable[Library]) -> Iterator[tuple[str, Iterable[Book], bool]]:
+        """Вернёт тройки (имя, книги, columnar) библиотек для записи снимка"""
+        for library in libraries:
+            yield library.name, library.stored_books, library.columnar
+
+    @classmethod
+    def migrate(cls, libraries: tuple[Library, ...], path: str) -> None:
+        """Однократно переведёт файл старого формата в текущий, сохранив оригинал рядом с суффиксом .v1.
+        Оригинал копируется, а новый файл пишется через atomic_write, поэтому при сбое по пути path
+        остаётся старый или новый файл целиком"""
+        backup_path = f'{path}.v1'
+        shutil.copy2(path, f'{backup_path}.tmp')
+        os.replace(f'{backup_path}.tmp', backup_path)
+        cls.save_json(libraries, path)
+        print(f'[INFO] Файл \'{path}\' переведён в формат версии {cls.FORMAT_VERSION}, '
+              f'исходный сохранён в \'{backup_path}\'')
+
+    @staticmethod
+    def open_json(path: str) -> dict:
+        """Загрузит json в dict"""
+        try:
+            with open(path, 'r', encoding=JsonConverter.LEGACY_ENCODING) as file:
+                data = json.load(file)
+            return data
+        except FileNotFoundError:
+            output_error = f'Не найден файл {path}'
+            logger.error(output_error)
+            print(f'[ERROR] {output_error}')
+
+    @classmethod
+    def save_json(cls, libraries: tuple[Library, ...], path: str, journal_seq: int = 0) -> None:
+        """Сохранит данные в json текущей версии формата"""
+        cls.write_snapshot(cls.library_entries(libraries), path, journal_seq)
+        print(f'[INFO] Данные сохранены в файл \'{path}\'')
+
+    @classmethod
+    def write_snapshot(cls, libraries: Iterable[tuple], path: str, journal_seq: int = 0,
+                       workers: int | None = None) -> None:
+        """Запишет снимок троек (имя, книги, columnar) или пар (имя, книги) в файл без вывода пользователю.
+        Формат выбирается по расширению: BINARY_EXTENSION - двоичный, MANIFEST_EXTENSION - по частям, иначе json"""
+        if path.endswith(cls.BINARY_EXTENSION):
+            cls.atomic_write(path, lambda file: cls.write_binary(libraries, file, journal_seq), binary=True)
+        elif path.endswith(cls.MANIFEST_EXTENSION):
+            cls.write_shards(libraries, path, journal_seq, workers)
+        else:
+            cls.atomic_write(path, lambda file: cls.write_records(libraries, file, journal_seq))
+
+    @classmethod
+    def write_binary(cls, libraries: Iterable[tuple], file, journal_seq: int = 0) -> None:
+        """Запишет тройки (имя, книги, columnar) или пары (имя, книги) двоичным снимком для open_binary"""
+        pool = bytearray()
+        pool_refs: dict[str, tuple[int, int]] = {}  # одинаковые строки, например авторы, хранятся один раз
+
+        def string_ref(string: str) -> tuple[int, int]:
+            ref = pool_refs.get(string)
+            if ref is None:
+                encoded = string.encode('utf-8')
+                ref = pool_refs[string] = (len(pool), len(encoded))
+                pool.extend(encoded)
+            return ref
+
+        statuses: dict[str, int] = {}
+        tables = []
+        for name, books, *columnar in libraries:
+            records = bytearray()
+            ids = []
+            for book in books:
+                status = statuses.setdefault(book.status, len(statuses))
+                records.extend(MappedBookTable.RECORD.pack(book.id, book.year, status, *string_ref(book.title),
+                                                           *string_ref(book.author)))
+                ids.append(book.id)
+            order = array('I', sorted(range(len(ids)), key=ids.__getitem__))
+            if sys.byteorder == 'big':  # формат хранит числа в little-endian
+                order.byteswap()
+            flags = cls.BINARY_COLUMNAR if any(columnar) else 0
+            tables.append((string_ref(name), len(ids), flags, records, order))
+
+        offset = cls.BINARY_HEADER.size + len(statuses) * cls.BINARY_STRING.size + len(tables) * cls.BINARY_LIBRARY.size
+        directory = bytearray()
+        for name_ref, count, flags, records, order in tables:
+            directory.extend(cls.BINARY_LIBRARY.pack(*name_ref, count, flags, offset, offset + len(records)))
+            offset += len(records) + len(order) * order.itemsize
+        file.write(cls.BINARY_HEADER.pack(cls.BINARY_MAGIC, cls.BINARY_VERSION, 0, journal_seq, len(tables),
+                                          len(statuses), offset))
+        for status in statuses:
+            file.write(cls.BINARY_STRING.pack(*string_ref(status)))
+        file.write(directory)
+        for _, _, _, records, order in tables:
+            file.write(records)
+            order.tofile(file)
+        file.write(pool)
+
+    @staticmethod
+    def _call_inherited(function: Callable, argument):
+        """Выполнит задачу пула процессов над данными, полученными при fork"""
+        return function(JsonConverter.__inherited, argument)
+
+    @classmethod
+    def _inherit(cls, inherited) -> None:
+        """Инициализатор процесса пула"""
+        cls.__inherited = inherited
+
+    @classmethod
+    def parallel_map(cls, function: Callable, arguments: list, workers: int | None = None,
+                     inherited=None) -> list:
+        """Вернёт [function(inherited, аргумент) для каждого аргумента] в порядке аргументов, считая в пуле.
+        Процессы создаются через fork и получают inherited без сериализации, результаты возвращаются через pickle.
+        Где fork недоступен или уже работают другие потоки (fork копирует только текущий), используется пул потоков"""
+        workers = min(workers or os.cpu_count() or 1, len(arguments))
+        if workers <= 1:
+            return [function(inherited, argument) for argument in arguments]
+        import multiprocessing  # пул процессов дорог при импорте и нужен только снимку по частям
+        from concurrent.futures import ProcessPoolExecutor
+        if 'fork' in multiprocessing.get_all_start_methods() and threading.active_count() == 1:
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork'),
+                                     initializer=cls._inherit, initargs=(inherited,)) as pool:
+                return list(pool.map(cls._call_inherited, [function] * len(arguments), arguments))
+        with ThreadPoolExecutor(workers) as pool:
+            return list(pool.map(lambda argument: function(inherited, argument), arguments))
+
+    @classmethod
+    def read_manifest(cls, path: str) -> dict:
+        """Прочитает манифест снимка по частям"""
+        with open(path, 'r', encoding=cls.ENCODING) as file:
+            return json.load(file)
+
+    @classmethod
+    def shard_paths(cls, path: str) -> list[str]:
+        """Вернёт пути частей снимка в порядке библиотек"""
+        directory = os.path.dirname(path)
+        return [os.path.join(directory, entry['file']) for entry in cls.read_manifest(path)['libraries']]
+
+    @classmethod
+    def _load_shard(cls, _, shard_path: str) -> Library:
+        """Загрузит библиотеку из части снимка"""
+        if not os.path.exists(shard_path):
+            raise FileNotFoundError(f'Не найдена часть снимка {shard_path}')
+        library, = cls.load_libraries(shard_path)
+        return library
+
+    @classmethod
+    def _write_shard(cls, entries: list[tuple], task: tuple[int, str]) -> int:
+        """Запишет одну библиотеку в файл-часть и вернёт число книг"""
+        index, shard_path = task
+        name, books, columnar = entries[index]
+        cls.atomic_write(shard_path, lambda file: cls.write_records(((name, books, columnar),), file), backups=0)
+        return len(books)
+
+    @classmethod
+    def write_shards(cls, libraries: Iterable[tuple], path: str, journal_seq: int = 0,
+                     workers: int | None = None) -> None:
+        """Запишет каждую библиотеку в свою часть параллельно, затем атомарно заменит манифест.
+        Части получают номер поколения в имени, поэтому до замены манифеста старые части не трогаются.
+        Части, на которые не ссылаются манифест и его резервные копии, удаляются"""
+        entries = [(name, books if isinstance(books, (list, tuple)) else tuple(books), any(columnar))
+                   for name, books, *columnar in libraries]
+        generation = 1
+        if cls.detect_format(path) == cls.MANIFEST_FORMAT:
+            generation = cls.read_manifest(path)['generation'] + 1
+        root = os.path.basename(path)
+        directory = f'{path}.shards'
+        os.makedirs(directory, exist_ok=True)
+        files = [f'{root}.shards/{index:04d}.{generation}.json' for index in range(len(entries))]
+        shard_tasks = [(index, os.path.join(os.path.dirname(path), file)) for index, file in enumerate(files)]
+        counts = cls.parallel_map(cls._write_shard, shard_tasks, workers, inherited=entries)
+        manifest = {'manifest_version': cls.MANIFEST_VERSION, 'journal_seq': journal_seq, 'generation': generation,
+                    'libraries': [{'name': name, 'columnar': columnar, 'books': count, 'file': file}
+                                  for (name, _, columnar), count, file in zip(entries, counts, files)]}
+        cls.atomic_write(path, lambda file: json.dump(manifest, file, ensure_ascii=False, indent=cls.JSON_IDENT))
+        for file in os.listdir(directory):
+            shard_generation = file.split('.')[1] if file.count('.') == 2 else ''
+            if shard_generation.isdigit() and int(shard_generation) < generation - cls.BACKUP_COUNT:
+                os.remove(os.path.join(directory, file))
+
+    @classmethod
+    def open_binary(cls, path: str) -> tuple[Library, ...]:
+        """Откроет двоичный снимок через mmap. Читаются только заголовок и каталог библиотек,
+        книги создаются по мере обращения к ним"""
+        with open(path, 'rb') as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, _, library_count, status_count, pool_offset = cls.BINARY_HEADER.unpack_from(buffer)
+        if magic != cls.BINARY_MAGIC or version > cls.BINARY_VERSION:
+            raise ValueError(f'Формат двоичного снимка версии {version} не поддерживается')
+
+        def read_string(offset: int, length: int) -> str:
+            return str(buffer[pool_offset + offset:pool_offset + offset + length], 'utf-8')
+
+        position = cls.BINARY_HEADER.size
+        statuses = []
+        for _ in range(status_count):
+            statuses.append(read_string(*cls.BINARY_STRING.unpack_from(buffer, position)))
+            position += cls.BINARY_STRING.size
+        libraries = ()
+        for _ in range(library_count):
+            if version >= 2:
+                name_offset, name_length, count, flags, records_offset, order_offset = \
+                    cls.BINARY_LIBRARY.unpack_from(buffer, position)
+                position += cls.BINARY_LIBRARY.size
+            else:
+                name_offset, name_length, count, records_offset, order_offset = \
+                    cls.BINARY_LIBRARY_V1.unpack_from(buffer, position)
+                flags = 0
+                position += cls.BINARY_LIBRARY_V1.size
+            library = Library(read_string(name_offset, name_length), bool(flags & cls.BINARY_COLUMNAR))
+            library.load_mapped(MappedBookTable(buffer, count, records_offset, order_offset, pool_offset,
+                                                tuple(statuses)))
+            libraries += (library,)
+        return libraries
+
+    @staticmethod
+    def backup_path(path: str, number: int) -> str:
+        """Вернёт путь резервной копии с номером number, начиная с 1"""
+        root, extension = os.path.splitext(path)
+        suffix = '_backup' if number == 1 else f'_backup_{number}'
+        return f'{root}{suffix}{extension}'
+
+    @classmethod
+    def _rotate_backups(cls, path: str, backups: int) -> None:
+        """Сдвинет резервные копии на одну и сделает текущий файл первой из них"""
+        for number in range(backups, 1, -1):
+            if os.path.exists(cls.backup_path(path, number - 1)):
+                os.replace(cls.backup_path(path, number - 1), cls.backup_path(path, number))
+        # жёсткая ссылка вместо копирования: файл данных не пропадает ни на мгновение и не копируется
+        temp_backup_path = f'{cls.backup_path(path, 1)}.tmp'
+        if os.path.exists(temp_backup_path):
+            os.remove(temp_backup_path)
+        try:
+            os.link(path, temp_backup_path)
+        except OSError:  # файловая система без жёстких ссылок
+            shutil.copy2(path, temp_backup_path)
+        os.replace(temp_backup_path, cls.backup_path(path, 1))
+
+    @classmethod
+    def atomic_write(cls, path: str, write: Callable, backups: int | None = None, binary: bool = False) -> None:
+        """Запишет файл через временный файл в той же папке, fsync и переименование.
+        При сбое на диске останется либо старая, либо новая версия файла целиком"""
+        backups = cls.BACKUP_COUNT if backups is None else backups
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with (open(temp_path, 'wb') if binary else open(temp_path, 'w', encoding=cls.ENCODING)) as file:
+                write(file)
+                file.flush()
+                os.fsync(file.fileno())
+            if backups and os.path.exists(path):
+                cls._rotate_backups(path, backups)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        if hasattr(os, 'O_DIRECTORY'):  # переименование надёжно только после fsync папки (POSIX)
+            directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+
+    @classmethod
+    def write_records(cls, libraries: Iterable[tuple], file: TextIO, journal_seq: int = 0) -> None:
+        """Запишет тройки (имя, книги, columnar) или пары (имя, книги) в формате версии 2,
+        по одной записи книги на строку"""
+        dumps = json.JSONEncoder(ensure_ascii=False).encode
+        file.write(f'{{\n  "format_version": {cls.FORMAT_VERSION},\n  "journal_seq": {journal_seq},\n'
+                   f'  "libraries": [')
+        for library_number, (name, books, *columnar) in enumerate(libraries):
+            if library_number:
+                file.write(',')
+            storage = ', "columnar": true' if any(columnar) else ''
+            file.write(f'\n    {{"name": {dumps(name)}{storage}, "books": [')
+            separator = '\n      '
+            for book in books:
+                file.write(separator + dumps(cls.book_to_record(book)))
+                separator = ',\n      '
+            file.write('\n    ]}')
+        file.write('\n  ]\n}\n')
+
+    @classmethod
+    def print_json(cls, data: dict) -> None:
+        """Напечатает json читаемо"""
+        print(json.dumps(data, indent=cls.JSON_IDENT, ensure_ascii=False))
+
+    @staticmethod
+    def split_str(obj_str: str) -> tuple[str, ...]:
+        """Получит данные из Library и Book .__repr__ """
+        match = re.search(r"\((.*?)\)", obj_str)
+        if match:
+            obj_str = match.group(1)
+            obj_list = obj_str.split(", ")
+            obj_tuple = tuple(obj_list)
+            return obj_tuple
+        else:
+            logger.error('Ошибка расшифровки json')
+
+    @staticmethod
+    def add_books_from_dict(books_dict: dict) -> list:
+        """Создаст объекты Book из {Book.__repr__(): int, ...}"""
+        books_list = []
+        for current_book, book_id in books_dict.items():
+            title, author, str_year, status = JsonConverter.split_str(current_book)
+            books_list.append(Book(int(book_id), title, author, int(str_year), status))
+        return books_list
+
+
+class BookTransfer:
+    """Класс потокового импорта и экспорта книг в CSV и JSON lines. Файлы обрабатываются порциями,
+    ни импорт, ни экспорт не держат в памяти весь каталог"""
+    FIELDS = ('id', 'title', 'author', 'year', 'status')
+    FORMATS = ('.csv', '.jsonl')
+    CHUNK_SIZE = 1000
+
+    class _LineBuffer:
+        """Файл для csv.writer, который возвращает строку вместо записи"""
+        @staticmethod
+        def write(line: str) -> str:
+            return line
+
+    @classmethod
+    def file_format(cls, path: str) -> str:
+        """Вернёт формат файла по расширению"""
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in cls.FORMATS:
+            raise ValueError(f'Формат \'{extension}\' не поддерживается, нужен один из {", ".join(cls.FORMATS)}')
+        return extension
+
+    @classmethod
+    def iter_rows(cls, file: TextIO, file_format: str) -> Iterator[tuple[int, dict | str]]:
+        """Выдаст пары (номер строки файла, строка). Строка CSV - словарь, строка JSON lines - текст"""
+        if file_format == '.csv':
+            reader = csv.DictReader(file)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(file, 1):
+                if line.strip():
+                    yield line_number, line
+
+    @staticmethod
+    def _parse_int(value, field: str) -> int:
+        """Проверит, что значение поля - целое число"""
+        if isinstance(value, (bool, float)):
+            raise ValueError(f'{field} должен быть целым числом')
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'{field} должен быть целым числом') from None
+
+    @classmethod
+    def parse_row(cls, row: dict | str) -> tuple[int | None, str, str, int, str | None]:
+        """Проверит строку и вернёт (номер или None, заголовок, автор, год, статус или None)"""
+        if isinstance(row, str):
+            try:
+                row = json.loads(row)
+            except json.JSONDecodeError as error:
+                raise ValueError(f'некорректный JSON: {error.msg}') from None
+        if not isinstance(row, dict):
+            raise ValueError('строка должна быть объектом с полями книги')
+        title, author = row.get('title'), row.get('author')
+        if not isinstance(title, str) or not title:
+            raise ValueError('нет заголовка')
+        if not isinstance(author, str) or not author:
+            raise ValueError('нет автора')
+        if row.get('year') in (None, ''):
+            raise ValueError('нет года')
+        year = cls._parse_int(row['year'], 'год')
+        if not INT32_MIN <= year <= INT32_MAX:  # колоночное хранилище и двоичный снимок хранят 32 бита
+            raise ValueError('год вне допустимого диапазона')
+        id_ = row.get('id')
+        if id_ in (None, ''):
+            id_ = None
+        else:
+            id_ = cls._parse_int(id_, 'номер')
+            if id_ < 1:
+                raise ValueError('номер должен быть положительным')
+            if id_ > INT32_MAX:
+                raise ValueError(f'номер больше {INT32_MAX}')
+        status = row.get('status') or None
+        if status is not None and not isinstance(status, str):
+            raise ValueError('статус должен быть строкой')
+        return id_, title, author, year, status
+
+    @classmethod
+    def import_chunk(cls, library: Library, rows: Iterable[tuple[int, dict | str]]) -> list[tuple[int, str]]:
+        """Проверит и добавит порцию строк. Книги с номером сохраняют его, остальные получают свободный номер.
+        Вернёт отклонённые строки (номер строки файла, причина)"""
+        rejected = []
+        numbered, unnumbered = [], []
+        chunk_ids = set()
+        for line_number, row in rows:
+            try:
+                id_, title, author, year, status = cls.parse_row(row)
+                if id_ is not None:
+                    if id_ in chunk_ids or id_ in library.stored_ids:
+                        raise ValueError(f'номер {id_} уже занят')
+                    chunk_ids.add(id_)
+                    numbered.append(Book(id_, title, author, year, status))
+                else:
+                    unnumbered.append((title, author, year) if status is None else (title, author, year, status))
+            except ValueError as error:
+                rejected.append((line_number, str(error)))
+        # Сначала книги с номерами, чтобы свободные номера выдавались в обход них
+        library.insert_books(numbered)
+        library.add_books(unnumbered)
+        return rejected
+
+    @classmethod
+    def import_books(cls, library: Library, path: str,
+                     chunk_size: int = CHUNK_SIZE) -> tuple[int, list[tuple[int, str]]]:
+        """Добавит в библиотеку книги из файла CSV или JSON lines порциями по chunk_size строк.
+        Вернёт число добавленных книг и отклонённые строки (номер строки файла, причина)"""
+        file_format = cls.file_format(path)
+        books_before = len(library.stored_ids)
+        rejected = []
+        with open(path, 'r', encoding=JsonConverter.ENCODING, newline='') as file:
+            rows = cls.iter_rows(file, file_format)
+            while chunk := list(islice(rows, chunk_size)):
+                rejected += cls.import_chunk(library, chunk)
+        return len(library.stored_ids) - books_before, rejected
+
+    @classmethod
+    def iter_lines(cls, books: Iterable[Book], file_format: str) -> Iterator[str]:
+        """Выдаст строки файла экспорта по одной, вместе с заголовком CSV"""
+        if file_format == '.csv':
+            writer = csv.writer(cls._LineBuffer(), lineterminator='\n')
+            yield writer.writerow(cls.FIELDS)
+            for book in books:
+                yield writer.writerow((book.id, book.title, book.author, book.year, book.status))
+        else:
+            dumps = json.JSONEncoder(ensure_ascii=False).encode
+            for book in books:
+                yield dumps(JsonConverter.book_to_record(book)) + '\n'
+
+    @classmethod
+    def export_books(cls, library: Library, path: str) -> int:
+        """Атомарно запишет книги библиотеки в файл CSV или JSON lines и вернёт их число"""
+        lines = cls.iter_lines(library.stored_books, cls.file_format(path))
+        JsonConverter.atomic_write(path, lambda file: file.writelines(lines), backups=0)
+        return len(library.stored_ids)
+
+
+class Journal:
+    """Класс журнала изменений: каждое изменение дописывается в файл строкой json,
+    а при превышении порога журнал в фоне сжимается в снимок"""
+    COMPACT_THRESHOLD = 10000
+
+    def __init__(self, snapshot_path: str, libraries_getter: Callable[[], tuple[Library, ...]],
+                 threshold: int = COMPACT_THRESHOLD, fsync: bool = False) -> None:
+        self.__snapshot_path = snapshot_path
+        self.__path = f'{snapshot_path}.journal'
+        self.__old_path = f'{snapshot_path}.journal.old'  # журнал, который сейчас сжимается
+        self.__libraries = libraries_getter
+        self.__threshold = threshold
+        self.__fsync = fsync
+        self.__seq = 0  # номер последней записи
+        self.__records = 0  # записей в текущем файле журнала
+        self.__file: TextIO | None = None
+        self.__compaction: threading.Thread | None = None
+
+    @property
+    def path(self) -> str:
+        return self.__path
+
+    @staticmethod
+    def exists(snapshot_path: str) -> bool:
+        """Проверит, остался ли журнал от прошлого сеанса"""
+        return os.path.exists(f'{snapshot_path}.journal') or os.path.exists(f'{snapshot_path}.journal.old')
+
+    def replay(self, libraries: tuple[Library, ...]) -> tuple[Library, ...]:
+        """Применит к загруженному снимку записи журнала, которых в нём ещё нет"""
+        snapshot_seq = JsonConverter.read_journal_seq(self.__snapshot_path)
+        self.__seq = snapshot_seq
+        replayed = 0
+        for path in (self.__old_path, self.__path):
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r', encoding=JsonConverter.ENCODING) as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:  # запись, оборванная при сбое; за ней могут идти дописанные
+                        logger.error('Пропущена повреждённая запись журнала %s', path)
+                        continue
+                    if record['seq'] <= snapshot_seq:
+                        continue
+                    libraries = self._apply(libraries, record)
+                    self.__seq = record['seq']
+                    replayed += 1
+        if replayed:
+            print(f'[INFO] Из журнала восстановлено изменений: {replayed}')
+        return libraries
+
+    @staticmethod
+    def _apply(libraries: tuple[Library, ...], record: dict) -> tuple[Library, ...]:
+        """Применит одну запись журнала"""
+        operation = record['op']
+        if operation == 'create_library':
+            return libraries + (Library(record['name'], record.get('columnar', False)),)
+        index = record['library']
+        if operation == 'delete_library':
+            return libraries[:index] + libraries[index + 1:]
+        library = libraries[index]
+        if operation == 'add':
+            library._insert_book(JsonConverter.record_to_book(record['book']))
+        elif operation == 'delete':
+            library._remove_book(record['id'])
+        elif operation == 'status':
+            library._set_book_status(record['id'], record['status'])
+        return libraries
+
+    def open(self) -> None:
+        """Откроет журнал на дозапись"""
+        self.__file = open(self.__path, 'a', encoding=JsonConverter.ENCODING)
+
+    def attach(self, library: Library) -> None:
+        """Начнёт записывать изменения библиотеки"""
+        library.subscribe(self._on_library_change)
+
+    def _on_library_change(self, library: Library, operation: str, data: dict) -> None:
+        """Запишет изменение книги библиотеки"""
+        record = {'op': operation, 'library': self.__libraries().index(library)}
+        if operation == 'add':
+            record['book'] = JsonConverter.book_to_record(data['book'])
+        else:
+            record.update(data)
+        self.write(record)
+
+    def log_create_library(self, library: Library) -> None:
+        self.write({'op': 'create_library', 'name': library.name, 'columnar': library.columnar})
+
+    def log_delete_library(self, index: int) -> None:
+        self.write({'op': 'delete_library', 'library': index})
+
+    def write(self, record: dict) -> None:
+        """Допишет запись в конец журнала: O(1) ввода-вывода на изменение"""
+        self.__seq += 1
+        record['seq'] = self.__seq
+        self.__file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.__file.flush()
+        if self.__fsync:
+            os.fsync(self.__file.fileno())
+        self.__records += 1
+        if self.__records >= self.__threshold:
+            self.compact(background=True)
+
+    def compact(self, background: bool = False) -> None:
+        """Сожмёт журнал в снимок. Новые изменения в это время пишутся в свежий файл журнала"""
+        self.wait()
+        self.__file.close()
+        self._rotate()
+        self.open()
+        self.__records = 0
+        # Состав библиотек фиксируется сразу, на диск снимок пишется в фоне.
+        # Статусы, изменённые после фиксации, восстановятся из журнала: запись статуса идемпотентна
+        snapshot = tuple((library.name, tuple(library.stored_books), library.columnar)
+                         for library in self.__libraries())
+        if background:
+            self.__compaction = threading.Thread(target=self._write_snapshot, args=(snapshot, self.__seq))
+            self.__compaction.start()
+        else:
+            self._write_snapshot(snapshot, self.__seq)
+
+    def _rotate(self) -> None:
+        """Сделает текущий журнал сжимаемым. Если сжимаемый журнал уже есть (сжатие не удалось или файл остался
+        от прошлого сеанса), его записи ещё не в снимке: текущий журнал дописывается к нему, а не заменяет его"""
+        if not os.path.exists(self.__old_path):
+            os.replace(self.__path, self.__old_path)
+            return
+        with open(self.__old_path, 'r+', encoding=JsonConverter.ENCODING) as old, \
+                open(self.__path, 'r', encoding=JsonConverter.ENCODING) as current:
+            old.seek(0, os.SEEK_END)
+            if old.tell():
+                old.seek(old.tell() - 1)
+                if old.read(1) != '\n':  # последняя запись оборвана при сбое
+                    old.write('\n')
+            shutil.copyfileobj(current, old)
+            old.flush()
+            os.fsync(old.fileno())
+        os.remove(self.__path)
+
+    def _write_snapshot(self, snapshot: tuple[tuple[str, tuple[Book, ...], bool], ...], seq: int) -> None:
+        """Запишет снимок и удалит вошедший в него журнал"""
+        JsonConverter.write_snapshot(snapshot, self.__snapshot_path, seq)
+        os.remove(self.__old_path)
+
+    def wait(self) -> None:
+        """Дождётся окончания фонового сжатия"""
+        if self.__compaction is not None:
+            self.__compaction.join()
+            self.__compaction = None
+
+    def close(self, checkpoint: bool = False) -> None:
+        """Закроет журнал. При checkpoint сохранит снимок и удалит журнал"""
+        if checkpoint:
+            self.compact()
+            self.__file.close()
+            os.remove(self.__path)
+        else:
+            self.wait()
+            self.__file.close()
@@ -1,13 +1,22 @@
 # -*- coding: utf-8 -*-
 import unittest
-from unittest import TestCase
+from unittest import TestCase, IsolatedAsyncioTestCase
 from unittest.mock import patch
 import logging
+import json
+import asyncio
+import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
+from io import StringIO
 
 # добавляем корень проекта в PYTHONPATH для запуска впервые на компьютере проверяющего
 import os
 import sys
+import shutil
+import tempfile
+import time
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
 if parent_dir not in sys.path:
@@ -20,11 +29,9 @@ class Mock(TestCase):
     book = main.Book(1, 'title', 'author', 1)
     book2 = main.Book(2, 'title2', 'author2', 2)
     library = main.Library('name')
-    library._Library__stored_ids.append(1)
-    library._Library__stored_books.append(book)
+    library._Library__books[1] = book
     library2 = main.Library('name2')
-    library2._Library__stored_ids.append(2)
-    library2._Library__stored_books.append(book)
+    library2._Library__books[2] = book
 
 
 class BookTest(TestCase):
@@ -35,26 +42,354 @@ class BookTest(TestCase):
         book.change_standard_status()
         self.assertEqual(book.status, 'в наличии')
 
+    def test_compact_representation(self):
+        book = main.Book(1, 'title', ''.join(['aut', 'hor']), 1, ''.join(['выд', 'ана']))
+        self.assertFalse(hasattr(book, '__dict__'))
+        self.assertIs(book.status, main.Book.STANDARD_STATUSES[1])
+        self.assertIs(book.author, main.Book(2, 'title2', ''.join(['auth', 'or']), 2).author)
+
+
+class IdAllocatorTest(TestCase):
+    def test_allocate_fills_gaps_first(self):
+        allocator = main.IdAllocator()
+        allocator.rebuild([1, 4, 2, 6])
+        self.assertEqual([allocator.allocate() for _ in range(4)], [3, 5, 7, 8])
+
+    def test_release(self):
+        allocator = main.IdAllocator()
+        allocator.rebuild([1, 2, 3])
+        allocator.release(2)
+        allocator.release(1)
+        self.assertEqual([allocator.allocate() for _ in range(3)], [1, 2, 4])
+
+    def test_sparse_ids(self):
+        allocator = main.IdAllocator()
+        allocator.rebuild([2, 4, 10 ** 12])
+        allocator.reserve(10 ** 15)
+        allocator.reserve(5)
+        self.assertEqual([allocator.allocate() for _ in range(3)], [1, 3, 6])
+        allocator.release(10 ** 12)
+        allocator.release(4)
+        self.assertEqual([allocator.allocate() for _ in range(2)], [4, 7])
+        library = main.Library('name')
+        library.load([main.Book(10 ** 12, 'title', 'author', 2000)])
+        library.insert_books([main.Book(10 ** 15, 'title', 'author', 2000)])
+        self.assertEqual([book.id for book in library.add_books([('t', 'a', 1), ('t', 'a', 2)])], [1, 2])
+
 
 class LibraryTest(TestCase):
+    columnar = False
+    thread_safe = False
+
+    def setUp(self):
+        self.library = self._library('name')
+        self.library._Library__books[1] = Mock.book
+
+    def _library(self, name):
+        return main.Library(name, self.columnar, self.thread_safe)
+
     def test__find_book_by_id(self):
-        self.assertEqual(Mock.library._find_book_by_id(1), Mock.book)
+        self.assertEqual(self.library._find_book_by_id(1), Mock.book)
 
     def test__find_book_by_id_none(self):
-        self.assertEqual(Mock.library._find_book_by_id(2), None)
+        self.assertEqual(self.library._find_book_by_id(2), None)
 
     def test_load(self):
-        empty_library = main.Library('name')
+        empty_library = self._library('name')
         empty_library.load([Mock.book, Mock.book2])
 
         self.assertIn(Mock.book, empty_library.stored_books)
         self.assertIn(Mock.book2, empty_library.stored_books)
 
+    def test_stored_views(self):
+        library = self._library('name')
+        library.load([Mock.book2, Mock.book])
+        self.assertEqual(list(library.stored_ids), [2, 1])
+        self.assertEqual(list(library.stored_books), [Mock.book2, Mock.book])
+        self.assertFalse(hasattr(library.stored_ids, 'append'))
+
+    def test_find_book(self):
+        library = self._library('name')
+        library.load([Mock.book, Mock.book2, main.Book(3, 'title', 'author2', 2)])
+        with patch('sys.stdout', new_callable=StringIO) as stdout:
+            library.find_book('title', 'author2', 2)
+        self.assertIn('Полное совпадение:\n    3:', stdout.getvalue())
+        self.assertIn('Совпадения автора и года:\n    2:', stdout.getvalue())
+        self.assertIn('Совпадения заголовка:\n    1:', stdout.getvalue())
+
+    def test_delete_book_updates_indexes(self):
+        library = self._library('name')
+        library.load([Mock.book, Mock.book2])
+        with patch('builtins.input', return_value='1'), patch('sys.stdout', new_callable=StringIO):
+            library.delete_book()
+        with patch('sys.stdout', new_callable=StringIO) as stdout:
+            library.find_book('title')
+        self.assertNotIn('    1:', stdout.getvalue())
+
+    def test_search_cache(self):
+        library = self._library('name')
+        library.load([deepcopy(Mock.book), deepcopy(Mock.book2)])
+        self.assertEqual([book.id for book in library.search(author='author')['author']], [1])
+        self.assertEqual([book.id for book in library.search(author='AUTHOR')['author']], [1])
+        self.assertEqual(library.search_cache_info['hits'], 1)
+        library.add_books([('title3', 'author', 3)])
+        self.assertEqual([book.id for book in library.search(author='author')['author']], [1, 3])
+        library.set_statuses({3: 'выдана'})
+        self.assertEqual(library.search(author='author')['author'][1].status, 'выдана')
+        library.delete_books([1])
+        self.assertEqual([book.id for book in library.search(author='author')['author']], [3])
+        self.assertEqual(library.search_cache_info['misses'], 4)
+        library.SEARCH_CACHE_SIZE = 1
+        library.search(author='author2')
+        library.search(author='author')
+        self.assertEqual(library.search_cache_info['size'], 1)
+        library.SEARCH_CACHE_BYTES = 0
+        library.search(year=3)
+        self.assertEqual((library.search_cache_info['size'], library.search_cache_info['bytes']),
+                         (1, library.CACHED_HIT_BYTES))
+
+    def test_fuzzy_search(self):
+        library = self._library('name')
+        library.add_books([('Война и мир', 'Л. Н. Толстой', 1869), ('Анна Каренина', 'Лев Толстой', 1878),
+                           ('Война и мир. Том 2', 'Толстой', 1869), ('Мир', 'Автор', 1869)])
+
+        def ids(results, key):
+            return [book.id for book in results[key]]
+        self.assertEqual(ids(library.search(author='толстой'), 'author'), [3, 1, 2])
+        self.assertEqual(ids(library.search(author='Толтой'), 'author'), [1, 2, 3])
+        self.assertEqual(ids(library.search(title='войн'), 'title'), [1, 3])
+        self.assertEqual(ids(library.search(title='ВОЙНА И МИР'), 'title'), [1, 3])
+        self.assertEqual(ids(library.search(title='МИР', year=1869), 'title_year'), [4, 1, 3])
+        self.assertEqual(main.TextIndex.tokenize('Ｐｙｔｈｏｎ ３, Ё'), ['python', '3', 'ё'])
+        self.assertEqual(library.search(title='Каренина', author='Толстой')['title_author'][0].id, 2)
+        self.assertEqual(library.search(title='Гарри'), {'title': []})
+        library.add_books([('Бесы', 'Достоевский', 1872)])
+        self.assertEqual(ids(library.search(author='Дастаевский'), 'author'), [5])  # две опечатки
+        library.add_books([('Идиот', 'Дастоевский', 1869)])
+        self.assertEqual(ids(library.search(author='Дастаевский'), 'author'), [6])  # одна опечатка важнее двух
+        library.delete_books([1, 3])
+        self.assertEqual(ids(library.search(title='войн'), 'title'), [])
+
+    def test_query(self):
+        library = self._library('name')
+        library.load([main.Book(id_, f'title{id_}', f'author{id_ % 3}', 1980 + id_) for id_ in range(1, 31)])
+
+        def ids(**conditions):
+            return [book.id for book in library.query(**conditions)]
+        self.assertEqual(ids(year_from=2005, year_to=2007), [25, 26, 27])
+        self.assertEqual(ids(year_to=1982), [1, 2])
+        self.assertEqual(ids(year=[1981, 1990, 3000]), [1, 10])
+        self.assertEqual(ids(author=['author1', 'author2'], year_from=2001, year_to=2004), [22, 23])
+        library.set_statuses({3: 'выдана', 4: 'выдана'})
+        with patch('builtins.input', return_value='4'), patch('sys.stdout', new_callable=StringIO):
+            library.change_book_status()  # снова в наличии
+        self.assertEqual(ids(status='выдана'), [3])
+        self.assertEqual(ids(status=['выдана', 'в ремонте'], year_from=1980), [3])
+        library.delete_books([29, 30])
+        self.assertEqual(ids(year_from=2008), [28])
+        self.assertEqual(len(ids()), 28)
+        self.assertEqual([library.query_count(year_from=2005, year_to=2007), library.query_count(year_from=2008),
+                          library.query_count(), library.query_count(author='author1', year_from=2001)], [3, 1, 28, 3])
+        with patch('sys.stdout', new_callable=StringIO) as stdout:
+            library.select_books(title='title7', year_from=1900)
+        self.assertIn('    7: ', stdout.getvalue())
+
+    def test_page(self):
+        library = self._library('name')
+        library.load([main.Book(id_, f'Title{id_ % 4}', f'author{id_ % 3}', 2000 + id_ % 5) for id_ in range(1, 24)])
+        for sort_key in main.Library.SORT_KEYS:
+            pages, cursor = [], None
+            while True:
+                books, cursor = library.page(5, sort_key, cursor)
+                pages.append(books)
+                if cursor is None:
+                    break
+            self.assertEqual([len(books) for books in pages], [5, 5, 5, 5, 3])
+            field = main.Library.SORT_KEYS.index(sort_key)
+            expected = sorted(library.stored_books, key=lambda book: (
+                (book.id, book.title.casefold(), book.author, book.year, book.status)[field], book.id))
+            self.assertEqual([book for books in pages for book in books], expected)
+        self.assertEqual(library.page(23), (sorted(library.stored_books, key=lambda book: book.id), None))
+        with self.assertRaises(ValueError):
+            library.page(5, 'pages')
+        with patch('sys.stdout', new_callable=StringIO) as stdout:
+            library.view_books_page()
+        self.assertIn('20: Книга', stdout.getvalue())
+        self.assertNotIn('21: Книга', stdout.getvalue())
+        self.assertIn('[INFO] Показаны книги 1-20 из 23', stdout.getvalue())
+        with patch('builtins.input', side_effect=['']), patch('sys.stdout', new_callable=StringIO) as stdout:
+            library.view_all_books(page_size=20)
+        self.assertIn('[INFO] Показаны книги 21-23 из 23', stdout.getvalue())
+
+    def test_output_sink(self):
+        library = self._library('name')
+        library.load([Mock.book, Mock.book2])
+        library.output = main.BufferSink()
+        with patch('sys.stdout', new_callable=StringIO) as stdout:
+            library.view_all_books()
+            library.find_book('title2')
+        self.assertNotIn('    1: ', stdout.getvalue())
+        self.assertEqual(library.output.lines, [Mock.book.__str__(), Mock.book2.__str__(),
+                                                'Совпадения заголовка:', Mock.book2.__str__()])
+        with tempfile.TemporaryFile('w+', encoding='utf-8') as file:
+            sink = main.FileSink(file)
+            sink.CHUNK_LINES = 2
+            sink.write_lines(str(number) for number in range(5))
+            sink.write('end')
+            file.seek(0)
+            self.assertEqual(file.read(), '0\n1\n2\n3\n4\nend\n')
+
+    def test_batch_api(self):
+        library = self._library('name')
+        created = library.add_books([('title', 'author', 1), ('title2', 'author2', '2', 'выдана')])
+        self.assertEqual([book.id for book in created], [1, 2])
+        self.assertEqual([book.id for book in library.search('title', year=2)['title']], [1])
+        self.assertEqual([book.id for book in library.set_statuses({1: 'выдана', 5: 'выдана'})], [1])
+        self.assertEqual([book.id for book in library.delete_books([2, 5])], [2])
+        self.assertEqual(library.search(author='author'), {'author': [main.Book(1, 'title', 'author', 1)]})
+        self.assertEqual(library.search(author='author')['author'][0].status, 'выдана')
+        with self.assertRaises(ValueError):
+            library.add_books([('title', 'author', 'year')])
+
     def test_load_asserts(self):
         with self.assertRaises(AssertionError):
-            Mock.library.load([Mock.book, Mock.book2])
+            self.library.load([Mock.book, Mock.book2])
+        with self.assertRaises(AssertionError):
+            self.library.load([Mock.book, Mock.book])
         with self.assertRaises(AssertionError):
-            Mock.library.load([Mock.book, Mock.book])
+            self._library('name').load([Mock.book, Mock.book])
+
+
+class ColumnarLibraryTest(LibraryTest):
+    columnar = True
+
+    def test_status_is_written_back(self):
+        library = self._library('name')
+        library.load([Mock.book, Mock.book2])
+        with patch('builtins.input', return_value='2'), patch('sys.stdout', new_callable=StringIO):
+            library.change_book_status()
+        self.assertEqual(library._find_book_by_id(2).status, 'выдана')
+        self.assertEqual(Mock.book2.status, 'в наличии')
+
+
+class ThreadSafeLibraryTest(LibraryTest):
+    thread_safe = True
+
+    def test_read_write_lock(self):
+        lock = main.ReadWriteLock()
+        with lock.write(), lock.write(), lock.read():
+            pass
+        with lock.read(), lock.read():
+            with self.assertRaises(RuntimeError):
+                lock.acquire_write()
+        reading, release, released = threading.Event(), threading.Event(), threading.Event()
+
+        def reader():
+            with lock.read():
+                reading.set()
+                release.wait()
+                time.sleep(0.05)  # писатель успеет запросить блокировку, пока читатель внутри
+            released.set()
+        thread = threading.Thread(target=reader)
+        thread.start()
+        reading.wait()
+        with lock.read():  # второй читатель не ждёт первого
+            release.set()
+        with lock.write():  # писатель дождался читателя
+            self.assertTrue(released.is_set())
+        thread.join()
+
+    def test_search_cache_concurrent_misses(self):
+        library = self._library('name')
+        library.load([deepcopy(Mock.book), deepcopy(Mock.book2), main.Book(3, 'title3', 'author', 3)])
+        cache = library._Library__search_cache
+        results = library.ranked_search(author='author')
+        key, = cache
+        library.clear_search_cache()
+        self.assertIsNone(library._cached_search(key))  # два читателя не нашли запрос в кеше
+        self.assertIsNone(library._cached_search(key))
+        library._cache_search(key, results)
+        library._cache_search(key, results)
+        self.assertEqual((library.search_cache_info['size'], library.search_cache_info['bytes']),
+                         (1, 2 * library.CACHED_HIT_BYTES))
+        library.SEARCH_CACHE_SIZE = 2
+        authors = ('author', 'author2', 'title', 'title3')
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(lambda number: library.search(author=authors[number % len(authors)]), range(2000)))
+        self.assertEqual(library.search_cache_info['bytes'], library.CACHED_HIT_BYTES
+                         * sum(len(ranked) for found in cache.values() for ranked in found.values()))
+        self.assertEqual(library.search_cache_info['size'], 2)
+
+    def test_thread_pool_stress(self):
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)  # потоки переключаются как можно чаще
+        self.addCleanup(sys.setswitchinterval, interval)
+        for columnar in (False, True):
+            with self.subTest(columnar=columnar):
+                self._stress(main.Library('name', columnar, thread_safe=True))
+
+    def _stress(self, library):
+        library.load([main.Book(id_, f'title{id_}', f'author{id_ % 10}', 2000 + id_ % 20) for id_ in range(1, 501)])
+        snapshot = library.snapshot_books()
+        library.set_statuses({1: 'выдана'})
+        self.assertEqual(snapshot[0].status, 'в наличии')
+        library.search(author='writr')  # индекс n-грамм уже построен и изменяется вместе с книгами
+
+        def write(number: int) -> int:
+            added = library.add_books([(f'new{number}', 'writer', 2000), (f'old{number}', 'writer', 2001)])
+            library.set_statuses({added[0].id: 'выдана', number % 500 + 1: 'выдана'})
+            library.delete_books([added[1].id])  # освободившийся номер достанется следующей книге
+            return added[0].id
+
+        def read(number: int) -> bool:
+            books = library.snapshot_books()
+            ids = [book.id for book in books]
+            author = f'author{number % 10}'
+            found = library.search(author=author)['author']
+            prefixed = library.search(title='ne')['title']  # по началу слова
+            fuzzy = library.search(author='writr')['author']  # с опечаткой
+            book = library._find_book_by_id(number % 500 + 1)
+            return (len(ids) == len(set(ids)) and all(book.author == author for book in found)
+                    and all(book.title.startswith('new') for book in prefixed)
+                    and all(book.author == 'writer' for book in fuzzy)
+                    and len(library.query(author='writer', status='в наличии')) <= len(books)
+                    and book is not None and book.id == number % 500 + 1)
+
+        with patch('sys.stdout', new_callable=StringIO), ThreadPoolExecutor(8) as pool:
+            writes = [pool.submit(write, number) for number in range(200)]
+            reads = [pool.submit(read, number) for number in range(400)]
+            kept = [future.result() for future in writes]
+            self.assertTrue(all(future.result() for future in reads))
+        self.assertEqual(len(set(kept)), 200)
+        books = library.snapshot_books()
+        self.assertEqual(len(books), 700)
+        self.assertEqual([book.id for book in library.query()], sorted(book.id for book in books))
+        self.assertEqual({book.id for book in library.query(status='выдана')},
+                         {book.id for book in books if book.status == 'выдана'})
+        self.assertEqual(len(library.search(title='ne')['title']), 200)
+        self.assertFalse(pickle.loads(pickle.dumps(library)).thread_safe)
+
+
+class ColumnarBookStoreTest(TestCase):
+    def test_mapping(self):
+        store = main.ColumnarBookStore()
+        for id_ in (5, 1, 10 ** 9, 3):
+            store[id_] = main.Book(id_, f'title{id_}', 'author', id_ % 100)
+        del store[1]
+        store[5] = main.Book(5, 'new title', 'author', 5, 'выдана')
+        self.assertEqual(list(store), [5, 10 ** 9, 3])
+        self.assertEqual(len(store), 3)
+        self.assertNotIn(1, store)
+        self.assertEqual((store[5].title, store[5].status), ('new title', 'выдана'))
+        self.assertEqual(list(store.iter_index_fields())[1], (10 ** 9, f'title{10 ** 9}', 'author', 0, 'в наличии'))
+
+    def test_compaction(self):
+        store = main.ColumnarBookStore((id_, main.Book(id_, 't', 'a', 1)) for id_ in range(1, 3001))
+        for id_ in range(1, 2001):
+            del store[id_]
+        self.assertEqual(len(store), 1000)
+        self.assertEqual(list(store)[:2], [2001, 2002])
+        self.assertEqual(store[3000].id, 3000)
 
 
 class JsonConverterTest(TestCase):
@@ -68,6 +403,135 @@ class JsonConverterTest(TestCase):
         self.assertEqual(main.JsonConverter.open_json('mock.json'),
                          {'Library(One_more_since_we_can)': {'Book(PEP 20, Тим Петерс, 1999, выдана)': 1}})
 
+    def test_iter_libraries(self):
+        with patch.object(main.JsonConverter.StreamReader, 'CHUNK_SIZE', 3):
+            libraries = [(name, list(books)) for name, books in main.JsonConverter.iter_libraries('mock.json')]
+        self.assertEqual(libraries, [('One_more_since_we_can', [main.Book(1, 'PEP 20', 'Тим Петерс', 1999)])])
+        self.assertEqual(libraries[0][1][0].status, 'выдана')
+
+    def test_iter_libraries_skips_unread_books(self):
+        names = [name for name, _ in main.JsonConverter.iter_libraries('../libraries.json')]
+        self.assertEqual(names, ['first_library', 'One_more_since_we_can'])
+
+    def test_save_json_round_trip(self):
+        library = main.Library('name, (1)')
+        library.load([main.Book(5, 'Title, with (parens)', 'Author, Jr.', -3, 'в ремонте'), Mock.book2])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'libraries.json')
+            with patch('sys.stdout', new_callable=StringIO):
+                main.JsonConverter.save_json((library, main.Library('empty')), path)
+            self.assertEqual(main.JsonConverter.detect_format(path), main.JsonConverter.FORMAT_VERSION)
+            loaded = [(name, list(books)) for name, books in main.JsonConverter.iter_libraries(path)]
+        self.assertEqual(loaded, [('name, (1)', list(library.stored_books)), ('empty', [])])
+        self.assertEqual(loaded[0][1][0].status, 'в ремонте')
+
+    def test_migrate(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'libraries.json')
+            shutil.copy('mock.json', path)
+            self.assertEqual(main.JsonConverter.detect_format(path), 1)
+            libraries = ()
+            for name, books in main.JsonConverter.iter_libraries(path):
+                library = main.Library(name)
+                library.load(books)
+                libraries += (library,)
+            with patch.object(main.JsonConverter, 'write_records', side_effect=OSError('диск')):
+                with self.assertRaises(OSError):
+                    main.JsonConverter.migrate(libraries, path)
+            self.assertEqual(main.JsonConverter.detect_format(path), 1)  # сбой записи не оставил путь пустым
+            with patch('sys.stdout', new_callable=StringIO):
+                main.JsonConverter.migrate(libraries, path)
+            self.assertEqual(main.JsonConverter.detect_format(path), 2)
+            self.assertEqual(main.JsonConverter.detect_format(path + '.v1'), 1)
+            self.assertEqual([(name, list(books)) for name, books in main.JsonConverter.iter_libraries(path)],
+                             [('One_more_since_we_can', [main.Book(1, 'PEP 20', 'Тим Петерс', 1999)])])
+
+    def test_atomic_write_keeps_old_file_on_error(self):
+        def broken_write(file):
+            file.write('{"format_version": 2, "libr')
+            raise RuntimeError
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'libraries.json')
+            main.JsonConverter.atomic_write(path, lambda file: file.write('old'))
+            with self.assertRaises(RuntimeError):
+                main.JsonConverter.atomic_write(path, broken_write)
+            self.assertEqual(os.listdir(directory), ['libraries.json'])
+            with open(path, encoding='utf-8') as file:
+                self.assertEqual(file.read(), 'old')
+
+    def test_atomic_write_rotates_backups(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'libraries.json')
+            for version in range(4):
+                main.JsonConverter.atomic_write(path, lambda file: file.write(str(version)), backups=2)
+            contents = []
+            for file_path in (path, main.JsonConverter.backup_path(path, 1), main.JsonConverter.backup_path(path, 2)):
+                with open(file_path, encoding='utf-8') as file:
+                    contents.append(file.read())
+        self.assertEqual(contents, ['3', '2', '1'])
+        self.assertTrue(main.JsonConverter.backup_path(path, 1).endswith('libraries_backup.json'))
+
+    def test_binary_snapshot(self):
+        library = main.Library('name')
+        library.load([main.Book(3, 'title', 'author2', 2), Mock.book2, main.Book(1, 'Заголовок', 'Автор', 1, 'x')])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'libraries.bin')
+            main.JsonConverter.write_snapshot([(library.name, library.stored_books), ('empty', [])], path, 7)
+            self.assertEqual(main.JsonConverter.detect_format(path), main.JsonConverter.BINARY_FORMAT)
+            self.assertEqual(main.JsonConverter.read_journal_seq(path), 7)
+            mapped, empty = main.JsonConverter.open_binary(path)
+            self.assertEqual((mapped.name, len(empty.stored_ids)), ('name', 0))
+            self.assertEqual(list(mapped.stored_ids), [3, 2, 1])
+            self.assertEqual(list(mapped.stored_books), list(library.stored_books))
+            self.assertEqual(mapped._find_book_by_id(1).status, 'x')
+            self.assertIn(2, mapped.stored_ids)
+            with patch('sys.stdout', new_callable=StringIO) as stdout:
+                self.assertIsNone(mapped._find_book_by_id(4))
+                mapped.find_book('title', 'author2')
+            self.assertIn('Совпадения заголовка и автора:\n    3:', stdout.getvalue())
+            mapped._set_book_status(2, 'выдана')  # первое изменение переносит книги в dict
+            self.assertEqual(mapped._find_book_by_id(2).status, 'выдана')
+            del mapped, empty
+
+    def test_load_libraries_keeps_columnar(self):
+        library = main.Library('columnar', columnar=True)
+        library.load([Mock.book2])
+        with tempfile.TemporaryDirectory() as directory:
+            for file_name in ('libraries.json', 'libraries.bin'):
+                path = os.path.join(directory, file_name)
+                main.JsonConverter.write_snapshot(main.JsonConverter.library_entries((library, Mock.library)), path)
+                loaded = main.JsonConverter.load_libraries(path)
+                self.assertEqual([item.columnar for item in loaded], [True, False])
+                self.assertEqual(list(loaded[0].stored_books), [Mock.book2])
+            del loaded
+
+    def test_sharded_snapshot(self):
+        libraries = []
+        for number in range(3):
+            library = main.Library(f'name{number}', columnar=number == 1)
+            library.add_books((f'title{index}', 'author', index) for index in range(number + 1))
+            libraries.append(library)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'libraries.manifest')
+            for generation in range(3):
+                main.JsonConverter.write_snapshot(main.JsonConverter.library_entries(libraries), path,
+                                                  journal_seq=generation + 5, workers=2)
+            self.assertEqual(main.JsonConverter.detect_format(path), main.JsonConverter.MANIFEST_FORMAT)
+            self.assertEqual(main.JsonConverter.read_journal_seq(path), 7)
+            # остались части текущего поколения и поколения резервной копии манифеста
+            self.assertEqual(len(os.listdir(path + '.shards')), 6)
+            with patch('sys.stdout', new_callable=StringIO):
+                loaded = main.JsonConverter.load_libraries(path, workers=2)
+                sequential = main.JsonConverter.load_libraries(path, workers=1)
+            for result in (loaded, sequential):
+                self.assertEqual([(library.name, library.columnar, list(library.stored_books)) for library in result],
+                                 [(library.name, library.columnar, list(library.stored_books))
+                                  for library in libraries])
+            self.assertEqual([name for name, _ in main.JsonConverter.iter_libraries(path)],
+                             ['name0', 'name1', 'name2'])
+            self.assertEqual(len(loaded[2].search(author='author')['author']), 3)
+
     def test_split_str(self):
         self.assertEqual(main.JsonConverter.split_str('Book(some, some1, some2)'),
                          ('some', 'some1', 'some2'))
@@ -78,5 +542,358 @@ class JsonConverterTest(TestCase):
             [Mock.book, Mock.book2])
 
 
+class BookTransferTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _path(self, name, text=None):
+        path = os.path.join(self.directory.name, name)
+        if text is not None:
+            with open(path, 'w', encoding='utf-8', newline='') as file:
+                file.write(text)
+        return path
+
+    def test_import_csv(self):
+        path = self._path('books.csv', 'id,title,author,year,status\n'
+                                       '3,"Заголовок, с запятой",author,1990,\n'
+                                       '1,title,author,1,выдана\n'
+                                       ',title2,author2,1991,\n'
+                                       '4,title,author,1.5,\n'
+                                       '3,title,author,2000,\n')
+        library = main.Library('name')
+        library.load([deepcopy(Mock.book)])
+        added, rejected = main.BookTransfer.import_books(library, path, chunk_size=2)
+        self.assertEqual(added, 2)
+        self.assertEqual([line_number for line_number, _ in rejected], [3, 5, 6])
+        self.assertEqual(sorted(library.stored_ids), [1, 2, 3])
+        self.assertEqual(library._find_book_by_id(3).title, 'Заголовок, с запятой')
+
+    def test_import_jsonl(self):
+        path = self._path('books.jsonl', '{"title": "title", "author": "author", "year": 1}\n\n'
+                                         'не json\n'
+                                         '{"id": 7, "title": "title", "author": "author", "year": "2"}\n'
+                                         '[1, 2]\n'
+                                         '{"id": 2147483648, "title": "title", "author": "author", "year": 1}\n'
+                                         '{"title": "title", "author": "author", "year": 1099511627776}\n')
+        library = main.Library('name', columnar=True)
+        added, rejected = main.BookTransfer.import_books(library, path)
+        self.assertEqual(added, 2)
+        self.assertEqual([line_number for line_number, _ in rejected], [3, 5, 6, 7])
+        self.assertEqual(sorted(library.stored_ids), [1, 7])
+        with self.assertRaises(ValueError):
+            library.insert_books([main.Book(2 ** 31, 'title', 'author', 1)])
+        self.assertEqual(sorted(library.stored_ids), [1, 7])
+
+    def test_export_round_trip(self):
+        library = main.Library('name')
+        library.load([deepcopy(Mock.book), main.Book(2, 'Заголовок, "в кавычках"', 'author', 2, 'выдана')])
+        for name in ('books.csv', 'books.jsonl'):
+            self.assertEqual(main.BookTransfer.export_books(library, self._path(name)), 2)
+            imported = main.Library('imported')
+            self.assertEqual(main.BookTransfer.import_books(imported, self._path(name)), (2, []))
+            self.assertEqual([(book.id, book.title, book.status) for book in imported.stored_books],
+                             [(book.id, book.title, book.status) for book in library.stored_books])
+        with self.assertRaises(ValueError):
+            main.BookTransfer.export_books(library, self._path('books.txt'))
+
+
+class JournalTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'libraries.json')
+        self.libraries = (main.Library('name'),)
+        self.libraries[0].load([deepcopy(Mock.book)])
+        main.JsonConverter.write_snapshot(((library.name, library.stored_books) for library in self.libraries),
+                                          self.path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _journal(self, threshold=main.Journal.COMPACT_THRESHOLD):
+        journal = main.Journal(self.path, lambda: self.libraries, threshold)
+        journal.open()
+        for library in self.libraries:
+            journal.attach(library)
+        return journal
+
+    def _reload(self):
+        libraries = ()
+        for name, books in main.JsonConverter.iter_libraries(self.path):
+            library = main.Library(name)
+            library.load(books)
+            libraries += (library,)
+        return main.Journal(self.path, lambda: libraries).replay(libraries)
+
+    def test_replay(self):
+        journal = self._journal()
+        self.libraries[0]._insert_book(deepcopy(Mock.book2))
+        self.libraries[0]._set_book_status(2, 'выдана')
+        self.libraries[0]._remove_book(1)
+        created = main.Library('created')
+        self.libraries += (created,)
+        journal.log_create_library(created)
+        journal.close()
+        with patch('sys.stdout', new_callable=StringIO):
+            libraries = self._reload()
+        self.assertEqual([library.name for library in libraries], ['name', 'created'])
+        self.assertEqual(list(libraries[0].stored_books), [Mock.book2])
+        self.assertEqual(libraries[0]._find_book_by_id(2).status, 'выдана')
+
+    def test_compaction(self):
+        journal = self._journal(threshold=2)
+        self.libraries[0]._insert_book(deepcopy(Mock.book2))
+        self.libraries[0]._set_book_status(2, 'выдана')  # второе изменение запускает сжатие
+        self.libraries[0]._remove_book(1)
+        journal.close()
+        self.assertEqual(main.JsonConverter.read_journal_seq(self.path), 2)
+        with open(journal.path, encoding='utf-8') as file:
+            self.assertEqual(len(file.readlines()), 1)
+        with patch('sys.stdout', new_callable=StringIO):
+            libraries = self._reload()
+        self.assertEqual(list(libraries[0].stored_ids), [2])
+
+    def test_failed_compaction_keeps_records(self):
+        journal = self._journal()
+        self.libraries[0]._insert_book(deepcopy(Mock.book2))
+        with patch.object(main.JsonConverter, 'write_snapshot', side_effect=OSError('диск')):
+            with self.assertRaises(OSError):
+                journal.compact()
+            self.libraries[0]._set_book_status(2, 'выдана')
+            with self.assertRaises(OSError):
+                journal.compact()  # не затирает журнал, не вошедший в снимок после первого сбоя
+        self.libraries[0]._remove_book(1)
+        journal.close()
+        with patch('sys.stdout', new_callable=StringIO):
+            libraries = self._reload()
+        self.assertEqual(list(libraries[0].stored_ids), [2])
+        self.assertEqual(libraries[0]._find_book_by_id(2).status, 'выдана')
+
+    def test_checkpoint(self):
+        journal = self._journal()
+        self.libraries[0]._insert_book(deepcopy(Mock.book2))
+        journal.close(checkpoint=True)
+        self.assertFalse(main.Journal.exists(self.path))
+        self.assertEqual([len(list(books)) for _, books in main.JsonConverter.iter_libraries(self.path)], [2])
+
+
+class ClientTest(TestCase):
+    def setUp(self):
+        first, second, third = main.Library('first'), main.Library('second', columnar=True), main.Library('third')
+        first.load([main.Book(1, 'Мир', 'Автор', 2000), main.Book(2, 'Война и мир', 'Толстой', 1869)])
+        second.load([main.Book(1, 'Война и мир', 'Л. Н. Толстой', 1869), main.Book(5, 'Мир', 'Толстой', 1869)])
+        third.load([main.Book(3, 'Другое', 'Другой', 1)])
+        patcher = patch.object(main.Client, '_Client__libraries', (first, second, third))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_search_all(self):
+        for workers in (1, 3):
+            found = main.Client.search_all('Война и мир', 'Толстой', workers=workers)
+            self.assertEqual([(library.name, book.id) for library, book in found['title_author']],
+                             [('first', 2), ('second', 1)])
+            self.assertEqual([(library.name, book.id) for library, book in found['author']], [('second', 5)])
+            self.assertEqual(found['title'], [])
+        self.assertIs(main.Client._search_pool(2), main.Client._search_pool(3))  # пул не создаётся заново
+        with patch('sys.stdout', new_callable=StringIO) as stdout:
+            main.Client.find_book_everywhere('', '', 1869)
+        self.assertIn("Совпадения года:\n    2: Книга 'Война и мир' автора 'Толстой' 1869 года: в наличии - "
+                      "библиотека 'first'\n    1:", stdout.getvalue())
+
+
+class BatchTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'libraries.json')
+        self.commands_path = os.path.join(self.directory.name, 'commands.jsonl')
+        main.JsonConverter.write_snapshot((('name', [deepcopy(Mock.book)]),), self.path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_run_batch(self):
+        commands = ({'op': 'add', 'library': 'name', 'books': [['title2', 'author2', 2]]},
+                    {'op': 'status', 'library': 'name', 'statuses': {'2': 'выдана'}},
+                    {'op': 'create_library', 'name': 'created', 'columnar': True},
+                    {'op': 'add', 'library': 'created', 'books': [['title3', 'author3', 3]]},
+                    {'op': 'delete', 'library': 'missing', 'ids': [1]},
+                    {'op': 'search', 'library': 'name', 'author': 'author2'},
+                    {'op': 'search_all', 'title': 'title3'})
+        with open(self.commands_path, 'w', encoding='utf-8') as file:
+            file.writelines(json.dumps(command, ensure_ascii=False) + '\n' for command in commands)
+        with patch('sys.stdout', new_callable=StringIO):
+            results = main.Client.run_batch(self.commands_path, self.path, self.path)
+        self.assertEqual(results[0]['result'], [2])
+        self.assertIn('error', results[4])
+        self.assertEqual(results[5]['result']['author'][0]['status'], 'выдана')
+        self.assertEqual(results[6]['result']['title'][0]['library'], 'created')
+        self.assertFalse(main.Journal.exists(self.path))
+        with patch('sys.stdout', new_callable=StringIO):
+            libraries = main.JsonConverter.load_libraries(self.path)
+        self.assertEqual([(library.name, library.columnar, len(library.stored_ids)) for library in libraries],
+                         [('name', False, 2), ('created', True, 1)])
+
+    def test_bad_lines(self):
+        missing = os.path.join(self.directory.name, 'missing', 'books.csv')
+        with open(self.commands_path, 'w', encoding='utf-8') as file:
+            file.write('{"op": "add", "library": "name", "books": [["title2", "author2", 2]]}\n'
+                       'не JSON\n'
+                       '[1, 2]\n'
+                       f'{json.dumps({"op": "import", "library": "name", "path": missing})}\n'
+                       f'{json.dumps({"op": "export", "library": "name", "path": missing})}\n'
+                       '{"op": "status", "library": "name", "statuses": {"2": "выдана"}}\n')
+        with patch('sys.stdout', new_callable=StringIO):
+            results = main.Client.run_batch(self.commands_path, self.path, self.path)
+        self.assertEqual([result['line'] for result in results if 'error' in result], [2, 3, 4, 5])
+        self.assertEqual([results[1]['op'], results[2]['op'], results[3]['op']], [None, None, 'import'])
+        self.assertEqual((results[0]['result'], results[5]['result']), ([2], [2]))
+        self.assertFalse(main.Journal.exists(self.path))
+        with patch('sys.stdout', new_callable=StringIO):
+            library, = main.JsonConverter.load_libraries(self.path)
+        self.assertEqual(library._find_book_by_id(2).status, 'выдана')
+
+    def test_malformed_books(self):
+        with patch('sys.stdout', new_callable=StringIO):
+            main.Client._load(self.path, self.path, False)
+        commands = ({'op': 'add', 'library': 'name', 'books': [[123, 'a', 2000]]},
+                    {'op': 'add', 'library': 'name', 'books': [['t', None, 2000]]},
+                    {'op': 'add', 'library': 'name', 'books': [['t', 'a', 'год']]},
+                    {'op': 'add', 'library': 'name', 'books': [['t', 'a', 2000, 5]]},
+                    {'op': 'add', 'library': 'name', 'books': [['t', 'a', 2000]]})
+        results = list(main.Client.apply_commands(commands))
+        self.assertTrue(all('error' in result for result in results[:4]))
+        self.assertEqual(results[4]['result'], [2])  # ошибочные книги не заняли номер
+        library = main.Client.find_library('name')
+        self.assertEqual(sorted(library.stored_ids), [1, 2])
+        self.assertEqual([book.id for book in library.search(author='a')['author']], [2])
+        with self.assertRaises(ValueError):
+            library.insert_books([main.Book(3, 123, 'a', 2000)])
+        self.assertNotIn(3, library.stored_ids)
+
+
+class LoggerTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'logs', 'main.log')
+
+    def tearDown(self):
+        main.create_logger(logging.ERROR)
+        self.directory.cleanup()
+
+    def test_lazy_file(self):
+        logger = main.create_logger(logging.ERROR, self.path)
+        logger.debug('Введено: %s', 'значение')
+        self.assertFalse(os.path.exists(self.path))
+        with patch('sys.stderr', new_callable=StringIO) as stderr:
+            logger.error('Ошибка %s', 1)
+        self.assertIn('| ERROR | test_lazy_file() | Ошибка 1', stderr.getvalue())
+        with open(self.path, encoding='utf-8') as file:
+            self.assertIn('Ошибка 1', file.read())
+
+    def test_queue(self):
+        logger = main.create_logger(logging.INFO, self.path, use_queue=True)
+        with patch('sys.stderr', new_callable=StringIO):
+            logger.info('Запись %s', 'из очереди')
+            logger.handlers[0].flush()
+        with open(self.path, encoding='utf-8') as file:
+            self.assertIn('Запись из очереди', file.read())
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'libraries.json')
+        main.Metrics.reset()
+
+    def tearDown(self):
+        main.Metrics.disable()
+        main.Metrics.reset()
+        self.directory.cleanup()
+
+    def test_disabled_by_default(self):
+        load = main.Library.__dict__['load']
+        with main.Metrics.measure('operation'):
+            main.Library('name').load([deepcopy(Mock.book)])
+        self.assertEqual(main.Metrics.snapshot(), {})
+        main.Metrics.enable()
+        self.assertIsNot(main.Library.__dict__['load'], load)
+        main.Metrics.disable()
+        self.assertIs(main.Library.__dict__['load'], load)
+
+    def test_snapshot(self):
+        main.Metrics.enable()
+        library = main.Library('name')
+        library.load([deepcopy(Mock.book), deepcopy(Mock.book2)])
+        library.search(author='author')
+        with patch('sys.stdout', new_callable=StringIO):
+            main.JsonConverter.save_json((library,), self.path)
+            main.JsonConverter.load_libraries(path=self.path)
+        with self.assertRaises(ValueError):
+            library.insert_books([deepcopy(Mock.book)])
+        with self.assertRaises(KeyError), main.Metrics.measure('Client.start: пункт'):
+            raise KeyError
+        snapshot = main.Metrics.snapshot()
+        size = os.path.getsize(self.path)
+        self.assertEqual(snapshot['Library.load']['count'], 2)
+        self.assertEqual(snapshot['Library.load']['books'], 4)
+        self.assertEqual(snapshot['Library.search']['count'], 1)
+        self.assertEqual(snapshot['JsonConverter.save_json']['bytes_written'], size)
+        self.assertEqual(snapshot['JsonConverter.load_libraries']['bytes_read'], size)
+        self.assertEqual(snapshot['JsonConverter.load_libraries']['books'], 2)
+        self.assertEqual(snapshot['Library.insert_books']['errors'], 1)
+        self.assertEqual(snapshot['Client.start: пункт']['errors'], 1)
+        self.assertLessEqual(snapshot['Library.search']['p50_ms'], snapshot['Library.search']['max_ms'])
+        main.Metrics.dump(self.path)
+        with open(self.path, encoding='utf-8') as file:
+            self.assertEqual(json.load(file)['Library.load']['count'], 2)
+
+
+class ServerTest(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        library = main.Library('name')
+        library.load([deepcopy(Mock.book)])
+        patcher = patch.object(main.Client, '_Client__libraries', (library,))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.server = main.LibraryServer('127.0.0.1:0')
+        with patch('sys.stdout', new_callable=StringIO):
+            await self.server.start()
+        host, port = self.server.address.rsplit(':', 1)
+        self.connections = [await asyncio.open_connection(host, int(port)) for _ in range(2)]
+
+    async def asyncTearDown(self):
+        for _, writer in self.connections:
+            writer.close()
+        await self.server.close()
+
+    async def request(self, connection, *commands):
+        reader, writer = connection
+        writer.write(b''.join((line if isinstance(line, bytes) else json.dumps(line).encode()) + b'\n'
+                              for line in commands))
+        await writer.drain()
+        return [json.loads(await reader.readline()) for _ in commands]
+
+    async def test_requests(self):
+        first, second = await asyncio.gather(*(
+            self.request(connection, *({'id': number, 'op': 'add', 'library': 'name',
+                                        'books': [['title2', 'author2', 2]]} for number in range(10)))
+            for connection in self.connections))
+        self.assertEqual([response['id'] for response in first], list(range(10)))
+        self.assertEqual(sorted(response['result'][0] for response in first + second), list(range(2, 22)))
+        export_path = os.path.join(tempfile.gettempdir(), f'server_export_{os.getpid()}.csv')
+        found, libraries, missing, wrong, export = await self.request(
+            self.connections[0], {'op': 'search', 'library': 'name', 'author': 'author2'}, {'op': 'libraries'},
+            {'op': 'delete', 'library': 'missing', 'ids': [1]}, b'not json',
+            {'op': 'export', 'library': 'name', 'path': export_path})
+        self.assertEqual(export['error'], "Команда 'export' недоступна по сети")
+        self.assertFalse(os.path.exists(export_path))
+        self.assertEqual(len(found['result']['author']), 20)
+        self.assertEqual(libraries['result'], [{'name': 'name', 'books': 21, 'columnar': False}])
+        self.assertEqual(missing['error'], "Нет библиотеки 'missing'")
+        self.assertIn('error', wrong)
+
+
 if __name__ == '__main__':
     unittest.main()